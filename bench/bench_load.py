@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark: workbook loading in process_file
+
+Compares the legacy loading path (pd.read_excel called three times on the same
+sheet plus a row-wise apply() to find the "State" header row) with the
+single-pass read_device_workbook() loader.
+
+Usage:
+    python bench/bench_load.py [--repeat N] [FILE.xlsx ...]
+
+Defaults to the sample workbooks in test/ when no files are given.
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+import warnings
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pandas as pd
+
+from hcd import read_device_workbook
+
+# openpyxl warns about the missing default style in every device export
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
+
+
+def legacy_load(filepath):
+    """Loading path used by process_file before the single-pass loader"""
+    xls = pd.ExcelFile(filepath)
+    raw_df = pd.read_excel(xls, sheet_name=0, header=None)
+    header_row_idx = raw_df[raw_df.apply(lambda row: row.astype(str).str.contains("State").any(), axis=1)].index[0]
+    df = pd.read_excel(xls, sheet_name=0, header=header_row_idx).dropna(axis=1, how='all')
+    original_df = pd.read_excel(xls, sheet_name=0, header=None)
+    return raw_df, df, original_df
+
+
+def best_of(func, filepath, repeat):
+    """Return (best wall time in seconds, last result) over `repeat` runs"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(filepath)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark workbook loading")
+    parser.add_argument("files", nargs="*", help="Device export workbooks to load")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per loader (best time is reported)")
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'test', '*.xlsx')))
+    if not files:
+        print("❌ No workbooks to benchmark")
+        return 1
+
+    print(f"{'file':<60} {'rows':>8} {'legacy s':>10} {'single s':>10} {'speedup':>8}  match")
+    for filepath in files:
+        legacy_time, (raw_df, df, _) = best_of(legacy_load, filepath, args.repeat)
+        single_time, (new_raw_df, new_df, _, _, _) = best_of(read_device_workbook, filepath, args.repeat)
+        match = raw_df.equals(new_raw_df) and df.equals(new_df)
+        print(f"{os.path.basename(filepath)[:60]:<60} {len(raw_df):>8} {legacy_time:>10.3f} "
+              f"{single_time:>10.3f} {legacy_time / single_time:>7.1f}x  {'✅' if match else '❌'}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Benchmark: every stage of process_file on synthetic exports
+
+Generates exports with bench/synthetic.py (cached in bench/data/), runs
+process_file() on each, and times its stages by wrapping the stage
+functions it calls:
+
+    load         read_device_workbook
+    clean        clean_timestamps (dedupe / 1-minute reindex)
+    stats        collect_temperature_stats
+    detect       detect_heating
+    validate     validate_heating_groups
+    summarize    summarize_heating_hours
+    write        write_output_workbook (includes highlight)
+    highlight    highlight_heating_rows
+    db_insert    insert_summary_to_db (dry run unless --db)
+    other        total minus the stages above (column renames, merges, ...)
+
+Results are printed and written as JSON (with the git commit, so runs from
+different commits can be compared).
+
+Usage:
+    python bench/bench_pipeline.py [--scales day,week,month] [--repeat N]
+                                   [--outputs full|summary|none] [--db] [--json PATH]
+
+--db inserts for real (and with --upserts semantics off); point the PG*
+environment variables at a scratch database.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import warnings
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Add src and bench directories to path
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'src'))
+sys.path.insert(0, BENCH_DIR)
+
+import hcd
+from synthetic import SCALES, write_synthetic_export
+
+# openpyxl warns about the missing default style in every device export
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
+
+STAGES = [
+    ("load", "read_device_workbook"),
+    ("clean", "clean_timestamps"),
+    ("stats", "collect_temperature_stats"),
+    ("detect", "detect_heating"),
+    ("validate", "validate_heating_groups"),
+    ("summarize", "summarize_heating_hours"),
+    ("write", "write_output_workbook"),
+    ("highlight", "highlight_heating_rows"),
+    ("db_insert", "insert_summary_to_db"),
+]
+
+
+@contextlib.contextmanager
+def timed_stages(timings):
+    """Wrap the hcd stage functions so each call adds its wall time to timings"""
+    originals = {name: getattr(hcd, name) for _, name in STAGES}
+
+    def wrap(stage, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+        return timed
+
+    for stage, name in STAGES:
+        setattr(hcd, name, wrap(stage, originals[name]))
+    try:
+        yield
+    finally:
+        for name, func in originals.items():
+            setattr(hcd, name, func)
+
+
+def export_path(scale, seed):
+    """Synthetic export for a scale, generated on first use"""
+    data_dir = os.path.join(BENCH_DIR, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"synthetic-{scale}-{seed}.xlsx")
+    if not os.path.exists(path):
+        print(f"🛠️  Generating {scale} export ({SCALES[scale]} days)...", file=sys.stderr)
+        write_synthetic_export(path, days=SCALES[scale], seed=seed)
+    return path
+
+
+def run_once(filepath, savepath, outputs, live_db):
+    """Run process_file once and return (stage timings, total seconds, device_stats)"""
+    timings = {}
+    with timed_stages(timings), open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        *_, stats = hcd.process_file(filepath, savepath, insert_db=True, dry_run=not live_db, outputs=outputs)
+        total = time.perf_counter() - start
+    return timings, total, stats
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the process_file pipeline stages")
+    parser.add_argument("--scales", default="day,week,month",
+                        help=f"Comma-separated export sizes from {', '.join(SCALES)} (default: day,week,month)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per export (best total is reported)")
+    parser.add_argument("--outputs", choices=["none", "summary", "full"], default="full",
+                        help="Workbook written by process_file (default: full)")
+    parser.add_argument("--db", action="store_true", help="Insert into PostgreSQL instead of a dry run")
+    parser.add_argument("--seed", type=int, default=0, help="Generator seed (default: 0)")
+    parser.add_argument("--json", help="Results file (default: bench/results/pipeline-<timestamp>.json)")
+    args = parser.parse_args()
+
+    scales = [scale.strip() for scale in args.scales.split(",") if scale.strip()]
+    unknown = [scale for scale in scales if scale not in SCALES]
+    if unknown:
+        parser.error(f"unknown scale(s): {', '.join(unknown)}")
+
+    stage_names = [stage for stage, _ in STAGES] + ["other"]
+    print(f"{'scale':<8} {'rows':>8} {'total s':>8} " + " ".join(f"{stage:>9}" for stage in stage_names))
+
+    results = []
+    out_dir = os.path.join(BENCH_DIR, "data", "out")
+    os.makedirs(out_dir, exist_ok=True)
+    for scale in scales:
+        filepath = export_path(scale, args.seed)
+        savepath = os.path.join(out_dir, f"synthetic-{scale}_heat min per hour.xlsx")
+
+        best = None
+        for _ in range(args.repeat):
+            timings, total, stats = run_once(filepath, savepath, args.outputs, args.db)
+            if best is None or total < best[1]:
+                best = (timings, total, stats)
+        timings, total, stats = best
+        # write includes highlight; "other" is what no stage function covers
+        covered = sum(seconds for stage, seconds in timings.items() if stage != "highlight")
+        timings["other"] = max(total - covered, 0.0)
+
+        print(f"{scale:<8} {stats['test_run_rows']:>8} {total:>8.3f} "
+              + " ".join(f"{timings.get(stage, 0.0):>9.3f}" for stage in stage_names))
+        results.append({
+            "scale": scale,
+            "days": SCALES[scale],
+            "file": os.path.relpath(filepath, os.path.join(BENCH_DIR, "..")),
+            "test_run_rows": stats['test_run_rows'],
+            "summary_rows": stats['summary_rows'],
+            "status": stats['status'],
+            "total_seconds": total,
+            "stage_seconds": {stage: timings.get(stage, 0.0) for stage in stage_names},
+        })
+
+    report = {
+        "benchmark": "pipeline",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "pandas": sys.modules["pandas"].__version__ if "pandas" in sys.modules else None,
+        "outputs": args.outputs,
+        "db": "live" if args.db else "dry-run",
+        "repeat": args.repeat,
+        "results": results,
+    }
+    json_path = args.json or os.path.join(
+        BENCH_DIR, "results", f"pipeline-{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(json_path)), exist_ok=True)
+    with open(json_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📊 Results written to: {json_path}")
+    hcd.close_db_pool()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Synthetic device exports for benchmarks
+
+Writes workbooks with the same layout as the RTU exports in test/: a
+"Name:" row with the device name, a "DevID:" row, a model row, the header
+row containing "State", then one row per minute with float32-rounded
+supply/return temperatures, Mode/Request/State columns and a "Test Run"
+note. The minute series has Enable/Disable blocks, heating ramps (a jump
+of more than 5°C, a climb, then a drop of at least 2.7°C), duplicate
+timestamps and gaps, and scales from a day to a year of minutes.
+
+Usage:
+    python bench/synthetic.py OUT.xlsx [--days N] [--seed S]
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+from openpyxl import Workbook
+
+SCALES = {"day": 1, "week": 7, "month": 30, "quarter": 91, "year": 365}
+
+
+def synthetic_rows(days=1, seed=0, start=datetime(2025, 1, 1), duplicate_rate=0.003, gap_rate=0.005):
+    """
+    Yield export rows (Date, Supply, Return, Mode, Request, State, Note) for
+    `days` days of minutes.
+    """
+    rng = np.random.default_rng(seed)
+    minutes = days * 24 * 60
+    return_temp = 18.0
+    supply = return_temp + 1.0
+    heating_left = 0
+    state = "Enable"
+
+    for minute in range(minutes):
+        # Energy saver tests alternate Enable/Disable in blocks of a few hours
+        if minute % 60 == 0 and rng.random() < 0.3:
+            state = "Disable" if state == "Enable" else "Enable"
+
+        if heating_left == 0 and rng.random() < 0.02:
+            # Start of a heating cycle: supply jumps by more than 5°C
+            heating_left = int(rng.integers(8, 45))
+            supply += rng.uniform(5.5, 9.0)
+        elif heating_left > 0:
+            heating_left -= 1
+            supply += rng.uniform(-0.2, 0.6)
+            if heating_left == 0:
+                # End of the cycle: supply drops by at least 2.7°C
+                supply -= rng.uniform(3.0, 8.0)
+        else:
+            supply += (return_temp + 1.0 - supply) * 0.15 + rng.normal(0, 0.3)
+        supply = min(max(supply, 5.0), 60.0)
+        # Return water follows supply slowly and settles back to the room loop
+        return_temp += (supply - return_temp) * 0.01 + (18.0 - return_temp) * 0.05 + rng.normal(0, 0.05)
+
+        if rng.random() < gap_rate:
+            continue
+
+        timestamp = (start + timedelta(minutes=minute)).strftime("%Y-%m-%d %H:%M")
+        mode = "H" if heating_left else ("D" if state == "Disable" else rng.choice(["N", "A", "C"]))
+        row = [
+            timestamp,
+            float(np.float32(round(supply, 1))),
+            float(np.float32(round(return_temp, 1))),
+            mode,
+            "ON" if heating_left or rng.random() < 0.8 else "OFF",
+            state,
+            "Test Run" if minute else None,
+        ]
+        yield row
+        if rng.random() < duplicate_rate:
+            yield row[:1] + [float(np.float32(round(supply + rng.normal(0, 0.5), 1)))] + row[2:]
+
+
+def write_synthetic_export(path, days=1, seed=0, device_name="Synthetic RTU 1", serial="80646f000001"):
+    """Write a synthetic export workbook and return the number of minute rows"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(["Name:", device_name])
+    ws.append([f"DevID: {serial}"])
+    ws.append([" Model: AC-01"])
+    ws.append(["Date", "Supply Temp/C", "Return Temp/C", "Mode", "Request", "State", " "])
+    count = 0
+    for row in synthetic_rows(days=days, seed=seed):
+        ws.append(row)
+        count += 1
+    wb.save(path)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic device export")
+    parser.add_argument("output", help="Workbook to write (.xlsx)")
+    parser.add_argument("--days", type=int, default=1, help="Days of minute rows (default: 1)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    args = parser.parse_args()
+
+    count = write_synthetic_export(args.output, days=args.days, seed=args.seed)
+    print(f"✅ Wrote {count} rows to {os.path.abspath(args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,4 +2,4 @@
 python3 -m venv env
 source env/bin/activate
 pip install --upgrade pip
-pip install pandas openpyxl matplotlib numpy psycopg2-binary
+pip install pandas openpyxl numpy psycopg2-binary pytz
@@ -0,0 +1,40 @@
+-- Indexes and daily rollup for `hcd.py report`
+--
+-- Purpose: Keep fleet reports fast as heating_device_data grows.
+--
+--   - The report filters on (device_serial, epoch_date_stamp), which the
+--     primary key already covers when --serial is given. Reports over all
+--     devices filter on epoch_date_stamp alone; the index below serves them.
+--   - heating_device_daily holds one row per device, UTC day and energy saver
+--     state, so `hcd.py report --rollup` (savings and devices reports over
+--     whole days) reads ~1/24 of the rows. It is a materialized view: refresh
+--     it after inserts with `hcd.py report --refresh-rollup` (or the REFRESH
+--     statement at the end of this file), e.g. nightly.
+--
+-- Safe to run more than once.
+
+CREATE INDEX IF NOT EXISTS heating_device_data_epoch_idx
+    ON heating_device_data (epoch_date_stamp);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS heating_device_daily AS
+SELECT
+    device_serial,
+    (epoch_date_stamp / 86400) * 86400 AS epoch_date_stamp,  -- start of the UTC day
+    energy_saver_on,
+    MAX(device_name) AS device_name,
+    COUNT(*) AS hours,
+    SUM(heating_on_minutes) AS heating_minutes,
+    MIN(date_stamp) AS first_hour,
+    MAX(date_stamp) AS last_hour
+FROM heating_device_data
+GROUP BY device_serial, epoch_date_stamp / 86400, energy_saver_on;
+
+-- Required by REFRESH ... CONCURRENTLY; also the key of the --rollup filters
+CREATE UNIQUE INDEX IF NOT EXISTS heating_device_daily_key
+    ON heating_device_daily (device_serial, epoch_date_stamp, energy_saver_on);
+
+CREATE INDEX IF NOT EXISTS heating_device_daily_epoch_idx
+    ON heating_device_daily (epoch_date_stamp);
+
+-- Refresh without blocking readers (run after new readings are inserted)
+REFRESH MATERIALIZED VIEW CONCURRENTLY heating_device_daily;
@@ -2,29 +2,68 @@
 
 import os
 import sys
-import pandas as pd
-import matplotlib.pyplot as plt
-from datetime import timedelta, datetime
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill  # <-- Added from version1a
+from bisect import bisect_right
+from datetime import timedelta, datetime, timezone
 # from google.colab import drive  # Removed for local usage
 
+# numpy, pandas, openpyxl, psycopg2 and pytz are imported inside the stages that
+# use them, so `--help`, `serve` start-up and DB-less runs do not pay for (or
+# require) libraries they never touch.
+
 # --------------------------------------------------------------------------------
 # The following lines were removed to eliminate Google Colab references.
 # --------------------------------------------------------------------------------
 
 # Configuration
 source_folder = "./test"        # You can modify as needed (overridden below in main())
-target_folder = "./test_done"   # You can modify as needed
-
-# Ensure that target_folder exists
-os.makedirs(target_folder, exist_ok=True)
+target_folder = "./test_done"   # You can modify as needed (created by run())
 
 # --------------------------------------------------------------------------------
-# Imports for PostgreSQL insertion and JSON output
-import psycopg2
-import pytz
+# Imports for JSON output, the result cache and stage timing
+import collections
+import csv
 import json
+import hashlib
+import itertools
+import pickle
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Default detection / validation / summarization thresholds (process_file()
+# takes other values with `detection`, `hcd.py sweep` evaluates grids of them):
+#   on_delta:     supply jump (°C, exclusive) that triggers heating
+#   off_delta:    supply drop (°C, inclusive) that releases heating
+#   min_diff:     supply-over-return differential (°C) for the 60% rule
+#   min_fraction: fraction of a group's rows that must meet min_diff
+#   min_minutes:  minutes of consistent Enable/Disable needed for a summary hour
+DETECTION_PARAMS = {
+    "on_delta": 5,
+    "off_delta": -2.7,
+    "min_diff": 7,
+    "min_fraction": 0.6,
+    "min_minutes": 55,
+}
+
+# How the device-local "Date/Time On" hours become UTC keys (epoch_date_stamp):
+#   timezone:          zone of every device without an override
+#   device_timezones:  device_serial -> zone overrides (per device or site)
+#   ambiguous:         repeated fall-back hour: "first" (daylight time, as keys
+#                      were always written), "second" (standard time), "drop", "error"
+#   nonexistent:       skipped spring-forward hour: "shift" (one hour later, as
+#                      keys were always written), "drop", "error"
+LOCAL_TIME = {
+    "timezone": "America/Detroit",
+    "device_timezones": {},
+    "ambiguous": "first",
+    "nonexistent": "shift",
+}
+
+# What `hcd.py sweep` reports per device and parameter set (see sweep_minutes)
+SWEEP_METRICS = [
+    "groups_detected", "groups_valid", "summary_rows", "enable_hours", "disable_hours",
+    "heating_minutes", "enable_heating_minutes", "disable_heating_minutes",
+]
 
 # --------------------------------------------------------------------------------
 
@@ -66,12 +105,34 @@ def hex_upper(serial: str) -> str:
         return serial.upper()
 
 
-def connect_to_postgres():
+def hex_upper_series(serials):
     """
-    Connect to the PostgreSQL database using credentials from environment variables
-    and the .pgpass file for the password, as requested.
+    Vectorized hex_upper() for a Series, array or list of serials.
+
+    Each element is normalized exactly as hex_upper() would (the rules of
+    sql/normalize-existing-serials.sql, after stripping whitespace); empty
+    strings and non-string values are returned unchanged.
+
+    Returns:
+        A Series with the same index for a Series, otherwise an object array
     """
-    return psycopg2.connect(
+    import pandas as pd
+
+    values = serials if isinstance(serials, pd.Series) else pd.Series(list(serials), dtype=object)
+    stripped = values.str.strip()  # NaN for non-strings
+    upper = stripped.str.upper()
+    has_prefix = upper.str.startswith("0X", na=False)
+    normalized = upper.where(~has_prefix, "0x" + upper.str[2:])
+    result = values.where(stripped.isna() | (values == ""), normalized)
+    return result if isinstance(serials, pd.Series) else result.to_numpy(dtype=object)
+
+
+def _postgres_params():
+    """
+    Connection parameters from environment variables; the password comes from
+    the .pgpass file.
+    """
+    return dict(
         host=os.getenv('PGHOST_2'),
         database=os.getenv('PGDATABASE_2'),
         user=os.getenv('PGUSER_2'),
@@ -80,527 +141,2867 @@ def connect_to_postgres():
     )
 
 
-def process_file(filepath, savepath, insert_db=False, do_upserts=False, dry_run=False):
-    # Initialize counters for this file
-    summary_rows_count = 0
-    heating_devices_count = 0
-    heating_device_readings_count = 0
-    # Initialize list to store heating device info for JSON output
-    heating_serial_devices = []
-    # Initialize device statistics dictionary
-    device_stats = {
-        'filepath': filepath,
-        'device_name': None,
-        'device_serial': None,
-        'test_run_rows': 0,
-        'supply_min': None,
-        'supply_max': None,
-        'supply_mean': None,
-        'return_min': None,
-        'return_max': None,
-        'return_mean': None,
-        'diff_min': None,
-        'diff_max': None,
-        'diff_mean': None,
-        'rows_above_7c_threshold': 0,
-        'rows_supply_gt_return': 0,
-        'heating_groups_detected': 0,
-        'valid_heating_groups': 0,
-        'summary_rows': 0,
-        'status': 'unknown'
-    }
+def connect_to_postgres():
+    """
+    Connect to the PostgreSQL database using credentials from environment variables
+    and the .pgpass file for the password, as requested.
+    """
+    import psycopg2
 
-    xls = pd.ExcelFile(filepath)
-    raw_df = pd.read_excel(xls, sheet_name=0, header=None)
+    return psycopg2.connect(**_postgres_params())
 
-    # Detect header
-    header_row_idx = raw_df[raw_df.apply(lambda row: row.astype(str).str.contains("State").any(), axis=1)].index[0]
-    df = pd.read_excel(xls, sheet_name=0, header=header_row_idx).dropna(axis=1, how='all')
-    original_df = pd.read_excel(xls, sheet_name=0, header=None)
 
-    # Rename 7th column to "Note"
-    if df.columns.size >= 7:
-        print(f"📄 Processing file: {filepath}")
-        df.columns.values[6] = "Note"
-        if "Note" in df.columns:
-            df = df[df["Note"] == "Test Run"].copy()
-        else:
-            print(f"❌ 'Note' column not found after renaming in: {filepath}")
-            device_stats['status'] = 'error_no_note_column'
-            return 0, 0, 0, [], device_stats
-    else:
-        print(f"❌ Not enough columns to rename 7th column to 'Note' in: {filepath}")
-        device_stats['status'] = 'error_insufficient_columns'
-        return 0, 0, 0, [], device_stats
+# Connection pool shared by every file processed in this process (created lazily)
+_db_pool = None
+_db_pool_lock = threading.Lock()
+DB_POOL_MAX_CONNECTIONS = 4
 
-    # Insert "Device Name" and "MAC Serial #"
-    device_name = raw_df.iloc[0, 1]
-    mac_serial = str(raw_df.iloc[1, 0]).replace("DevID: ", "")
-    mac_serial = hex_upper(mac_serial)  # Normalize serial number format
-    df["Device Name"] = device_name
-    df["MAC Serial #"] = mac_serial
 
-    # Update device stats
-    device_stats['device_name'] = device_name
-    device_stats['device_serial'] = mac_serial
-    cols = ["Device Name", "MAC Serial #"] + [col for col in df.columns if col not in ["Device Name", "MAC Serial #"]]
-    df = df[cols]
+def get_db_pool():
+    """
+    Return the process-wide connection pool, creating it on first use.
+    Batch runs reuse pooled connections instead of connecting once per file.
+    """
+    import psycopg2.pool
 
-    # Add Enable/Disable columns
-    df["Enable"] = df["State"].apply(lambda x: 1 if x == "Enable" else "")
-    df["Disable"] = df["State"].apply(lambda x: 1 if x == "Disable" else "")
+    global _db_pool
+    with _db_pool_lock:
+        if _db_pool is None:
+            _db_pool = psycopg2.pool.ThreadedConnectionPool(1, DB_POOL_MAX_CONNECTIONS, **_postgres_params())
+    return _db_pool
 
-    # Step 4: Clean up duplicate/missing timestamps before heat detection
-    df["Date"] = pd.to_datetime(df["Date"])
-    df = df.sort_values("Date").reset_index(drop=True)
 
-    # Capture duplicate rows (keep last, discard others)
-    duplicates = df[df.duplicated(subset="Date", keep="last")]
+def close_db_pool():
+    """Close every pooled connection (no-op if the pool was never created)"""
+    global _db_pool
+    with _db_pool_lock:
+        if _db_pool is not None:
+            _db_pool.closeall()
+            _db_pool = None
+    with _device_ids_lock:
+        _device_ids.clear()
 
-    # Remove duplicates by keeping the last occurrence
-    df = df.drop_duplicates(subset="Date", keep="last")
 
-    # Generate a complete timestamp range at 1-minute frequency
-    full_range = pd.date_range(start=df["Date"].min(), end=df["Date"].max(), freq="1min")
-    df_full = pd.DataFrame({"Date": full_range})
+def _convert_excel_value(value):
+    """
+    Convert a raw openpyxl cell value the same way pandas' openpyxl reader does,
+    so frames built from the streamed rows match pd.read_excel exactly:
+    - empty cells become ""
+    - Excel error values (#N/A, #DIV/0!, ...) become NaN
+    - integral floats become int
+    """
+    from openpyxl.cell.cell import ERROR_CODES
 
-    # Merge to find missing times
-    df = pd.merge(df_full, df, on="Date", how="left")
+    if value is None:
+        return ""
+    if type(value) is float:
+        int_value = int(value)
+        return int_value if int_value == value else value
+    if isinstance(value, str) and value in ERROR_CODES:
+        return float("nan")
+    return value
 
-    # Forward fill row values from previous valid row
-    fill_cols = ["Device Name", "MAC Serial #", "Enable", "Disable", "Note"]
-    df[fill_cols] = df[fill_cols].fillna(method="ffill")
 
-    # Save discarded rows
-    discarded = pd.concat([duplicates, df[df.isnull().any(axis=1)]], ignore_index=True)
-    df = df.dropna(subset=["State", "Supply Temp/C", "Return Temp/C"]).copy()
+def iter_sheet_rows(filepath, sheet_name=0):
+    """
+    Stream the rows of a sheet with openpyxl in read_only mode, converted with
+    _convert_excel_value() and with trailing empty cells trimmed (an empty row
+    is yielded as []).
+    """
+    from openpyxl import load_workbook
 
-    # Continue with filtered data
-    df_filtered = df.copy()
-    df_filtered["Date"] = pd.to_datetime(df_filtered["Date"])
-    supply = df_filtered["Supply Temp/C"].values
-    return_temp = df_filtered["Return Temp/C"].values  # <-- needed for the new version1a logic
+    wb = load_workbook(filepath, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb.worksheets[sheet_name] if isinstance(sheet_name, int) else wb[sheet_name]
+        ws.reset_dimensions()
 
-    # Collect temperature statistics for device status report
-    device_stats['test_run_rows'] = len(df_filtered)
-    device_stats['supply_min'] = float(df_filtered["Supply Temp/C"].min())
-    device_stats['supply_max'] = float(df_filtered["Supply Temp/C"].max())
-    device_stats['supply_mean'] = float(df_filtered["Supply Temp/C"].mean())
-    device_stats['return_min'] = float(df_filtered["Return Temp/C"].min())
-    device_stats['return_max'] = float(df_filtered["Return Temp/C"].max())
-    device_stats['return_mean'] = float(df_filtered["Return Temp/C"].mean())
+        for values in ws.iter_rows(values_only=True):
+            row = [_convert_excel_value(value) for value in values]
+            while row and row[-1] == "":
+                row.pop()
+            yield row
+    finally:
+        wb.close()
 
-    # Calculate temperature differential stats
-    temp_diff = df_filtered["Supply Temp/C"] - df_filtered["Return Temp/C"]
-    device_stats['diff_min'] = float(temp_diff.min())
-    device_stats['diff_max'] = float(temp_diff.max())
-    device_stats['diff_mean'] = float(temp_diff.mean())
-    device_stats['rows_above_7c_threshold'] = int((temp_diff >= 7.0).sum())
-    device_stats['rows_supply_gt_return'] = int((temp_diff > 0).sum())
 
-    # ----------------------------------------------------------------------------
-    # Heating detection logic merged from version1a:
-    #   - threshold to turn ON: delta > 5, supply[i] > return_temp[i], not triggered before
-    #   - threshold to turn OFF: delta <= -2.7
-    #   - maintain a triggered_rows set
-    # ----------------------------------------------------------------------------
-    heating_state, heating_group = [], []
-    in_heating = False
-    group_id = 0
-    triggered_rows = set()
-
-    for i in range(len(supply)):
-        if i == 0:
-            heating_state.append("Off")
-            heating_group.append(0)
-            continue
+def workbook_sheet_names(filepath):
+    """
+    Sheet names listed in a workbook's xl/workbook.xml, read without loading
+    the workbook (no shared strings or styles), or None when the part is missing.
+    """
+    import zipfile
+    from xml.etree import ElementTree
 
-        delta = supply[i] - supply[i - 1]
-        if (not in_heating
-            and delta > 5
-            and supply[i] > return_temp[i]
-            and i not in triggered_rows):
-            in_heating = True
-            group_id += 1
-            heating_state.append("On")
-            heating_group.append(group_id)
-            triggered_rows.add(i)
-
-        elif in_heating and delta <= -2.7:
-            in_heating = False
-            heating_state.append("Off")
-            heating_group.append(0)
+    with zipfile.ZipFile(filepath) as archive:
+        try:
+            root = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+        except KeyError:
+            return None
+    return [element.get("name") for element in root.iter() if element.tag.rsplit("}", 1)[-1] == "sheet"]
 
-        else:
-            heating_state.append("On" if in_heating else "Off")
-            heating_group.append(group_id if in_heating else 0)
 
-    df_filtered["Heating"] = heating_state
-    df_filtered["Heating_Group"] = heating_group
+def device_sheet_names(filepath):
+    """
+    Names of the sheets holding a device export (a "DevID: ..." cell A2).
+    Field techs export several devices into one workbook, one sheet each.
+    A single-sheet workbook (the usual export) is not opened: its sheet is
+    processed whole either way, so its name is returned as is.
+    """
+    from openpyxl import load_workbook
 
-    # Extra debugging columns (from version1a)
-    df_filtered["Delta Supply"] = df_filtered["Supply Temp/C"].diff()
-    df_filtered["Delta Debug"] = df_filtered["Delta Supply"].apply(
-        lambda x: f"{x:.2f}" if pd.notnull(x) else ""
-    )
-    df_filtered["Trigger Debug"] = [
-        "TRIGGERED" if df_filtered.loc[i, "Delta Supply"] > 5 else ""
-        for i in df_filtered.index
-    ]
+    names = workbook_sheet_names(filepath)
+    if names is not None and len(names) <= 1:
+        return names
 
-    # ----------------------------------------------------------------------------
-    # Validate heating groups (already updated to 0.6 in version2)
-    # ----------------------------------------------------------------------------
-    valid_groups = []
-    total_groups = len([gid for gid in df_filtered["Heating_Group"].unique() if gid > 0])
-    for gid in df_filtered["Heating_Group"].unique():
-        if gid == 0:
-            continue
-        group_rows = df_filtered[df_filtered["Heating_Group"] == gid]
-        valid_rows = (group_rows["Supply Temp/C"] >= group_rows["Return Temp/C"] + 7).sum()
-        if valid_rows / len(group_rows) >= 0.6:
-            valid_groups.append(gid)
+    wb = load_workbook(filepath, read_only=True, data_only=True, keep_links=False)
+    try:
+        names = []
+        for ws in wb.worksheets:
+            ws.reset_dimensions()
+            cell = next(ws.iter_rows(min_row=2, max_row=2, max_col=1, values_only=True), (None,))[0]
+            if isinstance(cell, str) and cell.strip().startswith("DevID"):
+                names.append(ws.title)
+        return names
+    finally:
+        wb.close()
 
-    # Update device stats with heating group counts
-    device_stats['heating_groups_detected'] = total_groups
-    device_stats['valid_heating_groups'] = len(valid_groups)
 
-    df_filtered.loc[~df_filtered["Heating_Group"].isin(valid_groups), ["Heating", "Heating_Group"]] = ["Off", 0]
+def sheet_output_path(savepath, sheet_name):
+    """Output workbook path for one sheet of a multi-device workbook"""
+    base, ext = os.path.splitext(savepath)
+    return f"{base} - {sheet_name}{ext}"
 
-    # Extract heating group on/off times
-    group_times = df_filtered[df_filtered["Heating_Group"] > 0].groupby("Heating_Group")["Date"].agg(["min", "max"]).reset_index()
-    group_times.columns = ["Heating_Group", "Heat On", "Heat Off"]
-    df_filtered = df_filtered.merge(group_times, on="Heating_Group", how="left")
 
-    # Step 6: Keep full hours where heating occurred
-    df_filtered["Hour"] = df_filtered["Date"].dt.floor("h")
-    df["Date"] = pd.to_datetime(df["Date"])
-    df = pd.merge(df, df_filtered[["Date", "Heating", "Heating_Group"]], on="Date", how="left")
-    df["Heating"] = df["Heating"].fillna("Off")
-    df["Heating_GROUP"] = df["Heating_Group"].fillna(0).astype(int)
-    df["Hour"] = df["Date"].dt.floor("h")
-    heat_data_set = df[df["Hour"].isin(df_filtered[df_filtered["Heating"] == "On"]["Hour"].unique())].copy()
+def is_header_row(row):
+    """The header row is the first row with a cell containing 'State'"""
+    return any(isinstance(v, str) and "State" in v for v in row)
 
-    # Step 7: Summarize hours with >=55 mins consistent Enable/Disable
-    summaries = []
-    for hour in sorted(set(heat_data_set["Date"].dt.floor("h"))):
-        hour_data = heat_data_set[heat_data_set["Date"].dt.floor("h") == hour]
-        enable_count = pd.to_numeric(hour_data["Enable"], errors='coerce').fillna(0).astype(int).sum()
-        disable_count = pd.to_numeric(hour_data["Disable"], errors='coerce').fillna(0).astype(int).sum()
-
-        if enable_count >= 55 or disable_count >= 55:
-            summaries.append({
-                "Device Name": hour_data["Device Name"].iloc[0],
-                "MAC Serial #": hour_data["MAC Serial #"].iloc[0],
-                "Date/Time On": hour,
-                "Date/Time Off": hour + timedelta(minutes=59),
-                "Enable": 1 if enable_count >= 55 else "",
-                "Disable": 1 if disable_count >= 55 else "",
-                "Heating On": (hour_data["Heating"] == "On").sum()
-            })
-
-    summary_df = pd.DataFrame(summaries)
-    summary_rows_count = len(summary_df)
-    print("Summary Rows:", summary_rows_count)
 
-    # Update device stats with final results and status
-    device_stats['summary_rows'] = summary_rows_count
-    if summary_rows_count > 0:
-        device_stats['status'] = 'success'
-    elif device_stats['rows_above_7c_threshold'] == 0:
-        device_stats['status'] = 'no_heating_detected'
-    else:
-        device_stats['status'] = 'heating_failed_validation'
+def read_device_workbook(filepath, sheet_name=0):
+    """
+    Parse a device export sheet in a single streaming pass.
 
-    # Save outputs (initial save)
-    with pd.ExcelWriter(savepath, engine='openpyxl') as writer:
-        original_df.to_excel(writer, sheet_name="Original Data", index=False)
-        df.to_excel(writer, sheet_name="Filtered Test Run", index=False)
-        heat_data_set.to_excel(writer, sheet_name="Heating Data Set", index=False)
-        summary_df.to_excel(writer, sheet_name="Heat Cleaned Data", index=False)
-        discarded.to_excel(writer, sheet_name="Discarded", index=False)
+    The sheet is read once with openpyxl in read_only mode. While streaming,
+    the device name (cell B1), the DevID (cell A2) and the first row containing
+    "State" (the header row) are captured. Both the raw header-less frame and
+    the headed data frame are then built from the same row buffer using the
+    parser pandas itself uses for read_excel, so dtypes are identical to
+    reading the sheet with header=None / header=<idx>.
 
-    print(f"✅ Processed and saved: {savepath}")
+    Args:
+        filepath: Path to the .xlsx export
+        sheet_name: Sheet index or name (defaults to the first sheet)
 
-    # ----------------------------------------------------------------------------
-    # version1a's highlighting logic
-    # ----------------------------------------------------------------------------
-    wb = load_workbook(savepath)
-    ws = wb["Filtered Test Run"]
+    Returns:
+        Tuple (raw_df, df, header_row_idx, device_name, mac_serial) where
+        mac_serial is the DevID text with the "DevID: " prefix removed
+        (not yet normalized with hex_upper).
+    """
+    from pandas.io.parsers import TextParser
 
-    light_orange_fill = PatternFill(start_color="FFD8B1", end_color="FFD8B1", fill_type="solid")
+    data = []
+    last_row_with_data = -1
+    header_row_idx = None
+    device_name = float("nan")
+    mac_serial = "nan"
 
-    # Find column letters for relevant headers
-    headers = {cell.value: cell.column_letter for cell in ws[1]}
-    supply_col = headers.get("Supply Temp/C")
-    heating_col = headers.get("Heating")
+    for row_number, row in enumerate(iter_sheet_rows(filepath, sheet_name)):
+        if row:
+            last_row_with_data = row_number
 
-    # Highlight cells in "Filtered Test Run" where Heating == "On"
-    for row in range(2, ws.max_row + 1):
-        if ws[f"{heating_col}{row}"].value == "On":
-            if supply_col:
-                ws[f"{supply_col}{row}"].fill = light_orange_fill
-            ws[f"{heating_col}{row}"].fill = light_orange_fill
+        if row_number == 0 and len(row) > 1 and row[1] != "":
+            device_name = row[1]
+        elif row_number == 1 and row and row[0] != "":
+            mac_serial = str(row[0]).replace("DevID: ", "")
+        if header_row_idx is None and is_header_row(row):
+            header_row_idx = row_number
 
-    wb.save(savepath)
+        data.append(row)
 
-    # ----------------------------------------------------------------------------
-    # Insert data into the DB if requested
-    # ----------------------------------------------------------------------------
-    if insert_db and not summary_df.empty:
-        print("ℹ️  Inserting device into 'heating_device'... this may be skipped if dry-run or conflict")
-        unique_serials = summary_df["MAC Serial #"].unique()
+    # Trim trailing empty rows and pad every row to the same width
+    data = data[: last_row_with_data + 1]
+    if header_row_idx is None:
+        raise ValueError(f"No 'State' header row found in: {filepath}")
+    max_width = max(len(row) for row in data)
+    data = [row + [""] * (max_width - len(row)) for row in data]
 
-        if len(unique_serials) != 1:
-            print("❌ More than one distinct device_serial found in summary data. Aborting DB insertion.")
-            device_stats['status'] = 'error_multiple_serials'
-            return summary_rows_count, heating_devices_count, heating_device_readings_count, heating_serial_devices, device_stats
-
-        serial_for_device = str(unique_serials[0])
-        serial_for_device = hex_upper(serial_for_device)  # Normalize serial number format
-        insert_device_query = """
-            INSERT INTO heating_device (device_serial)
-            VALUES (%s)
-            ON CONFLICT (device_serial) DO NOTHING
-            RETURNING device_id, device_serial
-        """
-
-        # Execute or dry-run device insert
-        if dry_run:
-            heating_devices_count = len(unique_serials)
-            print(f"Dry run: would execute SQL:\n{insert_device_query.strip()}\nwith parameters ({serial_for_device},)")
-            # Add a mock device entry for dry run
-            heating_serial_devices.append({
-                "device_id": 0,  # Placeholder ID for dry run
-                "device_serial": serial_for_device
-            })
-        else:
-            try:
-                conn = connect_to_postgres()
-                cur = conn.cursor()
-                cur.execute(insert_device_query, (serial_for_device,))
-                
-                # Get the device_id from the RETURNING clause
-                device_result = cur.fetchone()
-                
-                # If a row was returned, a new device was inserted
-                # Otherwise, we need to query for the existing device_id
-                if device_result:
-                    device_id, device_serial = device_result
-                    heating_serial_devices.append({
-                        "device_id": device_id,
-                        "device_serial": device_serial
-                    })
-                    heating_devices_count = 1
-                else:
-                    # Query to get the device_id for the existing device
-                    cur.execute("SELECT device_id, device_serial FROM heating_device WHERE device_serial = %s", 
-                                (serial_for_device,))
-                    device_id, device_serial = cur.fetchone()
-                    heating_serial_devices.append({
-                        "device_id": device_id,
-                        "device_serial": device_serial
-                    })
-                    heating_devices_count = 1
-                
-            except Exception as e:
-                print(f"❌ Failed to insert device into 'heating_device': {e}")
-                device_stats['status'] = 'error_db_insertion'
-                return summary_rows_count, heating_devices_count, heating_device_readings_count, heating_serial_devices, device_stats
-
-        detroit_tz = pytz.timezone("America/Detroit")
-        # Count reading insert attempts
-        heating_device_readings_count = len(summary_df)
-
-        for _, row in summary_df.iterrows():
-            device_serial = str(row["MAC Serial #"])
-            device_serial = hex_upper(device_serial)  # Normalize serial number format
-
-            # Convert local time to epoch UTC
-            detroit_time_on = detroit_tz.localize(row["Date/Time On"])
-            utc_time_on = detroit_time_on.astimezone(pytz.utc)
-            epoch_date_stamp = int(utc_time_on.timestamp())
-            date_stamp = utc_time_on.replace(tzinfo=None)
-
-            energy_saver_on = bool(row["Enable"] == 1)
-            heating_on_minutes = int(row["Heating On"])
-            device_name = str(row["Device Name"])
-            date_time_on = row["Date/Time On"]
-            date_time_off = row["Date/Time Off"]
-
-            if do_upserts:
-                insert_query = """
-                    INSERT INTO heating_device_data (
-                        device_serial, epoch_date_stamp, date_stamp,
-                        energy_saver_on, heating_on_minutes, device_name,
-                        date_time_on, date_time_off
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (device_serial, epoch_date_stamp)
-                    DO UPDATE SET
-                        date_stamp = EXCLUDED.date_stamp,
-                        energy_saver_on = EXCLUDED.energy_saver_on,
-                        heating_on_minutes = EXCLUDED.heating_on_minutes,
-                        device_name = EXCLUDED.device_name,
-                        date_time_on = EXCLUDED.date_time_on,
-                        date_time_off = EXCLUDED.date_time_off
-                    RETURNING device_serial
-                """
-            else:
-                insert_query = """
-                    INSERT INTO heating_device_data (
-                        device_serial, epoch_date_stamp, date_stamp,
-                        energy_saver_on, heating_on_minutes, device_name,
-                        date_time_on, date_time_off
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (device_serial, epoch_date_stamp)
-                    DO NOTHING
-                    RETURNING device_serial
-                """
-
-            params = (
-                device_serial,
-                epoch_date_stamp,
-                date_stamp,
-                energy_saver_on,
-                heating_on_minutes,
-                device_name,
-                date_time_on,
-                date_time_off
-            )
+    raw_df = TextParser(data, header=None, skip_blank_lines=False).read()
+    df = TextParser(data, header=header_row_idx, skip_blank_lines=False).read().dropna(axis=1, how='all')
 
-            if dry_run:
-                print(f"Dry run: would execute SQL:\n{insert_query.strip()}\nwith parameters {params}")
-            else:
-                cur.execute(insert_query, params)
-                # result fetched but we count all attempts uniformly
+    return raw_df, df, header_row_idx, device_name, mac_serial
 
-        if not dry_run:
-            conn.commit()
-            cur.close()
-            conn.close()
 
-        if not do_upserts and heating_device_readings_count > 0:
-            print(f"⚠️  Completed inserts with potential duplicates skipped by ON CONFLICT.")
-        print("✅ Data insertion complete.")
+def detect_heating(supply, return_temp, on_delta=5, off_delta=-2.7, heating_at_start=False):
+    """
+    Run the heating on/off state machine over a minute series.
 
-    # Return counters for JSON summary and device stats
-    return summary_rows_count, heating_devices_count, heating_device_readings_count, heating_serial_devices, device_stats
+    Rules (merged from version1a):
+    - Turn ON when not heating, supply jumped by more than on_delta since the
+      previous row and supply > return on that row. Each ON starts a new group.
+    - Turn OFF when heating and supply dropped by off_delta or more.
+    - Row 0 is "Off" (there is no previous row to compare against), unless
+      heating_at_start is set: then row 0 continues a group that was already
+      heating (used when a series is processed in chunks).
 
+    Instead of stepping through every row, the candidate trigger and release
+    rows are found with NumPy, and the scan only visits those indices: from each
+    trigger it jumps to the next release after it, and from each release to the
+    next trigger after it. The On spans are then filled in vectorized.
 
-def main():
+    Args:
+        supply: Supply temperatures (array-like of float)
+        return_temp: Return temperatures (array-like of float, same length)
+        on_delta: Minimum supply jump (exclusive) that triggers heating
+        off_delta: Supply drop (inclusive) that releases heating
+        heating_at_start: Row 0 is already heating (group 1 starts there)
+
+    Returns:
+        Tuple (heating, heating_group) of NumPy arrays: "On"/"Off" strings
+        (object dtype) and the int64 group id (0 when not heating).
     """
-    Main entry point for the Heat Cycle Detection script.
-    - Defaults to current working directory for source_folder.
-    - If --input-file is provided, only that file is processed.
-    - Otherwise, processes all .xlsx files in the current directory.
+    import numpy as np
+
+    supply = np.asarray(supply, dtype=float)
+    return_temp = np.asarray(return_temp, dtype=float)
+    n = len(supply)
+
+    heating_group = np.zeros(n, dtype=np.int64)
+    if n > 1 or (n and heating_at_start):
+        delta = np.diff(supply)
+        # Row indices (>= 1) that could start or end a heating group
+        triggers = (np.flatnonzero((delta > on_delta) & (supply[1:] > return_temp[1:])) + 1).tolist()
+        releases = (np.flatnonzero(delta <= off_delta) + 1).tolist()
+        if heating_at_start:
+            triggers.insert(0, 0)
+
+        starts, ends = [], []
+        t = 0
+        while t < len(triggers):
+            start = triggers[t]
+            r = bisect_right(releases, start)
+            starts.append(start)
+            if r == len(releases):
+                ends.append(n)
+                break
+            end = releases[r]
+            ends.append(end)
+            # The release row itself is "Off", so the next group starts after it
+            t = bisect_right(triggers, end, t)
+
+        if starts:
+            group_ids = np.arange(1, len(starts) + 1, dtype=np.int64)
+            marks = np.zeros(n + 1, dtype=np.int64)
+            marks[starts] = group_ids
+            marks[ends] -= group_ids
+            heating_group = np.cumsum(marks[:n])
+
+    heating = np.where(heating_group > 0, "On", "Off").astype(object)
+    return heating, heating_group
+
+
+def validate_heating_groups(df_filtered, min_diff=7, min_fraction=0.6):
     """
-    import argparse
+    Apply the 60% rule to every detected heating group in one grouped pass.
 
-    parser = argparse.ArgumentParser(description="Heat Cycle Detection Script")
-    parser.add_argument(
-        "--input-file",
-        help="Process only the specified Excel file (relative to current directory)"
-    )
-    parser.add_argument(
-        "--insert-db",
-        action="store_true",
-        help="Insert the 'Heat Cleaned Data' rows into the heating_device_data table"
+    A group is valid when at least min_fraction of its rows have
+    Supply Temp/C >= Return Temp/C + min_diff.
+
+    Args:
+        df_filtered: Minute frame with "Supply Temp/C", "Return Temp/C" and
+            "Heating_Group" (0 = not heating)
+        min_diff: Required supply-over-return differential in °C
+        min_fraction: Fraction of group rows that must meet min_diff
+
+    Returns:
+        Tuple (valid_groups, total_groups): the valid group ids in order of
+        first appearance, and the number of detected groups.
+    """
+    in_group = df_filtered["Heating_Group"] > 0
+    groups = df_filtered.loc[in_group, "Heating_Group"]
+    meets_diff = (df_filtered.loc[in_group, "Supply Temp/C"]
+                  >= df_filtered.loc[in_group, "Return Temp/C"] + min_diff)
+
+    counts = meets_diff.groupby(groups, sort=False).agg(["sum", "size"])
+    valid_groups = counts.index[counts["sum"] / counts["size"] >= min_fraction].tolist()
+    return valid_groups, len(counts)
+
+
+def summarize_heating_hours(heat_data_set, min_minutes=55):
+    """
+    Build the "Heat Cleaned Data" rows from the heating hours in one grouped pass.
+
+    Every hour (by the "Hour" column) with at least min_minutes Enable rows
+    or min_minutes Disable rows produces one summary row with the device,
+    the hour span, the Enable/Disable flag (1 or "") and the number of
+    minutes with Heating set.
+
+    Args:
+        heat_data_set: Date-sorted minute frame restricted to hours with heating,
+            with boolean Enable, Disable and Heating columns
+        min_minutes: Minutes of consistent Enable/Disable required per hour
+
+    Returns:
+        DataFrame with one row per qualifying hour (empty DataFrame if none)
+    """
+    import pandas as pd
+
+    hourly = pd.DataFrame({
+        "Enable": heat_data_set["Enable"].to_numpy(dtype=bool),
+        "Disable": heat_data_set["Disable"].to_numpy(dtype=bool),
+        "Heating On": heat_data_set["Heating"].to_numpy(dtype=bool),
+    }).groupby(heat_data_set["Hour"].to_numpy()).sum()
+    first_rows = heat_data_set.drop_duplicates(subset="Hour").set_index("Hour")
+
+    enabled = hourly["Enable"] >= min_minutes
+    disabled = hourly["Disable"] >= min_minutes
+    keep = enabled | disabled
+    if not keep.any():
+        return pd.DataFrame([])
+
+    hours = hourly.index[keep]
+    return summary_frame(
+        first_rows.loc[hours, "Device Name"].to_numpy(),
+        first_rows.loc[hours, "MAC Serial #"].to_numpy(),
+        hours,
+        enabled[keep],
+        disabled[keep],
+        hourly.loc[keep, "Heating On"].to_numpy()
     )
-    parser.add_argument(
-        "--upserts",
-        action="store_true",
-        help="Perform upserts (INSERT ... ON CONFLICT DO UPDATE) instead of DO NOTHING"
+
+
+def summary_frame(device_names, mac_serials, hours, enabled, disabled, heating_on):
+    """
+    Lay out "Heat Cleaned Data" rows: one row per hour with the device, the
+    hour span, the Enable/Disable flags (1 or "") and the minutes heating.
+    """
+    import pandas as pd
+
+    hours = pd.DatetimeIndex(hours)
+    return pd.DataFrame({
+        "Device Name": device_names,
+        "MAC Serial #": mac_serials,
+        "Date/Time On": hours,
+        "Date/Time Off": hours + timedelta(minutes=59),
+        "Enable": [1 if flag else "" for flag in enabled],
+        "Disable": [1 if flag else "" for flag in disabled],
+        "Heating On": heating_on,
+    })
+
+
+# Insert any new devices and return (device_id, device_serial) for every
+# requested serial in one round trip: new devices come from RETURNING, existing
+# ones from the SELECT (which sees the table as it was before the INSERT).
+RESOLVE_DEVICES_QUERY = """
+    WITH inserted AS (
+        INSERT INTO heating_device (device_serial)
+        SELECT DISTINCT serial FROM unnest(%(serials)s::varchar[]) AS serial ORDER BY serial
+        ON CONFLICT (device_serial) DO NOTHING
+        RETURNING device_id, device_serial
     )
-    parser.add_argument(
-        "--logging",
-        action="store_true",
-        help="Enable logging to files in ./logs"
+    SELECT device_id, device_serial FROM inserted
+    UNION ALL
+    SELECT device_id, device_serial FROM heating_device WHERE device_serial = ANY(%(serials)s)
+"""
+
+# device_serial -> device_id of devices committed to heating_device, kept for
+# the life of the process so later files of a batch (or later `hcd serve`
+# jobs) skip the device round trip
+_device_ids = {}
+_device_ids_lock = threading.Lock()
+
+# Bulk insert for heating_device_data. RETURNING (xmax = 0) is true for rows
+# that were newly inserted and false for rows changed by DO UPDATE; rows
+# skipped by DO NOTHING return nothing.
+INSERT_READINGS_QUERY = """
+    INSERT INTO heating_device_data (
+        device_serial, epoch_date_stamp, date_stamp,
+        energy_saver_on, heating_on_minutes, device_name,
+        date_time_on, date_time_off
     )
-    parser.add_argument(
-        "--dry-run",
-        action="store_true",
-        help="Display SQL statements without executing inserts/updates"
+    VALUES %s
+    ON CONFLICT (device_serial, epoch_date_stamp)
+    DO NOTHING
+    RETURNING (xmax = 0) AS inserted
+"""
+
+UPSERT_READINGS_QUERY = """
+    INSERT INTO heating_device_data (
+        device_serial, epoch_date_stamp, date_stamp,
+        energy_saver_on, heating_on_minutes, device_name,
+        date_time_on, date_time_off
     )
-    args = parser.parse_args()
+    VALUES %s
+    ON CONFLICT (device_serial, epoch_date_stamp)
+    DO UPDATE SET
+        date_stamp = EXCLUDED.date_stamp,
+        energy_saver_on = EXCLUDED.energy_saver_on,
+        heating_on_minutes = EXCLUDED.heating_on_minutes,
+        device_name = EXCLUDED.device_name,
+        date_time_on = EXCLUDED.date_time_on,
+        date_time_off = EXCLUDED.date_time_off
+    RETURNING (xmax = 0) AS inserted
+"""
+
+
+def local_hours_to_utc(local_times, timezone="America/Detroit", ambiguous="first", nonexistent="shift"):
+    """
+    Convert device-local times to naive UTC in one vectorized pass.
 
-    # Capture original stdout to ensure JSON summary always goes there
-    orig_stdout = sys.stdout
+    Args:
+        local_times: Naive local times (Series, DatetimeIndex or list)
+        timezone: IANA zone name of the device
+        ambiguous, nonexistent: DST policies, see LOCAL_TIME
 
-    # Setup logging redirection if requested
-    if args.logging:
-        now = datetime.now()
-        now_str = now.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-4]
-        logs_dir = os.path.join(os.getcwd(), "logs")
-        os.makedirs(logs_dir, exist_ok=True)
-        out_log_path = os.path.join(logs_dir, f"{now_str}.out.log")
-        err_log_path = os.path.join(logs_dir, f"{now_str}.err.log")
-        out_f = open(out_log_path, 'w')
-        err_f = open(err_log_path, 'w')
-        sys.stdout = out_f
-        sys.stderr = err_f
-        print(f"Logging to {out_log_path} (stdout) and {err_log_path} (stderr)", file=sys.stderr)
+    Returns:
+        Naive UTC DatetimeIndex; NaT where a policy is "drop"
 
-    # Initialize aggregate counters
-    total_summary_rows = 0
-    total_heating_devices = 0
-    total_heating_readings = 0
-    # Initialize list to collect all heating device entries
-    all_heating_serial_devices = []
-    # Initialize list to collect all device statistics
-    all_device_stats = []
+    Raises:
+        ValueError: A time is ambiguous or nonexistent and its policy is "error"
+    """
+    import numpy as np
+    import pandas as pd
+
+    local_times = pd.DatetimeIndex(local_times)
+    ambiguous_policy = {
+        "first": np.ones(len(local_times), dtype=bool),
+        "second": np.zeros(len(local_times), dtype=bool),
+        "drop": "NaT",
+        "error": "raise",
+    }[ambiguous]
+    nonexistent_policy = {"shift": timedelta(hours=1), "drop": "NaT", "error": "raise"}[nonexistent]
+    try:
+        localized = local_times.tz_localize(timezone, ambiguous=ambiguous_policy, nonexistent=nonexistent_policy)
+    except Exception as e:
+        # pytz.AmbiguousTimeError / NonExistentTimeError, whichever backs the zone
+        raise ValueError(f"{type(e).__name__}: {e} in {timezone}") from e
+    return localized.tz_convert("UTC").tz_localize(None)
+
+
+def build_reading_rows(summary_df, local_time=None):
+    """
+    Convert "Heat Cleaned Data" rows into heating_device_data parameter tuples:
+    (device_serial, epoch_date_stamp, date_stamp, energy_saver_on,
+     heating_on_minutes, device_name, date_time_on, date_time_off)
 
-    default_source_folder = os.getcwd()
+    Date/Time On is device-local time (America/Detroit unless local_time says
+    otherwise); epoch_date_stamp and date_stamp are the UTC equivalents. Rows
+    whose hour a "drop" DST policy discards are left out.
 
-    # Determine upload-results directory (sibling to uploads)
-    uploads_dir = os.path.join(default_source_folder, target_folder)
-    parent_dir = os.path.dirname(uploads_dir) if target_folder != "." else default_source_folder
-    upload_results_dir = os.path.join(parent_dir, "upload-results")
-    os.makedirs(upload_results_dir, exist_ok=True)
+    Args:
+        summary_df: "Heat Cleaned Data" rows
+        local_time: Time zone settings (default: LOCAL_TIME)
+    """
+    import pandas as pd
+
+    local_time = local_time or LOCAL_TIME
+    # Normalize serial number format for all rows at once
+    device_serials = pd.Series(hex_upper_series(summary_df["MAC Serial #"].astype(str).tolist()))
+    time_on = pd.DatetimeIndex(summary_df["Date/Time On"])
+
+    # One conversion per time zone in use (normally just one)
+    zones = device_serials.map(lambda serial: local_time["device_timezones"].get(serial, local_time["timezone"]))
+    utc_time_on = pd.Series(pd.NaT, index=device_serials.index, dtype="datetime64[ns]")
+    for zone in zones.unique():
+        in_zone = (zones == zone).to_numpy()
+        utc_time_on[in_zone] = local_hours_to_utc(time_on[in_zone], zone, ambiguous=local_time["ambiguous"],
+                                                  nonexistent=local_time["nonexistent"])
+
+    keep = utc_time_on.notna().to_numpy()
+    utc_kept = pd.DatetimeIndex(utc_time_on[keep])
+    return list(zip(
+        device_serials[keep].tolist(),
+        (utc_kept.asi8 // 10**9).tolist(),
+        list(utc_kept),
+        (summary_df["Enable"] == 1).to_numpy()[keep].tolist(),
+        summary_df["Heating On"].to_numpy()[keep].astype(int).tolist(),
+        summary_df["Device Name"].astype(str).to_numpy()[keep].tolist(),
+        list(time_on[keep]),
+        list(pd.DatetimeIndex(summary_df["Date/Time Off"])[keep]),
+    ))
+
+
+def execute_values(cur, query, argslist, page_size=100, fetch=False):
+    """psycopg2.extras.execute_values(), imported on first use"""
+    from psycopg2.extras import execute_values as _execute_values
+    return _execute_values(cur, query, argslist, page_size=page_size, fetch=fetch)
+
+
+def write_reading_rows(cur, rows, do_upserts=False, page_size=1000):
+    """
+    Write heating_device_data rows with multi-row INSERT statements.
 
-    if args.input_file:
-        input_path = os.path.join(default_source_folder, args.input_file)
-        if os.path.isfile(input_path) and input_path.endswith(".xlsx") and not os.path.basename(input_path).startswith("~$"):
-            name, _ = os.path.splitext(os.path.basename(input_path))
-            save_path = os.path.join(target_folder, f"{name}_heat min per hour.xlsx")
-            summary, dev_count, read_count, devices, stats = process_file(
-                input_path,
-                save_path,
-                insert_db=args.insert_db,
-                do_upserts=args.upserts,
-                dry_run=args.dry_run
-            )
-            total_summary_rows += summary
-            total_heating_devices += dev_count
-            total_heating_readings += read_count
-            all_heating_serial_devices.extend(devices)
-            all_device_stats.append(stats)
-        else:
-            print(f"❌ File not found or invalid format: {input_path}")
-    else:
-        for filename in os.listdir(default_source_folder):
-            if filename.endswith(".xlsx") and not filename.startswith("~$"):
-                full_path = os.path.join(default_source_folder, filename)
-                name, _ = os.path.splitext(filename)
-                save_path = os.path.join(target_folder, f"{name}_heat min per hour.xlsx")
-                summary, dev_count, read_count, devices, stats = process_file(
-                    full_path,
-                    save_path,
-                    insert_db=args.insert_db,
-                    do_upserts=args.upserts,
-                    dry_run=args.dry_run
-                )
-                total_summary_rows += summary
-                total_heating_devices += dev_count
-                total_heating_readings += read_count
-                all_heating_serial_devices.extend(devices)
-                all_device_stats.append(stats)
+    Args:
+        cur: Open cursor (the caller owns the transaction)
+        rows: Parameter tuples from build_reading_rows()
+        do_upserts: DO UPDATE on conflict instead of DO NOTHING
+        page_size: Rows per INSERT statement
 
-    # Generate device-status.xlsx report if any files were processed
-    if all_device_stats:
-        # Reorder columns for better readability
-        column_order = [
+    Returns:
+        Tuple (inserted, updated, skipped) row counts
+    """
+    if not rows:
+        return 0, 0, 0
+    query = UPSERT_READINGS_QUERY if do_upserts else INSERT_READINGS_QUERY
+    returned = execute_values(cur, query, rows, page_size=page_size, fetch=True)
+    inserted = sum(1 for (was_inserted,) in returned if was_inserted)
+    updated = len(returned) - inserted
+    return inserted, updated, len(rows) - len(returned)
+
+
+def resolve_devices(cur, serials):
+    """
+    Make sure every serial has a heating_device row and return their ids.
+
+    Serials already in the process-wide cache cost nothing; the rest are
+    inserted and looked up together with RESOLVE_DEVICES_QUERY. Pass the
+    result to cache_device_ids() once the transaction has committed.
+
+    Args:
+        cur: Cursor of the transaction that will write the readings
+        serials: Normalized device serials (duplicates allowed)
+
+    Returns:
+        dict: device_serial -> device_id
+    """
+    serials = set(serials)
+    with _device_ids_lock:
+        device_ids = {serial: _device_ids[serial] for serial in serials if serial in _device_ids}
+    missing = sorted(serials - set(device_ids))
+    if missing:
+        cur.execute(RESOLVE_DEVICES_QUERY, {"serials": missing})
+        device_ids.update((serial, device_id) for device_id, serial in cur.fetchall())
+
+        # A device committed by a concurrent run after this statement started
+        # is neither inserted nor visible to it; look it up again
+        unresolved = [serial for serial in missing if serial not in device_ids]
+        if unresolved:
+            cur.execute("SELECT device_id, device_serial FROM heating_device WHERE device_serial = ANY(%s)",
+                        (unresolved,))
+            device_ids.update((serial, device_id) for device_id, serial in cur.fetchall())
+    return device_ids
+
+
+def cache_device_ids(device_ids):
+    """Remember committed serial -> device_id pairs for the rest of the process"""
+    with _device_ids_lock:
+        _device_ids.update(device_ids)
+
+
+def insert_summary_to_db(summary_df, device_stats, do_upserts=False, dry_run=False, local_time=None):
+    """
+    Insert the device and its summary rows in one transaction on a pooled connection.
+
+    Updates device_stats with db_rows_inserted / db_rows_updated /
+    db_rows_skipped, or sets status 'error_multiple_serials' /
+    'error_local_time' / 'error_db_insertion' on failure. local_time holds
+    the time zone settings for build_reading_rows().
+
+    Returns:
+        Tuple (heating_devices_count, heating_device_readings_count,
+        heating_serial_devices) for the JSON summary. The readings count is the
+        number of rows actually written (inserted + updated); in dry-run mode it
+        is the number of rows that would be sent.
+    """
+    return insert_summaries_to_db([(summary_df, device_stats)], do_upserts=do_upserts, dry_run=dry_run,
+                                  local_time=local_time)[0]
+
+
+def insert_summaries_to_db(summaries, do_upserts=False, dry_run=False, local_time=None):
+    """
+    Insert several devices and their summary rows in one transaction, as
+    insert_summary_to_db() does for one. A summary that fails its own checks
+    (several serials, local time policy) gets its error status and is left
+    out; if the transaction fails every remaining device gets
+    'error_db_insertion'.
+
+    Args:
+        summaries: List of (summary_df, device_stats), one per device
+
+    Returns:
+        List of insert_summary_to_db() return tuples, one per summary
+    """
+    print("ℹ️  Inserting device into 'heating_device'... this may be skipped if dry-run or conflict")
+    results = [(0, 0, [])] * len(summaries)
+    prepared = []
+    for index, (summary_df, device_stats) in enumerate(summaries):
+        unique_serials = summary_df["MAC Serial #"].unique()
+        if len(unique_serials) != 1:
+            print("❌ More than one distinct device_serial found in summary data. Aborting DB insertion.")
+            device_stats['status'] = 'error_multiple_serials'
+            continue
+
+        serial_for_device = hex_upper(str(unique_serials[0]))  # Normalize serial number format
+        try:
+            rows = build_reading_rows(summary_df, local_time=local_time)
+        except ValueError as e:
+            print(f"❌ Cannot convert local hours to UTC ({e}). Aborting DB insertion.")
+            device_stats['status'] = 'error_local_time'
+            continue
+        if len(rows) < len(summary_df):
+            print(f"⚠️  {len(summary_df) - len(rows)} summary rows dropped: their local hour is ambiguous "
+                  f"or nonexistent (daylight saving time policy 'drop')")
+        prepared.append((index, serial_for_device, rows))
+    if not prepared:
+        return results
+    query = UPSERT_READINGS_QUERY if do_upserts else INSERT_READINGS_QUERY
+
+    if dry_run:
+        serials = [serial for _, serial, _ in prepared]
+        print(f"Dry run: would execute SQL:\n{RESOLVE_DEVICES_QUERY.strip()}\n"
+              f"with parameters {{'serials': {serials!r}}} (skipped once the device is known)")
+        for index, serial_for_device, rows in prepared:
+            print(f"Dry run: would execute SQL:\n{query.strip()}\nwith {len(rows)} rows:")
+            for params in rows:
+                print(f"  {params}")
+            # Placeholder ID for dry run
+            results[index] = (1, len(rows), [{"device_id": 0, "device_serial": serial_for_device}])
+        return results
+
+    try:
+        pool = get_db_pool()
+        conn = pool.getconn()
+    except Exception as e:
+        print(f"❌ Failed to connect to the database: {e}")
+        for index, _, _ in prepared:
+            summaries[index][1]['status'] = 'error_db_insertion'
+        return results
+
+    try:
+        with conn.cursor() as cur:
+            device_ids = resolve_devices(cur, [serial for _, serial, _ in prepared])
+            counts = [write_reading_rows(cur, rows, do_upserts=do_upserts) for _, _, rows in prepared]
+        conn.commit()
+        cache_device_ids(device_ids)
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Failed to insert into 'heating_device'/'heating_device_data': {e}")
+        for index, _, _ in prepared:
+            summaries[index][1]['status'] = 'error_db_insertion'
+        return results
+    finally:
+        pool.putconn(conn)
+
+    for (index, serial_for_device, _), (inserted, updated, skipped) in zip(prepared, counts):
+        device_stats = summaries[index][1]
+        device_stats['db_rows_inserted'] = inserted
+        device_stats['db_rows_updated'] = updated
+        device_stats['db_rows_skipped'] = skipped
+        print(f"✅ Data insertion complete: {inserted} inserted, {updated} updated, {skipped} skipped (already present).")
+        results[index] = (1, inserted + updated, [{"device_id": device_ids[serial_for_device],
+                                                   "device_serial": serial_for_device}])
+    return results
+
+
+def new_device_stats(filepath, sheet_name=None):
+    """
+    Return the initial device statistics dictionary for one input file
+    (one sheet of it for a multi-device workbook).
+    These fields make up the rows of the device status report.
+    """
+    return {
+        'filepath': filepath,
+        'sheet_name': sheet_name,
+        'device_name': None,
+        'device_serial': None,
+        'test_run_rows': 0,
+        'supply_min': None,
+        'supply_max': None,
+        'supply_mean': None,
+        'return_min': None,
+        'return_max': None,
+        'return_mean': None,
+        'diff_min': None,
+        'diff_max': None,
+        'diff_mean': None,
+        'rows_above_7c_threshold': 0,
+        'rows_supply_gt_return': 0,
+        'heating_groups_detected': 0,
+        'valid_heating_groups': 0,
+        'summary_rows': 0,
+        'output_path': None,
+        'parquet_path': None,
+        'db_rows_inserted': 0,
+        'db_rows_updated': 0,
+        'db_rows_skipped': 0,
+        'cache_hit': False,
+        'state_path': None,
+        'total_seconds': None,
+        'peak_rss_mb': None,
+        'stage_seconds': {},
+        'stage_peak_mb': {},
+        'status': 'unknown'
+    }
+
+
+@contextmanager
+def pipeline_stage(device_stats, stage):
+    """
+    Time one process_file() stage into device_stats['stage_seconds'][stage].
+
+    When tracemalloc is tracing (--trace-memory), the peak Python allocation
+    during the stage is recorded in device_stats['stage_peak_mb'][stage].
+    A stage entered more than once accumulates its time and keeps its
+    highest peak.
+    """
+    import tracemalloc
+
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = device_stats['stage_seconds']
+        seconds[stage] = round(seconds.get(stage, 0.0) + time.perf_counter() - start, 4)
+        if tracing:
+            peak_mb = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+            device_stats['stage_peak_mb'][stage] = max(device_stats['stage_peak_mb'].get(stage, 0.0), peak_mb)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far in MB (None where unavailable)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def timing_fields(device_stats):
+    """
+    Status report fields for a file's timings: time_total_s, time_{stage}_s
+    per stage in run order, peak_rss_mb and peak_{stage}_mb when memory was
+    traced. Empty for results that never ran through process_file().
+    """
+    if device_stats.get('total_seconds') is None:
+        return []
+    return (['time_total_s']
+            + [f'time_{stage}_s' for stage in device_stats['stage_seconds']]
+            + ['peak_rss_mb']
+            + [f'peak_{stage}_mb' for stage in device_stats['stage_peak_mb']])
+
+
+def timing_value(device_stats, field):
+    """Value and status report comment for a field from timing_fields()"""
+    total = device_stats['total_seconds']
+    if field == 'time_total_s':
+        return total, 'Wall time for this file'
+    if field == 'peak_rss_mb':
+        return device_stats['peak_rss_mb'], 'Peak resident memory of the process so far'
+    if field.startswith('time_'):
+        seconds = device_stats['stage_seconds'][field[len('time_'):-len('_s')]]
+        pct = (seconds / total * 100) if total else 0
+        return seconds, f'{pct:.1f}% of total'
+    return device_stats['stage_peak_mb'][field[len('peak_'):-len('_mb')]], 'Peak traced Python memory during this stage'
+
+
+def status_comment(device_stats, field, value):
+    """Explanatory comment of the status report for one field of one file ('' if none)"""
+    if field == 'status':
+        if value == 'no_heating_detected':
+            return 'NO HEATING: Supply temp never exceeded return by required 7°C'
+        elif value == 'heating_failed_validation':
+            return 'VALIDATION FAILED: Heating detected but could not sustain 7°C for 60% of cycle'
+        elif value == 'success':
+            return 'SUCCESS: Valid heating cycles detected and processed'
+        elif value == 'error_processing':
+            return f"PROCESSING FAILED: {device_stats.get('error', 'unknown error')}"
+        elif value == 'no_new_data':
+            return 'NO NEW DATA: Every Test Run minute was already processed for this device'
+        elif value == 'error_local_time':
+            return 'LOCAL TIME: A summary hour is ambiguous or nonexistent in the device time zone (DST policy error)'
+        elif value == 'error_unordered_rows':
+            return 'UNORDERED: Incremental mode needs Test Run rows in time order'
+
+    elif field == 'summary_rows':
+        if value == 0:
+            return 'ZERO OUTPUT: No valid heating hours generated for database insertion'
+
+    elif field == 'diff_max':
+        if isinstance(value, (int, float)):
+            if value < 7.0:
+                return f'BELOW THRESHOLD: Max differential {value:.1f}°C < 7.0°C required for validation'
+            elif value >= 7.0:
+                return f'Above 7°C threshold (validation requirement met for this metric)'
+
+    elif field == 'diff_mean':
+        if isinstance(value, (int, float)):
+            if value < 0:
+                return 'NEGATIVE: Supply cooler than return (indicates cooling mode or sensor issue)'
+            elif value >= 0 and value < 7.0:
+                return 'POSITIVE but below 7°C: Some heating activity but insufficient for validation'
+
+    elif field == 'rows_above_7c_threshold':
+        if value == 0:
+            return 'CRITICAL: No rows met 7°C validation threshold - cannot generate valid heating cycles'
+        elif isinstance(value, int) and value > 0:
+            total_rows = device_stats.get('test_run_rows', 1)
+            pct = (value / total_rows * 100) if total_rows > 0 else 0
+            return f'{pct:.1f}% of total rows meet 7°C threshold'
+
+    elif field == 'valid_heating_groups':
+        detected = device_stats.get('heating_groups_detected', 0)
+        if value == 0 and detected > 0:
+            return f'VALIDATION FAILED: {detected} groups detected but none sustained 7°C for 60% of cycle'
+        elif value > 0:
+            return f'{value}/{detected} detected groups passed 60% validation rule'
+
+    elif field == 'heating_groups_detected':
+        if value == 0:
+            return 'No temperature patterns triggered heating detection (>5°C jump + supply>return)'
+        elif value > 0:
+            return f'{value} potential heating cycles detected (requires validation)'
+    return ''
+
+
+def status_report_records(all_device_stats, column_order):
+    """
+    One flat record per file for the machine-readable status report: the
+    column_order fields, the file's timing fields and, for failed files, the
+    error message.
+
+    Args:
+        all_device_stats: device statistics of the run, in report order
+        column_order: status report fields in display order
+
+    Returns:
+        list of dicts
+    """
+    records = []
+    for stats in all_device_stats:
+        record = {field: stats.get(field) for field in column_order}
+        for field in timing_fields(stats):
+            record[field] = timing_value(stats, field)[0]
+        if stats.get('error') is not None:
+            record['error'] = stats['error']
+        records.append(record)
+    return records
+
+
+def status_report_rows(records, all_device_stats):
+    """
+    The vertical layout of the .xlsx status report: one (field, value,
+    comment) row per field, with a blank row between files.
+    """
+    rows = []
+    for idx, (record, stats) in enumerate(zip(records, all_device_stats)):
+        # Add blank row separator between records (except before first)
+        if idx > 0:
+            rows.append(['', '', ''])
+        for field, value in record.items():
+            if field == 'error':
+                continue  # shown in the status comment
+            if field.startswith('time_') or field.startswith('peak_'):
+                comment = timing_value(stats, field)[1]
+            else:
+                comment = status_comment(stats, field, value)
+            rows.append([field, value, comment])
+    return rows
+
+
+def write_status_workbook(path, rows):
+    """
+    Write the vertical status report in a single pass: a write-only workbook
+    with bold field names, left-aligned values and column widths computed
+    from the rows themselves, instead of saving with pandas and reloading the
+    file to style and measure every cell.
+
+    Args:
+        path: .xlsx path to write
+        rows: status_report_rows() output
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+    from openpyxl.utils import get_column_letter
+
+    header = ['Field', 'Value', 'Comment']
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+
+    # Auto-size all columns to fit content (widths must be set before rows are streamed)
+    for i, name in enumerate(header):
+        max_length = max([len(name)] + [len(str(row[i])) for row in rows if row[i] is not None])
+        ws.column_dimensions[get_column_letter(i + 1)].width = min(max_length + 2, 100)  # Cap at 100
+
+    # Header styled like pandas' to_excel(), field names bold, values left-justified
+    thin = Side(style='thin')
+    header_font = Font(bold=True)
+    header_border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    header_alignment = Alignment(horizontal='center', vertical='top')
+    left_align = Alignment(horizontal='left')
+    header_cells = []
+    for name in header:
+        cell = WriteOnlyCell(ws, value=name)
+        cell.font, cell.border, cell.alignment = header_font, header_border, header_alignment
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    # Rows are serialized as they are appended, so one styled cell per column
+    # is reused for all of them (as openpyxl does for plain values)
+    field_cell, value_cell, comment_cell = (WriteOnlyCell(ws) for _ in header)
+    field_cell.font = header_font
+    value_cell.alignment = left_align
+    for field_cell.value, value_cell.value, comment_cell.value in rows:
+        ws.append([field_cell, value_cell, comment_cell])
+    wb.save(path)
+
+
+def write_status_records(path, records, fmt):
+    """
+    Write the machine-readable status report: CSV with one row per file
+    (columns are the union of the records' fields), or JSONL with one object
+    per file.
+    """
+    import math
+
+    def plain(value):
+        # numpy scalars as Python numbers, NaN (e.g. a missing device name) as empty
+        value = value.item() if hasattr(value, 'item') else value
+        return None if isinstance(value, float) and math.isnan(value) else value
+
+    records = [{field: plain(value) for field, value in record.items()} for record in records]
+    if fmt == 'jsonl':
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + '\n')
+        return
+    fields = list(dict.fromkeys(field for record in records for field in record))
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def highlight_heating_rows(ws, df):
+    """
+    Highlight the "Supply Temp/C" and "Heating" cells of every row where
+    Heating == "On" in light orange (version1a's highlighting).
+
+    Uses a single conditional formatting rule on the sheet written from df
+    instead of styling cells one by one, so the workbook does not have to be
+    reloaded and saved a second time.
+    """
+    from openpyxl.formatting.rule import FormulaRule
+    from openpyxl.styles import PatternFill
+    from openpyxl.utils import get_column_letter
+
+    if "Heating" not in df.columns or df.empty:
+        return
+
+    light_orange_fill = PatternFill(start_color="FFD8B1", end_color="FFD8B1", fill_type="solid")
+    last_row = len(df) + 1  # Row 1 holds the headers
+    heating_col = get_column_letter(df.columns.get_loc("Heating") + 1)
+
+    ranges = [f"{heating_col}2:{heating_col}{last_row}"]
+    if "Supply Temp/C" in df.columns:
+        supply_col = get_column_letter(df.columns.get_loc("Supply Temp/C") + 1)
+        ranges.insert(0, f"{supply_col}2:{supply_col}{last_row}")
+
+    rule = FormulaRule(formula=[f'${heating_col}2="On"'], fill=light_orange_fill)
+    ws.conditional_formatting.add(" ".join(ranges), rule)
+
+
+def minute_series_path(savepath):
+    """Parquet path for the minute series written next to a "_heat min per hour.xlsx" workbook"""
+    suffix = "_heat min per hour.xlsx"
+    if savepath.endswith(suffix):
+        return savepath[: -len(suffix)] + "_minutes.parquet"
+    return os.path.splitext(savepath)[0] + "_minutes.parquet"
+
+
+def minute_series_frame(df_filtered):
+    """
+    Typed columnar view of the cleaned minute series (the validated df_filtered):
+    Date (datetime64), Device Name / MAC Serial # / State (categorical),
+    Supply/Return Temp/C (float64), Heating (bool), Heating_Group (int32).
+    """
+    import pandas as pd
+
+    return pd.DataFrame({
+        "Date": pd.to_datetime(df_filtered["Date"]).to_numpy(),
+        "Device Name": pd.Categorical(df_filtered["Device Name"]),
+        "MAC Serial #": pd.Categorical(df_filtered["MAC Serial #"]),
+        "Supply Temp/C": df_filtered["Supply Temp/C"].to_numpy(dtype="float64"),
+        "Return Temp/C": df_filtered["Return Temp/C"].to_numpy(dtype="float64"),
+        "State": pd.Categorical(df_filtered["State"]),
+        "Heating": df_filtered["Heating"].to_numpy(dtype=bool),
+        "Heating_Group": df_filtered["Heating_Group"].to_numpy(dtype="int32"),
+    })
+
+
+def write_minute_series(df_filtered, path):
+    """Write the cleaned minute series to Parquet (requires pyarrow)"""
+    minute_series_frame(df_filtered).to_parquet(path, index=False)
+
+
+def load_minute_series(path):
+    """Load a minute series written by write_minute_series()"""
+    import pandas as pd
+
+    return pd.read_parquet(path)
+
+
+def summarize_minute_series(minutes, redetect=False, on_delta=5, off_delta=-2.7,
+                            min_diff=7, min_fraction=0.6, min_minutes=55):
+    """
+    Rebuild the "Heat Cleaned Data" rows from a minute series without Excel.
+
+    By default the stored (already validated) Heating column is used, which
+    reproduces process_file()'s summary exactly. With redetect=True, heating
+    detection and group validation are rerun on the stored temperatures with
+    the given thresholds instead.
+
+    Args:
+        minutes: Frame from load_minute_series() / minute_series_frame()
+        redetect: Rerun detect_heating() and validate_heating_groups()
+        on_delta, off_delta: Detection thresholds (redetect only)
+        min_diff, min_fraction: Validation thresholds (redetect only)
+        min_minutes: Minutes of consistent Enable/Disable required per hour
+
+    Returns:
+        Summary DataFrame in the same layout as process_file() produces
+    """
+    import pandas as pd
+
+    heating_on = minutes["Heating"].to_numpy(dtype=bool)
+    if redetect:
+        _, heating_group = detect_heating(minutes["Supply Temp/C"], minutes["Return Temp/C"],
+                                          on_delta=on_delta, off_delta=off_delta)
+        groups = pd.DataFrame({
+            "Supply Temp/C": minutes["Supply Temp/C"],
+            "Return Temp/C": minutes["Return Temp/C"],
+            "Heating_Group": heating_group,
+        })
+        valid_groups, _ = validate_heating_groups(groups, min_diff=min_diff, min_fraction=min_fraction)
+        heating_on = groups["Heating_Group"].isin(valid_groups).to_numpy() & (heating_group > 0)
+
+    frame = pd.DataFrame({
+        "Device Name": minutes["Device Name"].astype(object),
+        "MAC Serial #": minutes["MAC Serial #"].astype(object),
+        "Date": minutes["Date"],
+        "Enable": (minutes["State"] == "Enable").to_numpy(),
+        "Disable": (minutes["State"] == "Disable").to_numpy(),
+        "Heating": heating_on,
+        "Hour": minutes["Date"].dt.floor("h"),
+    })
+    heat_data_set = frame[frame["Hour"].isin(frame.loc[heating_on, "Hour"].unique())]
+    return summarize_heating_hours(heat_data_set, min_minutes=min_minutes)
+
+
+def summary_from_parquet(path, **kwargs):
+    """Load a Parquet minute series and rebuild its summary (see summarize_minute_series)"""
+    return summarize_minute_series(load_minute_series(path), **kwargs)
+
+
+def sweep_minutes(minutes, grid):
+    """
+    Evaluate a grid of detection thresholds on one cleaned minute series.
+
+    Gives for every parameter set what detect_heating(),
+    validate_heating_groups() and summarize_heating_hours() would, but shares
+    the work: detection runs once per (on_delta, off_delta) pair, the 60% rule
+    fractions of the groups once per min_diff and the hourly Enable/Disable
+    minutes once in total, so each further set costs a few bincounts.
+
+    Args:
+        minutes: Minute frame with Date, Supply Temp/C, Return Temp/C and
+            State (read_test_run()'s cleaned rows or load_minute_series())
+        grid: dict with a list of values for every DETECTION_PARAMS key
+
+    Returns:
+        DataFrame with one row per parameter set, in itertools.product()
+        order over the DETECTION_PARAMS keys: the thresholds, then
+        groups_detected, groups_valid, summary_rows, enable_hours,
+        disable_hours, heating_minutes, enable_heating_minutes and
+        disable_heating_minutes
+    """
+    import numpy as np
+    import pandas as pd
+
+    supply = minutes["Supply Temp/C"].to_numpy(dtype=float)
+    return_temp = minutes["Return Temp/C"].to_numpy(dtype=float)
+    hour_index, hours = pd.factorize(pd.to_datetime(minutes["Date"]).dt.floor("h"))
+    n_hours = len(hours)
+    enable_minutes = np.bincount(hour_index, weights=(minutes["State"] == "Enable").to_numpy(), minlength=n_hours)
+    disable_minutes = np.bincount(hour_index, weights=(minutes["State"] == "Disable").to_numpy(), minlength=n_hours)
+
+    rows = []
+    for on_delta, off_delta in itertools.product(grid["on_delta"], grid["off_delta"]):
+        _, heating_group = detect_heating(supply, return_temp, on_delta=on_delta, off_delta=off_delta)
+        group_sizes = np.bincount(heating_group, minlength=1)  # index 0 counts the rows not heating
+        for min_diff in grid["min_diff"]:
+            meets_diff = supply >= return_temp + min_diff
+            with np.errstate(invalid="ignore", divide="ignore"):
+                fractions = np.bincount(heating_group, weights=meets_diff, minlength=1) / group_sizes
+            for min_fraction in grid["min_fraction"]:
+                valid = fractions >= min_fraction
+                valid[0] = False
+                heating_minutes = np.bincount(hour_index, weights=valid[heating_group], minlength=n_hours)
+                heated = heating_minutes > 0
+                for min_minutes in grid["min_minutes"]:
+                    enabled = heated & (enable_minutes >= min_minutes)
+                    disabled = heated & (disable_minutes >= min_minutes)
+                    rows.append((on_delta, off_delta, min_diff, min_fraction, min_minutes,
+                                 len(group_sizes) - 1, int(valid.sum()),
+                                 int((enabled | disabled).sum()), int(enabled.sum()), int(disabled.sum()),
+                                 int(heating_minutes[enabled | disabled].sum()),
+                                 int(heating_minutes[enabled].sum()), int(heating_minutes[disabled].sum())))
+    return pd.DataFrame(rows, columns=list(DETECTION_PARAMS) + SWEEP_METRICS)
+
+
+def sweep_file(filepath, grid, sheet_name=None):
+    """
+    One `hcd.py sweep` input: load and clean a device sheet once (or load a
+    Parquet minute series) and evaluate the grid on it with sweep_minutes().
+
+    Returns:
+        sweep_minutes() frame with filepath, sheet_name, device_name and
+        device_serial columns in front
+    """
+    if filepath.endswith(".parquet"):
+        minutes = load_minute_series(filepath)
+        device_name = minutes["Device Name"].iloc[0] if len(minutes) else None
+        device_serial = minutes["MAC Serial #"].iloc[0] if len(minutes) else None
+    else:
+        device_stats = new_device_stats(filepath, sheet_name)
+        loaded = read_test_run(filepath, device_stats, 0 if sheet_name is None else sheet_name)
+        if loaded is None:
+            raise ValueError(f"cannot read the Test Run rows ({device_stats['status']})")
+        minutes = loaded[1]
+        device_name, device_serial = device_stats['device_name'], device_stats['device_serial']
+
+    result = sweep_minutes(minutes, grid)
+    for position, (column, value) in enumerate([("filepath", filepath), ("sheet_name", sheet_name),
+                                                ("device_name", device_name), ("device_serial", device_serial)]):
+        result.insert(position, column, value)
+    return result
+
+
+def device_state_path(state_dir, serial):
+    """Path of a device's incremental state file"""
+    return os.path.join(state_dir, f"{serial}.json")
+
+
+def load_device_state(state_dir, serial):
+    """Return the committed incremental state of a device, or None for a new device"""
+    try:
+        with open(device_state_path(state_dir, serial)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_device_state(state_dir, serial, state, pending=False):
+    """
+    Write a device's incremental state atomically. With pending=True it is
+    written next to the committed state and only takes effect when
+    commit_device_state() is called.
+    """
+    os.makedirs(state_dir, exist_ok=True)
+    path = device_state_path(state_dir, serial) + (".pending" if pending else "")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def commit_device_state(state_path):
+    """Make the pending state written by stream_heating_summary() the committed one"""
+    os.replace(state_path + ".pending", state_path)
+
+
+class UnorderedExportError(ValueError):
+    """A streamed export has Test Run rows that go back in time"""
+
+
+def stream_heating_summary(filepath, device_stats, chunk_rows=50000, sheet_name=0,
+                           on_delta=5, off_delta=-2.7, min_diff=7, min_fraction=0.6, min_minutes=55,
+                           state_dir=None):
+    """
+    Produce process_file()'s "Heat Cleaned Data" rows in bounded memory.
+
+    The sheet is read in chunks of chunk_rows rows. Everything the in-memory
+    path derives from the whole minute series is carried across chunks
+    instead: the last row (its timestamp may repeat in the next chunk), the
+    1-minute grid anchor, the detection state (previous temperatures and the
+    open heating group), per-group 60% rule counters, per-hour Enable/Disable
+    and heating minute counts, and running temperature statistics. An hour
+    is summarized as soon as it has ended and every heating group touching it
+    has ended, so only the open hour and group are kept.
+
+    The Test Run rows must be in time order (as device exports are);
+    otherwise UnorderedExportError is raised and the caller should use the
+    in-memory path. Device name/serial, statistics and status are written
+    into device_stats as process_file() does (means may differ from the
+    in-memory values in the last bits because they are summed per chunk).
+
+    With state_dir, the device's saved state (see save_device_state) is
+    resumed: Test Run rows at or before its last processed timestamp are
+    skipped, and detection, open groups and unfinished hours continue where
+    the previous upload stopped. At the end the open group and unfinished
+    hours are not closed but saved as the device's pending state, to be
+    committed with commit_device_state() once the results are stored.
+
+    Yields:
+        Tuple (hour, enabled, disabled, heating_on_minutes) per summary row,
+        in hour order
+    """
+    import numpy as np
+    import pandas as pd
+    from pandas.io.parsers import TextParser
+
+    rows = iter_sheet_rows(filepath, sheet_name)
+    device_name = float("nan")
+    mac_serial = "nan"
+    header = None
+    for row_number, row in enumerate(rows):
+        if row_number == 0 and len(row) > 1 and row[1] != "":
+            device_name = row[1]
+        elif row_number == 1 and row and row[0] != "":
+            mac_serial = str(row[0]).replace("DevID: ", "")
+        if is_header_row(row):
+            header = [str(value) for value in row]
+            break
+    if header is None:
+        raise ValueError(f"No 'State' header row found in: {filepath}")
+    columns = [header.index(name) for name in ("Date", "State", "Supply Temp/C", "Return Temp/C")]
+
+    print(f"📄 Processing file: {filepath} (streaming, {chunk_rows} rows per chunk)")
+    device_stats['device_name'] = device_name
+    device_stats['device_serial'] = hex_upper(mac_serial)
+    resumed = load_device_state(state_dir, device_stats['device_serial']) if state_dir else None
+
+    # The in-memory path drops all-empty columns before renaming the 7th to
+    # "Note", so the Note column is known once the first seven columns have
+    # data (normally in the first chunk); until then parsed chunks are held.
+    has_data = []
+    note_column = None
+
+    carry = None        # last Test Run row, deduplicated against the next chunk
+    grid_start = None
+    last_date = None
+    prev = None         # (supply, return, group) of the last analyzed row
+    group_count = 0
+    open_groups = {}    # group -> [rows meeting min_diff, rows] until the group ends
+    group_valid = {}    # ended group -> passed the 60% rule
+    hours = {}          # unfinished hour -> [Enable rows, Disable rows, {group: minutes}]
+    totals = {"rows": 0, "gt_zero": 0, "above": 0, "valid": 0}
+    resume_after = None
+    if resumed:
+        resume_after = pd.Timestamp(resumed["last_date"])
+        last_date = resume_after
+        grid_start = pd.Timestamp(resumed["grid_start"])
+        prev = tuple(resumed["prev"]) if resumed["prev"] else None
+        group_count = resumed["group_count"]
+        open_groups = {int(group): counter for group, counter in resumed["open_groups"].items()}
+        group_valid = {int(group): valid for group, valid in resumed["group_valid"].items()}
+        hours = {pd.Timestamp(h): [enable, disable, {int(group): count for group, count in by_group.items()}]
+                 for h, enable, disable, by_group in resumed["hours"]}
+        print(f"↪️  Resuming {device_stats['device_serial']} after {resume_after}")
+    first_group = group_count
+    extremes = {}
+    sums = {}
+
+    def parse(chunk):
+        width = max(len(header), max(len(row) for row in chunk))
+        frame = TextParser([row + [""] * (width - len(row)) for row in chunk],
+                           header=None, skip_blank_lines=False).read()
+        has_data.extend([False] * (width - len(has_data)))
+        for position, present in frame.notna().any().items():
+            has_data[position] = has_data[position] or bool(present)
+        return frame
+
+    def clean(frame):
+        nonlocal carry, grid_start, last_date
+        frame = frame.reindex(columns=range(max(frame.shape[1], note_column + 1)))
+        test_run = frame[frame[note_column] == "Test Run"]
+        data = pd.DataFrame({
+            "Date": parse_export_dates(test_run[columns[0]]),
+            "State": test_run[columns[1]],
+            "Supply": test_run[columns[2]],
+            "Return": test_run[columns[3]],
+        }).dropna(subset=["Date"])
+        if resume_after is not None:
+            data = data[data["Date"] > resume_after]
+        if carry is not None:
+            data = pd.concat([carry, data], ignore_index=True)
+        if data.empty:
+            return None
+
+        dates = data["Date"]
+        if not dates.is_monotonic_increasing:
+            raise UnorderedExportError(f"Test Run rows are not in time order in: {filepath}")
+        last_date = dates.iloc[-1]
+        if grid_start is None:
+            grid_start = dates.iloc[0]
+
+        # Keep the last row of each run of equal timestamps; the final row
+        # waits for the next chunk, which may repeat its timestamp
+        keep = (dates != dates.shift(-1)).to_numpy()
+        carry = data.iloc[[-1]]
+        return on_grid(data.iloc[:-1][keep[:-1]])
+
+    def on_grid(data):
+        # Only minutes on the 1-minute grid from the first timestamp survive the
+        # reindex, and rows missing State or a temperature are discarded
+        aligned = (data["Date"] - grid_start) % pd.Timedelta(minutes=1) == pd.Timedelta(0)
+        return data[aligned].dropna(subset=["State", "Supply", "Return"])
+
+    def end_group(group):
+        group_hits, group_rows = open_groups.pop(group)
+        group_valid[group] = group_hits / group_rows >= min_fraction
+        totals["valid"] += group_valid[group]
+
+    def analyze(data):
+        nonlocal prev, group_count
+        if data.empty:
+            return
+        supply = data["Supply"].to_numpy(dtype=float)
+        return_temp = data["Return"].to_numpy(dtype=float)
+        diff = supply - return_temp
+
+        totals["rows"] += len(data)
+        totals["gt_zero"] += int((diff > 0).sum())
+        totals["above"] += int((diff >= 7.0).sum())
+        for key, values in (("supply", supply), ("return", return_temp), ("diff", diff)):
+            low, high = extremes.get(key, (values.min(), values.max()))
+            extremes[key] = (min(low, values.min()), max(high, values.max()))
+            sums[key] = sums.get(key, 0.0) + values.sum()
+
+        # Detection continues from the previous row and its open group
+        if prev is None:
+            _, local = detect_heating(supply, return_temp, on_delta=on_delta, off_delta=off_delta)
+            offset = group_count
+        else:
+            _, local = detect_heating(np.r_[prev[0], supply], np.r_[prev[1], return_temp],
+                                      on_delta=on_delta, off_delta=off_delta, heating_at_start=prev[2] > 0)
+            local = local[1:]
+            offset = group_count - 1 if prev[2] > 0 else group_count
+        groups = np.where(local > 0, local + offset, 0)
+        group_count = max(group_count, int(groups.max()))
+        prev = (supply[-1], return_temp[-1], int(groups[-1]))
+
+        in_group = groups > 0
+        meets = supply[in_group] >= return_temp[in_group] + min_diff
+        per_group = pd.DataFrame({"meets": meets, "rows": 1}).groupby(groups[in_group]).sum()
+        for group, (group_hits, group_rows) in zip(per_group.index.tolist(), per_group.to_numpy().tolist()):
+            counter = open_groups.setdefault(group, [0, 0])
+            counter[0] += group_hits
+            counter[1] += group_rows
+        for group in [group for group in open_groups if group != prev[2]]:
+            end_group(group)
+
+        hour = data["Date"].dt.floor("h").to_numpy()
+        state = data["State"].to_numpy()
+        per_hour = pd.DataFrame({"enable": state == "Enable", "disable": state == "Disable"}).groupby(hour).sum()
+        for h, (enable, disable) in zip(per_hour.index, per_hour.to_numpy().tolist()):
+            counter = hours.setdefault(h, [0, 0, {}])
+            counter[0] += enable
+            counter[1] += disable
+        minutes = pd.Series(1, index=pd.MultiIndex.from_arrays([hour[in_group], groups[in_group]]))
+        for (h, group), count in minutes.groupby(level=[0, 1]).sum().items():
+            by_group = hours[h][2]
+            by_group[int(group)] = by_group.get(int(group), 0) + int(count)
+
+    def finished_hours(final=False):
+        current = last_date.floor("h") if last_date is not None else None
+        for h in sorted(hours):
+            enable, disable, by_group = hours[h]
+            if not final and (h >= current or any(group not in group_valid for group in by_group)):
+                break
+            del hours[h]
+            heating_on = sum(count for group, count in by_group.items() if group_valid[group])
+            if heating_on and (enable >= min_minutes or disable >= min_minutes):
+                yield pd.Timestamp(h), enable >= min_minutes, disable >= min_minutes, heating_on
+        referenced = {group for _, _, by_group in hours.values() for group in by_group}
+        for group in [group for group in group_valid if group not in referenced]:
+            del group_valid[group]
+
+    def process(frame):
+        data = clean(frame)
+        if data is not None:
+            analyze(data)
+        yield from finished_hours()
+
+    held = []
+    chunk = []
+    for row in rows:
+        if row:
+            chunk.append(row)
+        if len(chunk) < chunk_rows:
+            continue
+        held.append(parse(chunk))
+        chunk = []
+        if note_column is None and len(has_data) >= 7 and all(has_data[:7]):
+            note_column = 6
+        if note_column is not None:
+            for frame in held:
+                yield from process(frame)
+            held = []
+    if chunk:
+        held.append(parse(chunk))
+
+    data_columns = [position for position, present in enumerate(has_data) if present]
+    if len(data_columns) < 7:
+        print(f"❌ Not enough columns to rename 7th column to 'Note' in: {filepath}")
+        device_stats['status'] = 'error_insufficient_columns'
+        return
+    if note_column is None:
+        note_column = data_columns[6]
+    for frame in held:
+        yield from process(frame)
+    if carry is not None:
+        analyze(on_grid(carry))
+    if state_dir:
+        # Whatever is still open continues with the next upload
+        yield from finished_hours()
+        if last_date is not None:
+            save_device_state(state_dir, device_stats['device_serial'], {
+                "last_date": last_date.isoformat(),
+                "grid_start": grid_start.isoformat(),
+                "prev": [float(prev[0]), float(prev[1]), int(prev[2])] if prev else None,
+                "group_count": group_count,
+                "open_groups": {str(group): counter for group, counter in open_groups.items()},
+                "group_valid": {str(group): bool(valid) for group, valid in group_valid.items()},
+                "hours": [[h.isoformat(), enable, disable, {str(group): count for group, count in by_group.items()}]
+                          for h, (enable, disable, by_group) in sorted(hours.items())],
+            }, pending=True)
+            device_stats['state_path'] = device_state_path(state_dir, device_stats['device_serial'])
+    else:
+        if prev is not None and prev[2] in open_groups:
+            end_group(prev[2])
+        yield from finished_hours(final=True)
+
+    rows_count = totals["rows"]
+    device_stats['test_run_rows'] = rows_count
+    for key in ("supply", "return", "diff"):
+        low, high = extremes.get(key, (float("nan"), float("nan")))
+        device_stats[f'{key}_min'] = float(low)
+        device_stats[f'{key}_max'] = float(high)
+        device_stats[f'{key}_mean'] = float(sums[key] / rows_count) if rows_count else float("nan")
+    device_stats['rows_above_7c_threshold'] = totals["above"]
+    device_stats['rows_supply_gt_return'] = totals["gt_zero"]
+    device_stats['heating_groups_detected'] = group_count - first_group
+    device_stats['valid_heating_groups'] = totals["valid"]
+
+
+def summarize_workbook_stream(filepath, device_stats, chunk_rows=50000, state_dir=None, sheet_name=0,
+                              detection=None):
+    """
+    Collect stream_heating_summary() rows (with the detection thresholds,
+    default DETECTION_PARAMS) into the same summary DataFrame as the
+    in-memory path.
+    """
+    import numpy as np
+    import pandas as pd
+
+    rows = list(stream_heating_summary(filepath, device_stats, chunk_rows=chunk_rows, sheet_name=sheet_name,
+                                       state_dir=state_dir, **(detection or DETECTION_PARAMS)))
+    if not rows:
+        return pd.DataFrame([])
+    hours, enabled, disabled, heating_on = zip(*rows)
+    return summary_frame(
+        [device_stats['device_name']] * len(rows),
+        [device_stats['device_serial']] * len(rows),
+        list(hours),
+        enabled,
+        disabled,
+        np.array(heating_on, dtype=np.int64)
+    )
+
+
+def file_cache_key(filepath, settings):
+    """
+    Cache key for one input: SHA-256 of the file content plus the settings
+    (detection thresholds, output options, DB write mode, local time) that determine the result.
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    digest.update(json.dumps(settings, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def load_cached_result(cache_dir, key):
+    """
+    Return the cache entry for key, or None on a miss. An entry whose output
+    files no longer exist counts as a miss. Hits are touched so eviction
+    drops the least recently used entries first.
+    """
+    path = os.path.join(cache_dir, f"{key}.pkl")
+    try:
+        with open(path, 'rb') as f:
+            entry = pickle.load(f)
+    except (OSError, pickle.PickleError, EOFError):
+        return None
+
+    outputs = [entry['device_stats'].get('output_path'), entry['device_stats'].get('parquet_path')]
+    if not all(os.path.exists(output) for output in outputs if output):
+        return None
+
+    os.utime(path)
+    return entry
+
+
+def store_cached_result(cache_dir, key, entry, max_bytes):
+    """
+    Write a cache entry atomically, then evict least recently used entries
+    until the cache directory is within max_bytes.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{key}.pkl")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(".pkl"):
+            try:
+                info = os.stat(os.path.join(cache_dir, name))
+            except OSError:
+                continue
+            entries.append((info.st_mtime, info.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        if name == f"{key}.pkl":
+            continue
+        try:
+            os.remove(os.path.join(cache_dir, name))
+            total -= size
+        except OSError:
+            pass
+
+
+def replay_cached_result(entry, filepath, insert_db=False, do_upserts=False, dry_run=False,
+                         cache_dir=None, key=None, max_bytes=None, local_time=None, pending_writes=None):
+    """
+    Build process_file()'s return value from a cache entry.
+
+    The DB write is skipped when this content was already written by a
+    previous live run; its readings are then reported as skipped. Otherwise
+    (first live --insert-db run for this content, or a dry run) the cached
+    summary rows go through insert_summary_to_db() as usual, or are added to
+    pending_writes (see insert_and_cache()).
+    """
+    print(f"♻️  Cache hit, reusing previous result for: {filepath}")
+    summary_df = entry['summary_df']
+    # Timings describe this run, not the one that filled the cache
+    device_stats = dict(entry['device_stats'], filepath=filepath, cache_hit=True,
+                        stage_seconds={}, stage_peak_mb={})
+
+    if not insert_db or summary_df.empty:
+        return entry['summary_rows'], 0, 0, [], device_stats
+
+    if entry['db_written'] and not dry_run:
+        print(f"ℹ️  Skipping DB insertion: {len(summary_df)} rows already written for this file content")
+        device_stats['db_rows_skipped'] = len(summary_df)
+        return entry['summary_rows'], len(entry['db_devices']), 0, list(entry['db_devices']), device_stats
+
+    if pending_writes is not None:
+        pending_writes.append(dict(device_stats=device_stats, summary_df=summary_df, cache_entry=entry,
+                                   cache_dir=cache_dir, cache_key=key, cache_max_bytes=max_bytes, cached=True))
+        return entry['summary_rows'], 0, 0, [], device_stats
+
+    with pipeline_stage(device_stats, 'db_insert'):
+        heating_devices_count, readings_count, heating_serial_devices = insert_summary_to_db(
+            summary_df, device_stats, do_upserts=do_upserts, dry_run=dry_run, local_time=local_time
+        )
+    if not dry_run and not device_stats['status'].startswith('error_'):
+        store_cached_result(cache_dir, key, dict(entry, db_written=True, db_devices=heating_serial_devices),
+                            max_bytes)
+    return entry['summary_rows'], heating_devices_count, readings_count, heating_serial_devices, device_stats
+
+
+def parse_export_dates(values):
+    """
+    Parse an export's Date column ("2025-04-11 23:58") with an explicit
+    ISO 8601 format. Left to infer it, pandas gives up on a first value
+    whose day and month are equal and parses every element with dateutil,
+    so stream chunks and whole files would not be parsed alike. Other
+    layouts are parsed element by element.
+    """
+    import pandas as pd
+
+    try:
+        return pd.to_datetime(values, format="ISO8601")
+    except (ValueError, TypeError):
+        return pd.to_datetime(values, format="mixed")
+
+
+def clean_timestamps(df):
+    """
+    Step 4 of process_file(): put the Test Run rows on a clean 1-minute series.
+
+    Rows are sorted by Date (stably, so "last" means last in the file),
+    duplicate timestamps keep their last row, and the frame is reindexed onto
+    a 1-minute DatetimeIndex from the first to the last timestamp. The device
+    columns (Device Name, MAC Serial #, Enable, Disable, Note) of missing
+    minutes are carried forward from the previous row; the rest stay empty, so
+    those minutes are dropped along with rows lacking State or temperatures.
+    State and Note become categorical; Enable/Disable stay boolean.
+
+    Returns:
+        Tuple (df, discarded): the cleaned rows, and the duplicates plus every
+        row with an empty cell (missing minutes included) that was removed
+    """
+    import numpy as np
+    import pandas as pd
+
+    columns = list(df.columns)
+    df["Date"] = parse_export_dates(df["Date"])
+    df["State"] = df["State"].astype("category")
+    df["Note"] = df["Note"].astype("category")
+    # Stable sort, so "last" below means the last occurrence in the file
+    df = df.sort_values("Date", kind="stable").reset_index(drop=True)
+
+    # Duplicate timestamps keep their last row, the others are discarded
+    is_duplicate = df["Date"].duplicated(keep="last").to_numpy()
+    duplicates = df[is_duplicate]
+    df = df[~is_duplicate].set_index("Date")
+
+    # Complete 1-minute index; each minute either exists or is a gap
+    full_range = pd.date_range(start=df.index[0], end=df.index[-1], freq="1min")
+    positions = full_range.get_indexer(df.index)
+    fill_cols = ["Device Name", "MAC Serial #", "Enable", "Disable", "Note"]
+    other_cols = [col for col in df.columns if col not in fill_cols]
+
+    # Rows to discard: every gap, plus existing rows with an empty cell
+    is_discarded = np.ones(len(full_range), dtype=bool)
+    is_discarded[positions] = df.isna().any(axis=1).to_numpy()
+
+    filled = df[fill_cols].reindex(full_range, method="ffill")
+    others = df[other_cols].reindex(full_range)
+    df = pd.concat([filled, others], axis=1).rename_axis("Date").reset_index()
+    df = df[["Date"] + [col for col in columns if col != "Date"]]
+
+    discarded = pd.concat([duplicates, df[is_discarded]], ignore_index=True)
+    df = df.dropna(subset=["State", "Supply Temp/C", "Return Temp/C"]).copy()
+    return df, discarded
+
+
+def collect_temperature_stats(df_filtered, device_stats):
+    """Record the supply/return/differential statistics of the device status report"""
+    device_stats['test_run_rows'] = len(df_filtered)
+    device_stats['supply_min'] = float(df_filtered["Supply Temp/C"].min())
+    device_stats['supply_max'] = float(df_filtered["Supply Temp/C"].max())
+    device_stats['supply_mean'] = float(df_filtered["Supply Temp/C"].mean())
+    device_stats['return_min'] = float(df_filtered["Return Temp/C"].min())
+    device_stats['return_max'] = float(df_filtered["Return Temp/C"].max())
+    device_stats['return_mean'] = float(df_filtered["Return Temp/C"].mean())
+
+    # Calculate temperature differential stats
+    temp_diff = df_filtered["Supply Temp/C"] - df_filtered["Return Temp/C"]
+    device_stats['diff_min'] = float(temp_diff.min())
+    device_stats['diff_max'] = float(temp_diff.max())
+    device_stats['diff_mean'] = float(temp_diff.mean())
+    device_stats['rows_above_7c_threshold'] = int((temp_diff >= 7.0).sum())
+    device_stats['rows_supply_gt_return'] = int((temp_diff > 0).sum())
+
+
+# How the boolean minute-frame columns are shown in the output workbook
+DISPLAY_VALUES = {
+    "Enable": {True: 1, False: ""},
+    "Disable": {True: 1, False: ""},
+    "Heating": {True: "On", False: "Off"},
+}
+
+
+def display_frame(frame):
+    """Frame with boolean Enable/Disable/Heating shown as 1 / "" and On / Off for the workbook"""
+    shown = {col: frame[col].map(values) for col, values in DISPLAY_VALUES.items()
+             if col in frame.columns and frame[col].dtype == bool}
+    return frame.assign(**shown) if shown else frame
+
+
+def write_output_workbook(savepath, outputs, summary_df, original_df=None, df=None, heat_data_set=None,
+                          discarded=None):
+    """
+    Save the per-file workbook:
+      full:    all five sheets, Heating == "On" rows highlighted
+      summary: only the "Heat Cleaned Data" sheet
+      none:    no workbook (DB insert / JSON summary only)
+    """
+    import pandas as pd
+
+    if outputs == "full":
+        with pd.ExcelWriter(savepath, engine='openpyxl') as writer:
+            original_df.to_excel(writer, sheet_name="Original Data", index=False)
+            display_frame(df).to_excel(writer, sheet_name="Filtered Test Run", index=False)
+            display_frame(heat_data_set).to_excel(writer, sheet_name="Heating Data Set", index=False)
+            summary_df.to_excel(writer, sheet_name="Heat Cleaned Data", index=False)
+            display_frame(discarded).to_excel(writer, sheet_name="Discarded", index=False)
+
+            # version1a's highlighting, applied while the workbook is still open
+            highlight_heating_rows(writer.sheets["Filtered Test Run"], df)
+    elif outputs == "summary":
+        with pd.ExcelWriter(savepath, engine='openpyxl') as writer:
+            summary_df.to_excel(writer, sheet_name="Heat Cleaned Data", index=False)
+
+
+def set_summary_status(device_stats, summary_rows_count):
+    """Record the summary row count and the resulting processing status"""
+    device_stats['summary_rows'] = summary_rows_count
+    if summary_rows_count > 0:
+        device_stats['status'] = 'success'
+    elif device_stats['rows_above_7c_threshold'] == 0:
+        device_stats['status'] = 'no_heating_detected'
+    else:
+        device_stats['status'] = 'heating_failed_validation'
+
+
+def insert_and_cache(summary_df, device_stats, insert_db=False, do_upserts=False, dry_run=False,
+                     cache_dir=None, cache_key=None, cache_max_bytes=None, local_time=None, pending_writes=None):
+    """
+    Final step of process_file(): insert the summary into the DB if requested
+    and store the result in the cache.
+
+    With a pending_writes list (one sheet of a multi-device workbook) the DB
+    write and the cache entry are appended to it instead, for
+    write_pending_summaries() to write with the workbook's other devices.
+
+    Returns:
+        process_file()'s return tuple
+    """
+    heating_devices_count = 0
+    heating_device_readings_count = 0
+    heating_serial_devices = []
+    cache_entry = {
+        'summary_rows': len(summary_df),
+        'device_stats': dict(device_stats),
+        'summary_df': summary_df,
+    }
+
+    if insert_db and not summary_df.empty:
+        if pending_writes is not None:
+            pending_writes.append(dict(device_stats=device_stats, summary_df=summary_df, cache_entry=cache_entry,
+                                       cache_dir=cache_dir, cache_key=cache_key, cache_max_bytes=cache_max_bytes,
+                                       cached=False))
+            return len(summary_df), 0, 0, [], device_stats
+        with pipeline_stage(device_stats, 'db_insert'):
+            heating_devices_count, heating_device_readings_count, heating_serial_devices = insert_summary_to_db(
+                summary_df, device_stats, do_upserts=do_upserts, dry_run=dry_run, local_time=local_time
+            )
+
+    if cache_dir:
+        db_written = (insert_db and not dry_run and not summary_df.empty
+                      and not device_stats['status'].startswith('error_'))
+        store_cached_result(cache_dir, cache_key, dict(
+            cache_entry,
+            db_written=db_written,
+            db_devices=heating_serial_devices if db_written else [],
+        ), cache_max_bytes)
+
+    return len(summary_df), heating_devices_count, heating_device_readings_count, heating_serial_devices, device_stats
+
+
+def read_test_run(filepath, device_stats, sheet_name=0):
+    """
+    Stages 1-4 of process_file(): parse a device sheet, keep its Test Run
+    rows with the Device Name / MAC Serial # columns and the Enable/Disable
+    flags, and put them on a clean 1-minute series.
+
+    Sets device_name and device_serial in device_stats, or the status
+    'error_no_note_column' / 'error_insufficient_columns'.
+
+    Returns:
+        Tuple (original_df, df, discarded) as clean_timestamps() leaves them,
+        or None after an error status
+    """
+    import pandas as pd
+
+    # Parse the sheet once; header row, device name and DevID are found while streaming
+    with pipeline_stage(device_stats, 'load'):
+        raw_df, df, header_row_idx, device_name, mac_serial = read_device_workbook(filepath, sheet_name)
+    original_df = raw_df
+
+    # Rename 7th column to "Note"
+    if df.columns.size >= 7:
+        print(f"📄 Processing file: {filepath}")
+        df.columns.values[6] = "Note"
+        if "Note" in df.columns:
+            df = df[df["Note"] == "Test Run"].copy()
+        else:
+            print(f"❌ 'Note' column not found after renaming in: {filepath}")
+            device_stats['status'] = 'error_no_note_column'
+            return None
+    else:
+        print(f"❌ Not enough columns to rename 7th column to 'Note' in: {filepath}")
+        device_stats['status'] = 'error_insufficient_columns'
+        return None
+
+    # Insert "Device Name" and "MAC Serial #" (one category each, not a string per row)
+    mac_serial = hex_upper(mac_serial)  # Normalize serial number format
+    df["Device Name"] = pd.Series(device_name, index=df.index, dtype="category")
+    df["MAC Serial #"] = pd.Series(mac_serial, index=df.index, dtype="category")
+
+    # Update device stats
+    device_stats['device_name'] = device_name
+    device_stats['device_serial'] = mac_serial
+    cols = ["Device Name", "MAC Serial #"] + [col for col in df.columns if col not in ["Device Name", "MAC Serial #"]]
+    df = df[cols]
+
+    # Add Enable/Disable columns
+    df["Enable"] = (df["State"] == "Enable").to_numpy()
+    df["Disable"] = (df["State"] == "Disable").to_numpy()
+
+    # Step 4: Clean up duplicate/missing timestamps before heat detection
+    with pipeline_stage(device_stats, 'clean'):
+        df, discarded = clean_timestamps(df)
+    return original_df, df, discarded
+
+
+def process_file(filepath, savepath, insert_db=False, do_upserts=False, dry_run=False, outputs="full",
+                 write_parquet=False, cache_dir=None, cache_max_mb=512, chunk_rows=None, state_dir=None,
+                 local_time=None, trace_memory=False, profile_dir=None, sheet_name=None, pending_writes=None,
+                 detection=None):
+    """
+    Process one device export: detect heating, write the output workbook and
+    insert the summary into the DB if requested.
+
+    Every run records per-stage wall time in device_stats['stage_seconds'],
+    the file's total in 'total_seconds' and the process's peak RSS so far in
+    'peak_rss_mb'.
+
+    Args:
+        local_time: Time zone settings for the DB keys (default: LOCAL_TIME)
+        trace_memory: Also record each stage's peak Python allocation
+            (tracemalloc) in device_stats['stage_peak_mb']; slows processing.
+            tracemalloc is process-wide, so concurrent jobs share the peaks.
+        profile_dir: Write a cProfile dump of this file's run to
+            {profile_dir}/{input name}.pstats ({input name} - {sheet}.pstats
+            for a sheet)
+        sheet_name: Sheet to process (default: the first sheet)
+        pending_writes: List collecting the DB write instead of writing it
+            now (see insert_and_cache())
+        detection: Thresholds with the keys of DETECTION_PARAMS (default:
+            DETECTION_PARAMS)
+        Other arguments: see the command-line options in build_arg_parser()
+
+    Returns:
+        Tuple (summary_rows, heating_devices, heating_device_readings,
+        heating_serial_devices, device_stats)
+    """
+    import tracemalloc
+
+    options = dict(insert_db=insert_db, do_upserts=do_upserts, dry_run=dry_run, outputs=outputs,
+                   write_parquet=write_parquet, cache_dir=cache_dir, cache_max_mb=cache_max_mb,
+                   chunk_rows=chunk_rows, state_dir=state_dir, local_time=local_time,
+                   sheet_name=sheet_name, pending_writes=pending_writes, detection=detection)
+    start_tracing = trace_memory and not tracemalloc.is_tracing()
+    if start_tracing:
+        tracemalloc.start()
+    profiler = None
+    if profile_dir:
+        import cProfile
+        profiler = cProfile.Profile()
+
+    start = time.perf_counter()
+    try:
+        if profiler:
+            result = profiler.runcall(_process_file, filepath, savepath, **options)
+        else:
+            result = _process_file(filepath, savepath, **options)
+    finally:
+        if start_tracing:
+            tracemalloc.stop()
+
+    device_stats = result[4]
+    device_stats['total_seconds'] = round(time.perf_counter() - start, 4)
+    device_stats['peak_rss_mb'] = peak_rss_mb()
+    if profiler:
+        os.makedirs(profile_dir, exist_ok=True)
+        profile_name = os.path.splitext(os.path.basename(filepath))[0]
+        if sheet_name is not None:
+            profile_name = f"{profile_name} - {sheet_name}"
+        profile_path = os.path.join(profile_dir, profile_name + ".pstats")
+        profiler.dump_stats(profile_path)
+        device_stats['profile_path'] = profile_path
+        print(f"⏱️  Profile written to: {profile_path}")
+    return result
+
+
+def _process_file(filepath, savepath, insert_db=False, do_upserts=False, dry_run=False, outputs="full",
+                  write_parquet=False, cache_dir=None, cache_max_mb=512, chunk_rows=None, state_dir=None,
+                  local_time=None, sheet_name=None, pending_writes=None, detection=None):
+    """process_file() without the timing and profiling wrapper"""
+    # Initialize counters for this file
+    import pandas as pd
+
+    summary_rows_count = 0
+    detection = detection or DETECTION_PARAMS
+    sheet = 0 if sheet_name is None else sheet_name
+    # Initialize device statistics dictionary
+    device_stats = new_device_stats(filepath, sheet_name)
+
+    # Incremental runs resume the device's saved stream state, so they always
+    # stream and their results depend on that state rather than on the file alone
+    if state_dir:
+        chunk_rows = chunk_rows or 50000
+        cache_dir = None
+
+    # Streaming keeps only the summary; the full workbook and the minute series
+    # need every row in memory
+    if chunk_rows:
+        if outputs == "full":
+            print("ℹ️  Streaming mode writes only the 'Heat Cleaned Data' sheet")
+            outputs = "summary"
+        if write_parquet:
+            print("⚠️  Parquet output skipped in streaming mode")
+            write_parquet = False
+
+    # Reuse the result of an earlier run on identical content and settings
+    cache_key = cache_max_bytes = None
+    if cache_dir:
+        cache_max_bytes = int(cache_max_mb * 1024 * 1024)
+        cache_settings = dict(
+            detection,
+            outputs=outputs,
+            write_parquet=write_parquet,
+            savepath=os.path.abspath(savepath)
+        )
+        if sheet_name is not None:
+            cache_settings['sheet_name'] = sheet_name
+        if do_upserts:
+            # A DO NOTHING write does not count as written for an --upserts run
+            cache_settings['do_upserts'] = True
+        if local_time and local_time != LOCAL_TIME:
+            # Rows written under another UTC conversion have other keys
+            cache_settings['local_time'] = local_time
+        cache_key = file_cache_key(filepath, cache_settings)
+        cached = load_cached_result(cache_dir, cache_key)
+        if cached is not None:
+            return replay_cached_result(cached, filepath, insert_db=insert_db, do_upserts=do_upserts,
+                                        dry_run=dry_run, cache_dir=cache_dir, key=cache_key,
+                                        max_bytes=cache_max_bytes, local_time=local_time,
+                                        pending_writes=pending_writes)
+
+    if chunk_rows:
+        try:
+            # Reading, cleaning, detection and summarizing are interleaved per chunk
+            with pipeline_stage(device_stats, 'stream'):
+                summary_df = summarize_workbook_stream(filepath, device_stats, chunk_rows=chunk_rows,
+                                                       state_dir=state_dir, sheet_name=sheet,
+                                                       detection=detection)
+        except UnorderedExportError as e:
+            if state_dir:
+                print(f"❌ {e}; incremental processing needs time-ordered rows")
+                device_stats['status'] = 'error_unordered_rows'
+                return 0, 0, 0, [], device_stats
+            print(f"⚠️  {e}; processing it in memory instead")
+            device_stats = new_device_stats(filepath, sheet_name)
+        else:
+            if device_stats['status'].startswith('error_'):
+                return 0, 0, 0, [], device_stats
+            print("Summary Rows:", len(summary_df))
+            set_summary_status(device_stats, len(summary_df))
+            if state_dir and device_stats['test_run_rows'] == 0:
+                device_stats['status'] = 'no_new_data'
+            if outputs == "summary":
+                with pipeline_stage(device_stats, 'write'):
+                    write_output_workbook(savepath, outputs, summary_df)
+                device_stats['output_path'] = savepath
+                print(f"✅ Processed and saved: {savepath}")
+            result = insert_and_cache(summary_df, device_stats, insert_db=insert_db, do_upserts=do_upserts,
+                                      dry_run=dry_run, cache_dir=cache_dir, cache_key=cache_key,
+                                      cache_max_bytes=cache_max_bytes, local_time=local_time,
+                                      pending_writes=pending_writes)
+
+            # Advance the device's state only once its new hours are stored
+            # (by write_pending_summaries() when the write is pending)
+            deferred = pending_writes is not None and insert_db and not summary_df.empty
+            stored = not dry_run and not deferred and not device_stats['status'].startswith('error_')
+            if device_stats['state_path'] and stored:
+                commit_device_state(device_stats['state_path'])
+                print(f"💾 Incremental state saved: {device_stats['state_path']}")
+            return result
+
+    loaded = read_test_run(filepath, device_stats, sheet)
+    if loaded is None:
+        return 0, 0, 0, [], device_stats
+    original_df, df, discarded = loaded
+
+    # Continue with filtered data
+    df_filtered = df.copy()
+    df_filtered["Date"] = pd.to_datetime(df_filtered["Date"])
+    supply = df_filtered["Supply Temp/C"].values
+    return_temp = df_filtered["Return Temp/C"].values  # <-- needed for the new version1a logic
+
+    # Collect temperature statistics for device status report
+    with pipeline_stage(device_stats, 'stats'):
+        collect_temperature_stats(df_filtered, device_stats)
+
+    # ----------------------------------------------------------------------------
+    # Heating detection logic merged from version1a (see detect_heating):
+    #   - threshold to turn ON: delta > 5, supply[i] > return_temp[i]
+    #   - threshold to turn OFF: delta <= -2.7
+    # ----------------------------------------------------------------------------
+    with pipeline_stage(device_stats, 'detect'):
+        _, heating_group = detect_heating(
+            supply, return_temp,
+            on_delta=detection["on_delta"],
+            off_delta=detection["off_delta"]
+        )
+
+    # Heating is kept as a bool ("On"/"Off" only in the workbook, see display_frame)
+    df_filtered["Heating"] = heating_group > 0
+    df_filtered["Heating_Group"] = heating_group.astype("int32")
+
+    # ----------------------------------------------------------------------------
+    # Validate heating groups (already updated to 0.6 in version2)
+    # ----------------------------------------------------------------------------
+    with pipeline_stage(device_stats, 'validate'):
+        valid_groups, total_groups = validate_heating_groups(
+            df_filtered,
+            min_diff=detection["min_diff"],
+            min_fraction=detection["min_fraction"]
+        )
+
+    # Update device stats with heating group counts
+    device_stats['heating_groups_detected'] = total_groups
+    device_stats['valid_heating_groups'] = len(valid_groups)
+
+    invalid = ~df_filtered["Heating_Group"].isin(valid_groups)
+    df_filtered.loc[invalid, "Heating"] = False
+    df_filtered.loc[invalid, "Heating_Group"] = 0
+
+    # Columnar copy of the cleaned minute series for re-analysis without Excel
+    if write_parquet:
+        parquet_path = minute_series_path(savepath)
+        try:
+            with pipeline_stage(device_stats, 'parquet'):
+                write_minute_series(df_filtered, parquet_path)
+            device_stats['parquet_path'] = parquet_path
+            print(f"✅ Minute series saved: {parquet_path}")
+        except ImportError as e:
+            print(f"⚠️  Parquet output skipped (requires pyarrow): {e}")
+
+    # Extract heating group on/off times
+    group_times = df_filtered[df_filtered["Heating_Group"] > 0].groupby("Heating_Group")["Date"].agg(["min", "max"]).reset_index()
+    group_times.columns = ["Heating_Group", "Heat On", "Heat Off"]
+    df_filtered = df_filtered.merge(group_times, on="Heating_Group", how="left")
+
+    # Step 6: Keep full hours where heating occurred
+    df_filtered["Hour"] = df_filtered["Date"].dt.floor("h")
+    df["Date"] = pd.to_datetime(df["Date"])
+    df = pd.merge(df, df_filtered[["Date", "Heating", "Heating_Group"]], on="Date", how="left")
+    df["Heating"] = df["Heating"].fillna(False).astype(bool)
+    df["Heating_GROUP"] = df["Heating_Group"].fillna(0).astype(int)
+    df["Hour"] = df["Date"].dt.floor("h")
+    heat_data_set = df[df["Hour"].isin(df_filtered.loc[df_filtered["Heating"], "Hour"].unique())].copy()
+
+    # Step 7: Summarize hours with >=55 mins consistent Enable/Disable
+    with pipeline_stage(device_stats, 'summarize'):
+        summary_df = summarize_heating_hours(heat_data_set, min_minutes=detection["min_minutes"])
+    summary_rows_count = len(summary_df)
+    print("Summary Rows:", summary_rows_count)
+
+    # Update device stats with final results and status
+    set_summary_status(device_stats, summary_rows_count)
+
+    # Save outputs
+    with pipeline_stage(device_stats, 'write'):
+        write_output_workbook(savepath, outputs, summary_df, original_df=original_df, df=df,
+                              heat_data_set=heat_data_set, discarded=discarded)
+    if outputs != "none":
+        device_stats['output_path'] = savepath
+        print(f"✅ Processed and saved: {savepath}")
+
+    # ----------------------------------------------------------------------------
+    # Insert data into the DB if requested
+    # ----------------------------------------------------------------------------
+    return insert_and_cache(summary_df, device_stats, insert_db=insert_db, do_upserts=do_upserts,
+                            dry_run=dry_run, cache_dir=cache_dir, cache_key=cache_key,
+                            cache_max_bytes=cache_max_bytes, local_time=local_time,
+                            pending_writes=pending_writes)
+
+
+def process_file_safe(filepath, savepath, insert_db=False, do_upserts=False, dry_run=False, outputs="full",
+                      write_parquet=False, cache_dir=None, cache_max_mb=512, chunk_rows=None, state_dir=None,
+                      local_time=None, trace_memory=False, profile_dir=None, sheet_name=None, pending_writes=None,
+                      detection=None):
+    """
+    Run process_file(), turning an unexpected exception into an error result
+    (status 'error_processing') so one bad file does not abort a batch.
+    """
+    try:
+        return process_file(filepath, savepath, insert_db=insert_db, do_upserts=do_upserts, dry_run=dry_run,
+                            outputs=outputs, write_parquet=write_parquet,
+                            cache_dir=cache_dir, cache_max_mb=cache_max_mb, chunk_rows=chunk_rows,
+                            state_dir=state_dir, local_time=local_time, trace_memory=trace_memory,
+                            profile_dir=profile_dir, sheet_name=sheet_name, pending_writes=pending_writes,
+                            detection=detection)
+    except Exception as e:
+        print(f"❌ Failed to process {filepath}: {e}")
+        device_stats = new_device_stats(filepath, sheet_name)
+        device_stats['status'] = 'error_processing'
+        device_stats['error'] = f"{type(e).__name__}: {e}"
+        return 0, 0, 0, [], device_stats
+
+
+def process_sheet(filepath, savepath, sheet_name=None, defer_write=False, **options):
+    """
+    One task of process_batch(): process_file_safe() on a whole file, or on
+    one sheet of a multi-device workbook with its DB write left pending
+    (also left pending for a whole file with defer_write, for the
+    background DB writer).
+
+    Returns:
+        Tuple (process_file() result, pending write or None)
+    """
+    if sheet_name is None and not defer_write:
+        return process_file_safe(filepath, savepath, **options), None
+    pending_writes = []
+    result = process_file_safe(filepath, savepath, sheet_name=sheet_name, pending_writes=pending_writes,
+                               **options)
+    # A sheet that failed after queueing its write must not be written
+    pending = pending_writes[0] if pending_writes and pending_writes[0]['device_stats'] is result[4] else None
+    return result, pending
+
+
+def write_pending_summaries(outcomes, do_upserts=False, dry_run=False, local_time=None):
+    """
+    Write the pending DB writes of one multi-device workbook in a single
+    transaction, then store their cache entries and advance their
+    incremental state as process_file() would have.
+
+    Args:
+        outcomes: process_sheet() return tuples for the workbook's sheets
+
+    Returns:
+        List of process_file() result tuples, one per sheet
+    """
+    pending = [(index, write) for index, (_, write) in enumerate(outcomes) if write is not None]
+    results = [result for result, _ in outcomes]
+    if not pending:
+        return results
+
+    start = time.perf_counter()
+    written = insert_summaries_to_db([(write['summary_df'], results[index][4]) for index, write in pending],
+                                     do_upserts=do_upserts, dry_run=dry_run, local_time=local_time)
+    seconds = round(time.perf_counter() - start, 4)
+
+    for (index, write), (heating_devices_count, readings_count, heating_serial_devices) in zip(pending, written):
+        summary_rows, _, _, _, device_stats = results[index]
+        # The transaction is shared, so every device reports its full time
+        device_stats['stage_seconds']['db_insert'] = seconds
+        if device_stats['total_seconds'] is not None:
+            device_stats['total_seconds'] = round(device_stats['total_seconds'] + seconds, 4)
+
+        stored = not dry_run and not device_stats['status'].startswith('error_')
+        if write['cache_dir'] and (stored or not write['cached']):
+            store_cached_result(write['cache_dir'], write['cache_key'], dict(
+                write['cache_entry'],
+                db_written=stored,
+                db_devices=heating_serial_devices if stored else [],
+            ), write['cache_max_bytes'])
+        if device_stats['state_path'] and stored:
+            commit_device_state(device_stats['state_path'])
+            print(f"💾 Incremental state saved: {device_stats['state_path']}")
+        results[index] = (summary_rows, heating_devices_count, readings_count, heating_serial_devices, device_stats)
+    return results
+
+
+# Most summary rows the background DB writer coalesces into one transaction
+DB_WRITER_MAX_ROWS = 20000
+
+
+@contextmanager
+def background_db_writer(do_upserts=False, dry_run=False, local_time=None, queue_size=8,
+                         max_rows=DB_WRITER_MAX_ROWS):
+    """
+    Write the DB inserts of process_batch() on a background thread, so the
+    next files are parsed and analyzed while earlier ones are written.
+
+    Each job (the process_sheet() outcomes of one input file, DB writes
+    pending) waits in a queue of queue_size entries; while it is full,
+    submit() blocks, so a slow database holds processing back instead of
+    filling memory. The writer takes every job already waiting, up to
+    max_rows summary rows, and writes them in one transaction with
+    write_pending_summaries(). If that transaction fails with several files
+    in it, each file is written again on its own, so one file's rows cannot
+    fail the others.
+
+    Yields:
+        submit(outcomes, done): queue one job; done(results) is called on the
+        writer thread with the job's process_file() result tuples
+
+    Raises:
+        The first exception raised by a done() callback, once every queued
+        job is written
+    """
+    import queue
+
+    work = queue.Queue(maxsize=max(1, queue_size))
+    errors = []
+
+    def pending_rows(outcomes):
+        return sum(len(write['summary_df']) for _, write in outcomes if write is not None)
+
+    def write(jobs):
+        outcomes = [outcome for job_outcomes, _ in jobs for outcome in job_outcomes]
+        pending_stats = [write['device_stats'] for _, write in outcomes if write is not None]
+        before = [(stats['status'], stats['total_seconds']) for stats in pending_stats]
+        try:
+            results = write_pending_summaries(outcomes, do_upserts=do_upserts, dry_run=dry_run,
+                                              local_time=local_time)
+        except Exception as e:
+            print(f"❌ Background DB write failed: {e}")
+            for stats in pending_stats:
+                stats['status'] = 'error_db_insertion'
+                stats['error'] = f"{type(e).__name__}: {e}"
+            results = [result for result, _ in outcomes]
+        failed = any(stats['status'] == 'error_db_insertion' and status != 'error_db_insertion'
+                     for stats, (status, _) in zip(pending_stats, before))
+        if failed and len(jobs) > 1:
+            print(f"⚠️  Transaction of {len(jobs)} files failed; writing them one at a time")
+            for stats, (status, total_seconds) in zip(pending_stats, before):
+                stats['status'], stats['total_seconds'] = status, total_seconds
+                stats.pop('error', None)
+            for job in jobs:
+                write([job])
+            return
+        for job_outcomes, done in jobs:
+            try:
+                done(results[:len(job_outcomes)])
+            except Exception as e:
+                errors.append(e)
+            results = results[len(job_outcomes):]
+
+    def writer():
+        stopping = False
+        while not stopping:
+            job = work.get()
+            if job is None:
+                return
+            jobs, rows = [job], pending_rows(job[0])
+            # Coalesce the jobs already waiting into the same transaction
+            while rows < max_rows:
+                try:
+                    job = work.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    stopping = True
+                    break
+                jobs.append(job)
+                rows += pending_rows(job[0])
+            write(jobs)
+
+    thread = threading.Thread(target=writer, name="hcd-db-writer", daemon=True)
+    thread.start()
+    try:
+        yield lambda outcomes, done: work.put((outcomes, done))
+    finally:
+        # Queued jobs are already processed: write them before returning (or re-raising)
+        work.put(None)
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+def _init_batch_worker(out_log_path=None, err_log_path=None):
+    """
+    Process pool initializer: send worker output to the same log files as the
+    parent when --logging is active, so nothing but the JSON summary reaches
+    the original stdout.
+    """
+    if out_log_path:
+        sys.stdout = open(out_log_path, 'a', buffering=1)
+    if err_log_path:
+        sys.stderr = open(err_log_path, 'a', buffering=1)
+
+
+# Run journal of a directory batch (see run()): a header line with the batch's
+# start time and settings, then one line per finished input file with its
+# results, so a killed run can be resumed with --resume.
+BATCH_JOURNAL_NAME = ".hcd-batch-journal.jsonl"
+
+# Options a resumed batch must share with the journaled one
+JOURNAL_SETTINGS = ["insert_db", "upserts", "dry_run", "outputs", "parquet", "chunk_rows", "state_dir",
+                    "timezone", "timezone_map", "ambiguous_hours", "nonexistent_hours", *DETECTION_PARAMS]
+
+
+def json_default(value):
+    """json.dumps() fallback for numpy scalars (and anything else) in device statistics"""
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+def file_key(filepath):
+    """(name, size, mtime_ns): identifies one version of an input file"""
+    st = os.stat(filepath)
+    return os.path.basename(filepath), st.st_size, st.st_mtime_ns
+
+
+def read_batch_journal(path):
+    """
+    Header and file entries of a run journal.
+
+    Returns:
+        (header dict or None, dict (name, size, mtime_ns) -> list of
+        process_file() result tuples); a later entry for a file replaces an
+        earlier one
+    """
+    header = None
+    files = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    if header is None:
+                        header = entry if "batch" in entry else None
+                        continue
+                    files[(entry["name"], entry["size"], entry["mtime-ns"])] = [
+                        tuple(result) for result in entry["results"]
+                    ]
+                except (ValueError, KeyError, TypeError):
+                    continue  # a line cut short by a crash
+    except FileNotFoundError:
+        pass
+    return header, files
+
+
+def start_batch_journal(path, settings, resume=False):
+    """
+    Start a directory batch's run journal, or continue the last one.
+
+    Args:
+        path: Journal path
+        settings: JOURNAL_SETTINGS values of this run
+        resume: Continue the journal if there is one (it must have the same settings)
+
+    Returns:
+        (batch start time "%Y%m%d_%H%M%S", dict of journaled files from read_batch_journal())
+
+    Raises:
+        ValueError: resume with a journal written under different settings
+    """
+    if resume:
+        header, files = read_batch_journal(path)
+        if header is not None:
+            if header["settings"] != settings:
+                changed = sorted(key for key in settings if header["settings"].get(key) != settings[key])
+                raise ValueError(f"cannot resume batch {header['batch']}: settings changed ({', '.join(changed)}); "
+                                 f"rerun without --resume")
+            return header["batch"], files
+        print(f"⚠️  No batch journal at {path}; starting a new batch")
+    started = datetime.now().strftime("%Y%m%d_%H%M%S")
+    with open(path, 'w') as f:
+        f.write(json.dumps({"batch": started, "settings": settings}) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    return started, {}
+
+
+def append_batch_journal(path, key, results):
+    """Append one finished input file (its file_key() and results) and flush it to disk"""
+    name, size, mtime_ns = key
+    with open(path, 'a') as f:
+        f.write(json.dumps({"name": name, "size": size, "mtime-ns": mtime_ns, "results": results},
+                           default=json_default) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+@contextmanager
+def locked_batch_journal(path):
+    """
+    Hold an exclusive lock on a run journal while its batch runs, so a second
+    batch over the same upload directory (another shell, or a concurrent
+    `hcd serve` job) waits instead of overwriting the journal. Without
+    flock (Windows) batches are not serialized.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+
+    with open(path, 'a') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            print(f"⏳ Another batch is using {path}; waiting for it to finish")
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield  # closing the file releases the lock
+
+
+def process_batch(jobs, workers=1, insert_db=False, do_upserts=False, dry_run=False, outputs="full",
+                  write_parquet=False, cache_dir=None, cache_max_mb=512, chunk_rows=None, state_dir=None,
+                  local_time=None, trace_memory=False, profile_dir=None, log_paths=(None, None), detection=None,
+                  on_done=None, db_queue=0):
+    """
+    Process a list of (filepath, savepath) jobs, serially or across a process pool.
+
+    A workbook with several device sheets becomes one task per sheet, each
+    writing its own output workbook (see sheet_output_path()); the sheets'
+    DB writes then go into one transaction per workbook, made by this
+    process once all of them are done (see write_pending_summaries()).
+
+    Results are returned in the order of `jobs` (and sheets) regardless of
+    which worker finishes first, so merged counters and the status report are
+    the same as a serial run. A file that raises (or a worker that dies)
+    yields an 'error_processing' result instead of aborting the batch.
+    on_done is called as each job finishes (in completion order), so a run
+    journal can record it before the rest of the batch is done.
+
+    With db_queue, DB writes go through background_db_writer(): processing
+    continues while earlier files are written, and files waiting together
+    share a transaction. Not used with state_dir, where a device's next
+    upload must see the state its previous one committed; for the same
+    reason a state_dir batch is always processed in job order, one file at
+    a time, whatever `workers` is.
+
+    Args:
+        jobs: List of (filepath, savepath) tuples
+        workers: Number of worker processes (1 = process in this process)
+        insert_db, do_upserts, dry_run, outputs, write_parquet, cache_dir, cache_max_mb, chunk_rows,
+        state_dir, local_time, trace_memory, profile_dir, detection: Passed through to process_file()
+        log_paths: (stdout, stderr) log file paths for workers when logging
+        on_done: Optional callable(job index, results of that job) run in this process
+        db_queue: Files waiting for the background DB writer (0: each job writes before the next starts)
+
+    Returns:
+        List of process_file() result tuples, one per job (one per device
+        sheet for multi-device workbooks)
+    """
+    options = dict(insert_db=insert_db, do_upserts=do_upserts, dry_run=dry_run, outputs=outputs,
+                   write_parquet=write_parquet, cache_dir=cache_dir, cache_max_mb=cache_max_mb,
+                   chunk_rows=chunk_rows, state_dir=state_dir, local_time=local_time,
+                   trace_memory=trace_memory, profile_dir=profile_dir, detection=detection)
+
+    # (job index, filepath, savepath, sheet name or None for the whole file)
+    tasks = []
+    for index, (filepath, savepath) in enumerate(jobs):
+        try:
+            sheets = device_sheet_names(filepath)
+        except Exception:
+            sheets = []  # process_file_safe() reports the unreadable file
+        if len(sheets) > 1:
+            tasks.extend((index, filepath, sheet_output_path(savepath, sheet), sheet) for sheet in sheets)
+        else:
+            tasks.append((index, filepath, savepath, None))
+
+    outcomes = [None] * len(tasks)
+    remaining = collections.Counter(index for index, *_ in tasks)
+    job_results = {}
+    use_writer = insert_db and db_queue > 0 and not state_dir
+    writer = (background_db_writer(do_upserts=do_upserts, dry_run=dry_run, local_time=local_time,
+                                   queue_size=db_queue) if use_writer else nullcontext())
+
+    def job_done(index, results):
+        job_results[index] = results
+        if on_done is not None:
+            on_done(index, results)
+
+    with writer as submit:
+        def task_done(position, outcome):
+            # Once all of a job's sheets are in, make (or queue) its DB writes and report it
+            outcomes[position] = outcome
+            index = tasks[position][0]
+            remaining[index] -= 1
+            if remaining[index]:
+                return
+            job_outcomes = [outcomes[i] for i, task in enumerate(tasks) if task[0] == index]
+            if use_writer:
+                submit(job_outcomes, lambda results: job_done(index, results))
+            else:
+                job_done(index, write_pending_summaries(job_outcomes, do_upserts=do_upserts, dry_run=dry_run,
+                                                        local_time=local_time))
+
+        if workers <= 1 or len(tasks) <= 1 or state_dir:
+            for position, (_, filepath, savepath, sheet) in enumerate(tasks):
+                task_done(position, process_sheet(filepath, savepath, sheet, defer_write=use_writer, **options))
+        else:
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+
+            # Flush buffered output so forked workers do not write it a second time
+            sys.stdout.flush()
+            sys.stderr.flush()
+
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                     initargs=log_paths) as executor:
+                futures = {executor.submit(process_sheet, filepath, savepath, sheet, defer_write=use_writer,
+                                           **options): position
+                           for position, (_, filepath, savepath, sheet) in enumerate(tasks)}
+                for future in as_completed(futures):
+                    position = futures[future]
+                    _, filepath, _, sheet = tasks[position]
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        print(f"❌ Worker failed while processing {filepath}: {e}")
+                        device_stats = new_device_stats(filepath, sheet)
+                        device_stats['status'] = 'error_processing'
+                        device_stats['error'] = f"{type(e).__name__}: {e}"
+                        outcome = ((0, 0, 0, [], device_stats), None)
+                    task_done(position, outcome)
+
+    return [result for index in sorted(job_results) for result in job_results[index]]
+
+
+def build_arg_parser():
+    """Command-line options shared by a normal run and the jobs of `hcd serve`"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Heat Cycle Detection Script")
+    parser.add_argument(
+        "--input-file",
+        help="Process only the specified Excel file (relative to current directory)"
+    )
+    parser.add_argument(
+        "--insert-db",
+        action="store_true",
+        help="Insert the 'Heat Cleaned Data' rows into the heating_device_data table"
+    )
+    parser.add_argument(
+        "--upserts",
+        action="store_true",
+        help="Perform upserts (INSERT ... ON CONFLICT DO UPDATE) instead of DO NOTHING"
+    )
+    parser.add_argument(
+        "--logging",
+        action="store_true",
+        help="Enable logging to files in ./logs"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Display SQL statements without executing inserts/updates"
+    )
+    parser.add_argument(
+        "--outputs",
+        choices=["none", "summary", "full"],
+        default="full",
+        help="Per-file workbook to write: full (all sheets, highlighted), summary "
+             "(Heat Cleaned Data only) or none (DB insert / JSON summary only)"
+    )
+    parser.add_argument(
+        "--parquet",
+        action="store_true",
+        help="Also write the cleaned minute series as {name}_minutes.parquet (requires pyarrow)"
+    )
+    parser.add_argument(
+        "--status-format",
+        action="append",
+        choices=["xlsx", "csv", "jsonl"],
+        metavar="FORMAT",
+        help="Device status report format in upload-results/: xlsx (vertical, commented), csv or "
+             "jsonl (one record per file); repeat for several (default: xlsx)"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        metavar="DIR",
+        help="Cache results by file content hash in DIR; re-uploaded files are not reprocessed "
+             "and their DB rows are not rewritten"
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=512,
+        metavar="MB",
+        help="Evict least recently used cache entries above this size (default: 512)"
+    )
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        metavar="N",
+        help="Stream each file in chunks of N rows with bounded memory; writes only the "
+             "'Heat Cleaned Data' sheet (default: load the whole file)"
+    )
+    parser.add_argument(
+        "--state-dir",
+        metavar="DIR",
+        help="Incremental mode: keep each device's stream state in DIR and only analyze "
+             "minutes after its last processed timestamp (implies streaming)"
+    )
+    parser.add_argument(
+        "--on-delta",
+        type=float,
+        default=DETECTION_PARAMS["on_delta"],
+        metavar="C",
+        help=f"Supply jump (°C, exclusive) that triggers heating (default: {DETECTION_PARAMS['on_delta']})"
+    )
+    parser.add_argument(
+        "--off-delta",
+        type=float,
+        default=DETECTION_PARAMS["off_delta"],
+        metavar="C",
+        help=f"Supply drop (°C, inclusive) that releases heating (default: {DETECTION_PARAMS['off_delta']})"
+    )
+    parser.add_argument(
+        "--min-diff",
+        type=float,
+        default=DETECTION_PARAMS["min_diff"],
+        metavar="C",
+        help=f"Supply-over-return differential (°C) for group validation (default: {DETECTION_PARAMS['min_diff']})"
+    )
+    parser.add_argument(
+        "--min-fraction",
+        type=float,
+        default=DETECTION_PARAMS["min_fraction"],
+        metavar="F",
+        help=f"Fraction of a group's rows that must meet --min-diff (default: {DETECTION_PARAMS['min_fraction']})"
+    )
+    parser.add_argument(
+        "--min-minutes",
+        type=int,
+        default=DETECTION_PARAMS["min_minutes"],
+        metavar="N",
+        help=f"Minutes of consistent Enable/Disable for a summary hour (default: {DETECTION_PARAMS['min_minutes']})"
+    )
+    parser.add_argument(
+        "--timezone",
+        default=LOCAL_TIME["timezone"],
+        metavar="ZONE",
+        help=f"Time zone of the devices' local timestamps (default: {LOCAL_TIME['timezone']})"
+    )
+    parser.add_argument(
+        "--timezone-map",
+        metavar="FILE",
+        help='JSON object of per-device zones, e.g. {"80646F049736": "America/Chicago"}'
+    )
+    parser.add_argument(
+        "--ambiguous-hours",
+        choices=["first", "second", "drop", "error"],
+        default=LOCAL_TIME["ambiguous"],
+        help="Repeated fall-back hour: first (daylight time), second (standard time), drop the "
+             "row or fail the DB insert (default: first)"
+    )
+    parser.add_argument(
+        "--nonexistent-hours",
+        choices=["shift", "drop", "error"],
+        default=LOCAL_TIME["nonexistent"],
+        help="Skipped spring-forward hour: shift (one hour later), drop the row or fail the "
+             "DB insert (default: shift)"
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Add each file's per-stage timings to the JSON summary on stdout"
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Also record each stage's peak Python memory (tracemalloc; slows processing)"
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        help="Write a cProfile dump per input file to DIR/{name}.pstats"
+    )
+    parser.add_argument(
+        "--db-queue",
+        type=int,
+        default=8,
+        metavar="N",
+        help="Batch --insert-db: files processed ahead of the background DB writer before processing "
+             "waits; files waiting together share a transaction (default: 8, 0 = write each file "
+             "before the next)"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Directory batch: continue the last batch from its run journal, skipping files already done"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Process directory files, and the device sheets of multi-device workbooks, across N "
+             "worker processes (default: 1, serial)"
+    )
+    parser.add_argument(
+        "--watch",
+        metavar="DIR",
+        help="Keep running and process each completed .xlsx upload that appears in DIR "
+             "(the other options apply to every file)"
+    )
+    parser.add_argument(
+        "--watch-jobs",
+        type=int,
+        default=2,
+        metavar="N",
+        help="--watch: uploads processed at once (default: 2)"
+    )
+    parser.add_argument(
+        "--watch-queue",
+        type=int,
+        default=16,
+        metavar="N",
+        help="--watch: completed uploads waiting for a job slot before the scan pauses (default: 16)"
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=2.0,
+        metavar="SECONDS",
+        help="--watch: rescan interval; without inotify a file must also stay unchanged this long "
+             "(default: 2)"
+    )
+    parser.add_argument(
+        "--watch-ledger",
+        metavar="FILE",
+        help=f"--watch: done/failed ledger of processed uploads (default: DIR/{WATCH_LEDGER_NAME})"
+    )
+    return parser
+
+
+def local_time_from_args(args, base_dir=None):
+    """
+    LOCAL_TIME-style settings from the --timezone, --timezone-map,
+    --ambiguous-hours and --nonexistent-hours options. Zone names are checked
+    here so a typo fails the run instead of every DB insert.
+    """
+    from zoneinfo import ZoneInfo
+
+    device_timezones = {}
+    if args.timezone_map:
+        with open(os.path.join(base_dir or os.getcwd(), args.timezone_map)) as f:
+            device_timezones = {hex_upper(serial): zone for serial, zone in json.load(f).items()}
+    for zone in {args.timezone, *device_timezones.values()}:
+        try:
+            ZoneInfo(zone)
+        except (ValueError, KeyError) as e:
+            raise ValueError(f"unknown time zone: {zone}") from e
+    return {
+        "timezone": args.timezone,
+        "device_timezones": device_timezones,
+        "ambiguous": args.ambiguous_hours,
+        "nonexistent": args.nonexistent_hours,
+    }
+
+
+def run(args, base_dir=None, log_paths=(None, None)):
+    """
+    Process the files selected by parsed command-line options and write the
+    device status report.
+
+    Args:
+        args: Namespace from build_arg_parser()
+        base_dir: Directory holding the input files and output folders
+            (default: the current working directory)
+        log_paths: (stdout log, stderr log) for batch worker processes
+
+    Returns:
+        dict: The JSON summary printed by the CLI
+    """
+    import pandas as pd
+
+    # Initialize aggregate counters
+    total_summary_rows = 0
+    total_heating_devices = 0
+    total_heating_readings = 0
+    # Initialize list to collect all heating device entries
+    all_heating_serial_devices = []
+    # Initialize list to collect all device statistics
+    all_device_stats = []
+
+    default_source_folder = base_dir or os.getcwd()
+    local_time = local_time_from_args(args, base_dir)
+    detection = {key: getattr(args, key) for key in DETECTION_PARAMS}
+    if detection == DETECTION_PARAMS:
+        detection = None  # the defaults keep their cache keys (5 rather than 5.0)
+    output_folder = target_folder if base_dir is None else os.path.normpath(os.path.join(base_dir, target_folder))
+    os.makedirs(output_folder, exist_ok=True)
+
+    # Determine upload-results directory (sibling to uploads)
+    uploads_dir = os.path.join(default_source_folder, target_folder)
+    parent_dir = os.path.dirname(uploads_dir) if target_folder != "." else default_source_folder
+    upload_results_dir = os.path.join(parent_dir, "upload-results")
+    os.makedirs(upload_results_dir, exist_ok=True)
+
+    options = dict(
+        insert_db=args.insert_db,
+        do_upserts=args.upserts,
+        dry_run=args.dry_run,
+        outputs=args.outputs,
+        write_parquet=args.parquet,
+        cache_dir=args.cache_dir,
+        cache_max_mb=args.cache_max_mb,
+        chunk_rows=args.chunk_rows,
+        state_dir=args.state_dir,
+        local_time=local_time,
+        trace_memory=args.trace_memory,
+        profile_dir=args.profile,
+        detection=detection
+    )
+    if args.state_dir and args.workers > 1:
+        # Uploads of one device would load and save its state at the same time
+        raise ValueError("--state-dir processes a device's uploads in order; use it with --workers 1")
+
+    results = []
+    batch = None
+    if args.input_file:
+        if args.resume:
+            raise ValueError("--resume applies to directory batches, not --input-file")
+        input_path = os.path.join(default_source_folder, args.input_file)
+        if os.path.isfile(input_path) and input_path.endswith(".xlsx") and not os.path.basename(input_path).startswith("~$"):
+            name, _ = os.path.splitext(os.path.basename(input_path))
+            save_path = os.path.join(output_folder, f"{name}_heat min per hour.xlsx")
+            if len(device_sheet_names(input_path)) > 1:
+                # One task per device sheet, one DB transaction for the upload
+                results = process_batch([(input_path, save_path)], workers=args.workers, log_paths=log_paths,
+                                        db_queue=args.db_queue, **options)
+            else:
+                results = [process_file(input_path, save_path, **options)]
+        else:
+            print(f"❌ File not found or invalid format: {input_path}")
+    else:
+        jobs = []
+        for filename in sorted(os.listdir(default_source_folder)):
+            if filename.endswith(".xlsx") and not filename.startswith("~$"):
+                full_path = os.path.join(default_source_folder, filename)
+                name, _ = os.path.splitext(filename)
+                save_path = os.path.join(output_folder, f"{name}_heat min per hour.xlsx")
+                jobs.append((full_path, save_path))
+
+        # Every finished file goes into the run journal, so a killed batch can be
+        # resumed; a resumed batch takes the results of files done earlier from it
+        journal_path = os.path.join(upload_results_dir, BATCH_JOURNAL_NAME)
+        settings = {key: getattr(args, key) for key in JOURNAL_SETTINGS}
+        with locked_batch_journal(journal_path):
+            batch, journaled = start_batch_journal(journal_path, settings, resume=args.resume)
+            keys = [file_key(filepath) for filepath, _ in jobs]
+            # Files whose processing failed are retried (a killed worker fails them all)
+            todo = [i for i, key in enumerate(keys)
+                    if key not in journaled
+                    or any(stats['status'] == 'error_processing' for *_, stats in journaled[key])]
+            if args.resume:
+                print(f"🔁 Resuming batch {batch}: {len(jobs) - len(todo)} of {len(jobs)} files already done")
+
+            finished = {}
+
+            def job_done(index, job_results):
+                append_batch_journal(journal_path, keys[todo[index]], job_results)
+                finished[todo[index]] = job_results
+
+            process_batch([jobs[i] for i in todo], workers=args.workers, log_paths=log_paths,
+                          db_queue=args.db_queue, on_done=job_done, **options)
+        results = [result for i, key in enumerate(keys)
+                   for result in (finished[i] if i in finished else journaled.get(key, []))]
+
+    for summary, dev_count, read_count, devices, stats in results:
+        total_summary_rows += summary
+        total_heating_devices += dev_count
+        total_heating_readings += read_count
+        all_heating_serial_devices.extend(devices)
+        all_device_stats.append(stats)
+
+    # Generate device-status.xlsx report if any files were processed
+    if all_device_stats:
+        # Reorder columns for better readability
+        column_order = [
             'filepath', 'device_name', 'device_serial', 'status',
             'test_run_rows', 'summary_rows',
             'supply_min', 'supply_max', 'supply_mean',
@@ -609,137 +3010,1002 @@ def main():
             'rows_supply_gt_return', 'rows_above_7c_threshold',
             'heating_groups_detected', 'valid_heating_groups'
         ]
+        if any(stats.get('sheet_name') is not None for stats in all_device_stats):
+            column_order.insert(1, 'sheet_name')
+        if args.insert_db:
+            column_order += ['db_rows_inserted', 'db_rows_updated', 'db_rows_skipped']
+        if args.cache_dir:
+            column_order += ['cache_hit']
 
-        # Create vertical format: headers in column A, values in column B, comments in column C
-        # With blank rows between multiple records
-        vertical_data = []
-        for idx, stats in enumerate(all_device_stats):
-            # Add blank row separator between records (except before first)
-            if idx > 0:
-                vertical_data.append(['', '', ''])
-
-            # Add each field as a row with explanatory comments
-            for col in column_order:
-                value = stats.get(col, '')
-                comment = ''
-
-                # Add comments for threshold-related fields
-                if col == 'status':
-                    if value == 'no_heating_detected':
-                        comment = 'NO HEATING: Supply temp never exceeded return by required 7°C'
-                    elif value == 'heating_failed_validation':
-                        comment = 'VALIDATION FAILED: Heating detected but could not sustain 7°C for 60% of cycle'
-                    elif value == 'success':
-                        comment = 'SUCCESS: Valid heating cycles detected and processed'
-
-                elif col == 'summary_rows':
-                    if value == 0:
-                        comment = 'ZERO OUTPUT: No valid heating hours generated for database insertion'
-
-                elif col == 'diff_max':
-                    if isinstance(value, (int, float)):
-                        if value < 7.0:
-                            comment = f'BELOW THRESHOLD: Max differential {value:.1f}°C < 7.0°C required for validation'
-                        elif value >= 7.0:
-                            comment = f'Above 7°C threshold (validation requirement met for this metric)'
-
-                elif col == 'diff_mean':
-                    if isinstance(value, (int, float)):
-                        if value < 0:
-                            comment = 'NEGATIVE: Supply cooler than return (indicates cooling mode or sensor issue)'
-                        elif value >= 0 and value < 7.0:
-                            comment = 'POSITIVE but below 7°C: Some heating activity but insufficient for validation'
-
-                elif col == 'rows_above_7c_threshold':
-                    if value == 0:
-                        comment = 'CRITICAL: No rows met 7°C validation threshold - cannot generate valid heating cycles'
-                    elif isinstance(value, int) and value > 0:
-                        total_rows = stats.get('test_run_rows', 1)
-                        pct = (value / total_rows * 100) if total_rows > 0 else 0
-                        comment = f'{pct:.1f}% of total rows meet 7°C threshold'
-
-                elif col == 'valid_heating_groups':
-                    detected = stats.get('heating_groups_detected', 0)
-                    if value == 0 and detected > 0:
-                        comment = f'VALIDATION FAILED: {detected} groups detected but none sustained 7°C for 60% of cycle'
-                    elif value > 0:
-                        comment = f'{value}/{detected} detected groups passed 60% validation rule'
-
-                elif col == 'heating_groups_detected':
-                    if value == 0:
-                        comment = 'No temperature patterns triggered heating detection (>5°C jump + supply>return)'
-                    elif value > 0:
-                        comment = f'{value} potential heating cycles detected (requires validation)'
-
-                vertical_data.append([col, value, comment])
-
-        # Create DataFrame with vertical format including comments
-        vertical_df = pd.DataFrame(vertical_data, columns=['Field', 'Value', 'Comment'])
+        records = status_report_records(all_device_stats, column_order)
 
         # Determine output filename based on input mode
         if args.input_file:
             # Single file mode: use input filename with -results.xlsx
             input_basename = os.path.basename(args.input_file)
-            input_name_no_ext = os.path.splitext(input_basename)[0]
-            status_filename = f"{input_name_no_ext}-results.xlsx"
+            status_name = f"{os.path.splitext(input_basename)[0]}-results"
         else:
-            # Batch mode: use timestamp-based filename
-            now = datetime.now()
-            timestamp = now.strftime("%Y%m%d_%H%M%S")
-            status_filename = f"batch-{timestamp}-results.xlsx"
+            # Batch mode: named after the batch's start (kept when it is resumed)
+            status_name = f"batch-{batch}-results"
 
         # Write to upload-results directory
-        status_report_path = os.path.join(upload_results_dir, status_filename)
-        vertical_df.to_excel(status_report_path, index=False, engine='openpyxl')
-
-        # Format the Excel file for better readability
-        from openpyxl import load_workbook
-        from openpyxl.styles import Font, Alignment
-
-        wb = load_workbook(status_report_path)
-        ws = wb.active
-
-        # Make Field column (column A) bold
-        bold_font = Font(bold=True)
-        for row in ws.iter_rows(min_row=2, max_row=ws.max_row, min_col=1, max_col=1):
-            for cell in row:
-                cell.font = bold_font
-
-        # Left-justify Value column (column B) - all data rows, not header
-        left_align = Alignment(horizontal='left')
-        for row in ws.iter_rows(min_row=2, max_row=ws.max_row, min_col=2, max_col=2):
-            for cell in row:
-                cell.alignment = left_align
-
-        # Auto-size all columns to fit content
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-
-            for cell in column:
-                try:
-                    cell_value = str(cell.value) if cell.value is not None else ''
-                    if len(cell_value) > max_length:
-                        max_length = len(cell_value)
-                except:
-                    pass
-
-            # Add some padding and set column width
-            adjusted_width = min(max_length + 2, 100)  # Cap at 100 to avoid extremely wide columns
-            ws.column_dimensions[column_letter].width = adjusted_width
-
-        wb.save(status_report_path)
-        print(f"📊 Device status report written to: {status_report_path}")
+        # Build each report under a private name and move it into place, so
+        # concurrent `hcd serve` jobs for the same file never see a half-written report
+        for fmt in dict.fromkeys(args.status_format or ["xlsx"]):
+            status_filename = f"{status_name}.{fmt}"
+            status_report_path = os.path.join(upload_results_dir, status_filename)
+            partial_path = os.path.join(upload_results_dir,
+                                        f".{os.getpid()}-{threading.get_ident()}-{status_filename}")
+            if fmt == "xlsx":
+                # Vertical format: headers in column A, values in column B, comments in column C
+                write_status_workbook(partial_path, status_report_rows(records, all_device_stats))
+            else:
+                write_status_records(partial_path, records, fmt)
+            os.replace(partial_path, status_report_path)
+            print(f"📊 Device status report written to: {status_report_path}")
 
-    # Output JSON summary regardless of logging
     mode = "dry-run" if args.dry_run else "live-run"
     summary_obj = {
         "mode": mode,
         "summary-rows": total_summary_rows,
         "heating-devices": total_heating_devices,
         "heating-device-readings": total_heating_readings,
-        "heating-serial-devices": all_heating_serial_devices
+        "heating-device-readings-inserted": sum(stats.get('db_rows_inserted', 0) for stats in all_device_stats),
+        "heating-device-readings-updated": sum(stats.get('db_rows_updated', 0) for stats in all_device_stats),
+        "heating-device-readings-skipped": sum(stats.get('db_rows_skipped', 0) for stats in all_device_stats),
+        "heating-serial-devices": all_heating_serial_devices,
+        "devices": [
+            {
+                "filepath": stats['filepath'],
+                "sheet-name": stats.get('sheet_name'),
+                "device-name": None if pd.isna(stats['device_name']) else stats['device_name'],
+                "device-serial": stats['device_serial'],
+                "status": stats['status'],
+                "summary-rows": stats['summary_rows'],
+            }
+            for stats in all_device_stats
+        ]
     }
+    if args.timings:
+        summary_obj["timings"] = [
+            {
+                "filepath": stats['filepath'],
+                **({"sheet-name": stats['sheet_name']} if stats.get('sheet_name') is not None else {}),
+                "total-seconds": stats.get('total_seconds'),
+                "peak-rss-mb": stats.get('peak_rss_mb'),
+                "stage-seconds": stats.get('stage_seconds', {}),
+                **({"stage-peak-mb": stats['stage_peak_mb']} if stats.get('stage_peak_mb') else {})
+            }
+            for stats in all_device_stats
+        ]
+    return summary_obj
+
+
+def serve_job(request):
+    """
+    Run one `hcd serve` job and return its response.
+
+    A job is a JSON object with "args" (the hcd.py command-line options, e.g.
+    ["--input-file", "x.xlsx", "--insert-db"]), an optional "cwd" that the
+    paths are relative to, and an optional "id" echoed in the response. The
+    response is the same JSON summary a one-shot run prints, or {"error": ...}.
+    """
+    response = {"id": request.get("id")} if isinstance(request, dict) and "id" in request else {}
+    try:
+        if not isinstance(request, dict) or not isinstance(request.get("args", []), list):
+            raise ValueError('job must be an object with an "args" list')
+        try:
+            args = build_arg_parser().parse_args([str(arg) for arg in request.get("args", [])])
+        except SystemExit:
+            raise ValueError(f"invalid arguments: {request.get('args')}")
+        if args.logging:
+            raise ValueError("--logging is not supported per job; redirect the server's stderr instead")
+        if args.watch:
+            raise ValueError("--watch is not supported per job")
+        base_dir = os.path.abspath(request.get("cwd") or os.getcwd())
+        response.update(run(args, base_dir=base_dir))
+    except Exception as e:
+        print(f"❌ Job failed: {e}", file=sys.stderr)
+        response["error"] = str(e)
+    return response
+
+
+def serve_stream(lines, respond, executor, slots):
+    """
+    Submit every JSON-lines job read from `lines` to the executor and pass each
+    response to respond() as it completes. `slots` bounds the number of jobs
+    in flight, so reading stops while the server is busy. Returns once the
+    stream ends and all of its jobs have been answered.
+
+    Returns:
+        bool: True if a {"command": "shutdown"} request was received
+    """
+    from concurrent.futures import wait
+
+    def run_and_respond(request):
+        try:
+            respond(serve_job(request))
+        finally:
+            slots.release()
+
+    pending = []
+    shutdown = False
+    try:
+        for line in lines:
+            if isinstance(line, bytes):
+                line = line.decode()
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                respond({"error": f"invalid JSON: {e}"})
+                continue
+            if isinstance(request, dict) and request.get("command") == "shutdown":
+                shutdown = True
+                break
+
+            slots.acquire()
+            pending.append(executor.submit(run_and_respond, request))
+    finally:
+        wait(pending)
+    return shutdown
+
+
+def redirect_progress_to_stderr():
+    """
+    Keep stdout for JSON responses: progress messages (including those of
+    --workers child processes, which inherit fd 1) go to stderr from now on.
+
+    Returns:
+        A text stream on the original stdout
+    """
+    sys.stdout.flush()
+    orig_stdout = os.fdopen(os.dup(sys.stdout.fileno()), 'w')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+    return orig_stdout
+
+
+def serve(argv=None):
+    """
+    Long-running job server: `hcd.py serve [--socket PATH] [--jobs N]`.
+
+    Keeps the libraries imported and the DB connection pool open across jobs
+    instead of starting a new interpreter per upload. Jobs are read as JSON
+    lines from stdin (responses on stdout) or from clients of a Unix socket
+    (responses on the same connection); see serve_job() for the format.
+    At most N jobs run at once. EOF on stdin, a {"command": "shutdown"}
+    request, SIGTERM or SIGINT stop intake; running jobs finish before exit.
+    """
+    import argparse
+    import signal
+    import socketserver
+    from concurrent.futures import ThreadPoolExecutor
+
+    global DB_POOL_MAX_CONNECTIONS
+
+    parser = argparse.ArgumentParser(prog="hcd.py serve", description="Heat Cycle Detection job server")
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="Accept jobs on this Unix socket instead of stdin"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=2,
+        metavar="N",
+        help="Maximum number of jobs processed at once (default: 2)"
+    )
+    options = parser.parse_args(argv)
+    max_jobs = max(1, options.jobs)
+    DB_POOL_MAX_CONNECTIONS = max(DB_POOL_MAX_CONNECTIONS, max_jobs)
+
+    orig_stdout = redirect_progress_to_stderr()
+    write_lock = threading.Lock()
+
+    def raise_interrupt(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, raise_interrupt)
+
+    executor = ThreadPoolExecutor(max_workers=max_jobs)
+    slots = threading.BoundedSemaphore(max_jobs)
+    print(f"🚀 hcd serve ready ({max_jobs} concurrent jobs, "
+          f"{'socket ' + options.socket if options.socket else 'stdin'})")
+
+    try:
+        if options.socket:
+            class JobHandler(socketserver.StreamRequestHandler):
+                def handle(self):
+                    def respond(response):
+                        with write_lock:
+                            try:
+                                self.wfile.write((json.dumps(response) + "\n").encode())
+                                self.wfile.flush()
+                            except (OSError, ValueError):
+                                pass
+                    if serve_stream(self.rfile, respond, executor, slots):
+                        threading.Thread(target=self.server.shutdown).start()
+
+            if os.path.exists(options.socket):
+                os.remove(options.socket)
+            server = socketserver.ThreadingUnixStreamServer(options.socket, JobHandler)
+            server.daemon_threads = True
+            try:
+                server.serve_forever()
+            finally:
+                server.server_close()
+                os.remove(options.socket)
+        else:
+            def respond(response):
+                with write_lock:
+                    orig_stdout.write(json.dumps(response) + "\n")
+                    orig_stdout.flush()
+            serve_stream(sys.stdin, respond, executor, slots)
+    except KeyboardInterrupt:
+        print("🛑 Shutdown requested, finishing running jobs")
+    finally:
+        executor.shutdown(wait=True)
+        close_db_pool()
+        print("👋 hcd serve stopped")
+
+# --------------------------------------------------------------------------------
+# Directory watcher (`hcd.py --watch DIR`): uploads are processed as they land
+# --------------------------------------------------------------------------------
+
+WATCH_LEDGER_NAME = ".hcd-watch-ledger.jsonl"
+
+# inotify(7) event masks
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+
+
+def is_upload_name(name):
+    """Excel uploads only: no Office lock files (~$...) and no hidden temp files"""
+    return name.endswith(".xlsx") and not name.startswith("~$") and not name.startswith(".")
+
+
+def upload_is_complete(path):
+    """
+    True once an .xlsx file is fully written. An .xlsx is a zip archive whose
+    central directory is written last, so a file still being copied or
+    assembled from upload chunks has none yet.
+    """
+    import zipfile
+
+    try:
+        return zipfile.is_zipfile(path)
+    except OSError:
+        return False
+
+
+def load_watch_ledger(path):
+    """
+    Uploads already handled, from the ledger's JSON lines.
+
+    Returns:
+        dict: (name, size, mtime_ns) -> "done" or "failed"
+    """
+    handled = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    handled[(entry["name"], entry["size"], entry["mtime-ns"])] = entry["status"]
+                except (ValueError, KeyError, TypeError):
+                    continue  # a line cut short by a crash
+    except FileNotFoundError:
+        pass
+    return handled
+
+
+def append_watch_ledger(path, entry):
+    """Append one ledger line and flush it to disk"""
+    with open(path, 'a') as f:
+        f.write(json.dumps(entry) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def open_inotify(directory):
+    """
+    inotify file descriptor reporting files closed after writing or moved
+    into directory, or None where inotify is unavailable (not Linux, no
+    watches left); the watcher then relies on polling alone.
+    """
+    import ctypes
+    import ctypes.util
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def read_inotify(fd, timeout):
+    """
+    Wait up to timeout seconds for inotify events.
+
+    Returns:
+        set: Names of the files closed after writing or moved in
+    """
+    import select
+    import struct
+
+    names = set()
+    if not select.select([fd], [], [], timeout)[0]:
+        return names
+    try:
+        data = os.read(fd, 64 * 1024)
+    except BlockingIOError:
+        return names
+    offset = 0
+    while offset + 16 <= len(data):
+        _, mask, _, length = struct.unpack_from("iIII", data, offset)
+        name = data[offset + 16:offset + 16 + length].rstrip(b"\0")
+        offset += 16 + length
+        if mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and name:
+            names.add(os.fsdecode(name))
+    return names
+
+
+def watch_uploads(directory, handle, jobs=2, queue_size=16, interval=2.0, ledger_path=None, stop=None,
+                  use_inotify=True):
+    """
+    Feed the completed .xlsx uploads of a directory to handle(path), one call
+    per upload, until stop is set.
+
+    The directory is rescanned every interval seconds, and right away when
+    inotify reports a file closed or moved in. A file is taken once it is a
+    complete .xlsx (see upload_is_complete()) and either inotify saw it closed
+    or it stayed unchanged over a whole interval, so uploads still being
+    copied or assembled from chunks are left alone.
+
+    Taken files wait in a queue of queue_size entries served by `jobs`
+    threads. While the queue is full the scan pauses, so a burst of uploads
+    waits on disk instead of in memory. Each result is appended to the
+    ledger as "done", or "failed" when handle() raised or returned an
+    "error"; an upload in the ledger is not taken again unless its size or
+    modification time changes. Uploads still queued at shutdown are not in
+    the ledger and are taken on the next start.
+
+    Args:
+        directory: Directory to watch
+        handle: Called with each upload's path in a worker thread; returns a
+            JSON-serializable dict
+        jobs: Number of worker threads
+        queue_size: Bound of the work queue
+        interval: Rescan interval in seconds
+        ledger_path: Ledger file (default: {directory}/WATCH_LEDGER_NAME)
+        stop: threading.Event ending the watch (default: never set)
+        use_inotify: Set False to rely on polling alone
+    """
+    import queue
+
+    stop = stop or threading.Event()
+    ledger_path = ledger_path or os.path.join(directory, WATCH_LEDGER_NAME)
+    handled = load_watch_ledger(ledger_path)
+    in_progress = set()
+    lock = threading.Lock()
+    work = queue.Queue(maxsize=max(1, queue_size))
+
+    def worker():
+        while True:
+            item = work.get()
+            if item is None:
+                return
+            path, key = item
+            try:
+                response = handle(path)
+            except Exception as e:
+                print(f"❌ Failed to process upload {path}: {e}")
+                response = {"error": f"{type(e).__name__}: {e}"}
+            status = "failed" if "error" in response else "done"
+            entry = {"name": key[0], "size": key[1], "mtime-ns": key[2], "status": status,
+                     "finished": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+            if "error" in response:
+                entry["error"] = response["error"]
+            with lock:
+                append_watch_ledger(ledger_path, entry)
+                handled[key] = status
+                in_progress.discard(key)
+
+    workers = [threading.Thread(target=worker, name=f"hcd-watch-{i}", daemon=True) for i in range(max(1, jobs))]
+    for thread in workers:
+        thread.start()
+
+    fd = open_inotify(directory) if use_inotify else None
+    if fd is None:
+        print(f"ℹ️  Polling {directory} every {interval:g} s")
+    observed = {}  # name -> (size, mtime_ns) at the previous scan
+    closed = set()  # names inotify reported closed after writing
+    try:
+        while not stop.is_set():
+            names = sorted(name for name in os.listdir(directory) if is_upload_name(name))
+            # Forget files that were removed
+            observed = {name: seen for name, seen in observed.items() if name in names}
+            closed.intersection_update(names)
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    info = os.stat(path)
+                except OSError:
+                    continue
+                key = (name, info.st_size, info.st_mtime_ns)
+                with lock:
+                    known = key in handled or key in in_progress
+                if known:
+                    observed.pop(name, None)
+                    continue
+                settled = name in closed or observed.get(name) == key[1:]
+                observed[name] = key[1:]
+                if not settled or not upload_is_complete(path):
+                    continue
+
+                closed.discard(name)
+                observed.pop(name, None)
+                with lock:
+                    in_progress.add(key)
+                # Backpressure: wait for a free queue slot before scanning on
+                while not stop.is_set():
+                    try:
+                        work.put((path, key), timeout=interval)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    break
+            if fd is not None:
+                closed.update(name for name in read_inotify(fd, interval) if is_upload_name(name))
+            else:
+                stop.wait(interval)
+    finally:
+        stop.set()
+        # Drop what has not started; running uploads finish
+        while True:
+            try:
+                work.get_nowait()
+            except queue.Empty:
+                break
+        for _ in workers:
+            work.put(None)
+        for thread in workers:
+            thread.join()
+        if fd is not None:
+            os.close(fd)
+
+
+def watch(args, orig_stdout=None, log_paths=(None, None)):
+    """
+    `hcd.py --watch DIR [options]`: process every upload that lands in DIR
+    with the other command-line options, as `--input-file` runs would, in
+    one long-lived process. Each upload's JSON summary (plus its "filepath",
+    or {"filepath": ..., "error": ...}) is written to stdout as one line;
+    progress messages go to stderr unless --logging is active. SIGTERM or
+    SIGINT stop intake; running uploads finish before exit.
+    """
+    import argparse
+    import signal
+
+    global DB_POOL_MAX_CONNECTIONS
+
+    if args.input_file:
+        raise ValueError("--watch and --input-file cannot be combined")
+    directory = os.path.abspath(args.watch)
+    if not os.path.isdir(directory):
+        raise ValueError(f"--watch directory not found: {directory}")
+    local_time_from_args(args)  # fail on a bad --timezone before waiting for uploads
+    jobs = max(1, args.watch_jobs)
+    DB_POOL_MAX_CONNECTIONS = max(DB_POOL_MAX_CONNECTIONS, jobs)
+
+    out = orig_stdout or redirect_progress_to_stderr()
+    write_lock = threading.Lock()
+
+    def handle(path):
+        try:
+            response = run(argparse.Namespace(**dict(vars(args), input_file=path, watch=None)), log_paths=log_paths)
+        except Exception as e:
+            response = {"error": f"{type(e).__name__}: {e}"}
+        response = dict(response, filepath=path)
+        with write_lock:
+            out.write(json.dumps(response) + "\n")
+            out.flush()
+        return response
+
+    def raise_interrupt(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, raise_interrupt)
+
+    print(f"👀 Watching {directory} ({jobs} concurrent uploads, queue of {args.watch_queue})")
+    try:
+        watch_uploads(directory, handle, jobs=jobs, queue_size=args.watch_queue, interval=args.watch_interval,
+                      ledger_path=args.watch_ledger)
+    except KeyboardInterrupt:
+        print("🛑 Shutdown requested, finishing running uploads")
+    finally:
+        close_db_pool()
+        print("👋 hcd watch stopped")
+
+# --------------------------------------------------------------------------------
+# Threshold sweeps (`hcd.py sweep`): calibrate DETECTION_PARAMS across the fleet
+# --------------------------------------------------------------------------------
+
+def parse_value_list(cast):
+    """argparse type for a comma-separated list of numbers"""
+    def parse(text):
+        return [cast(value) for value in text.split(",") if value.strip()]
+    parse.__name__ = f"{cast.__name__} list"
+    return parse
+
+
+def sweep(argv=None):
+    """
+    Threshold calibration: `hcd.py sweep [PATH ...] --on-delta 4,5,6 ...`.
+
+    Each device sheet (or Parquet minute series from --parquet) is loaded and
+    cleaned once, then every combination of the listed thresholds is
+    evaluated on it with sweep_minutes(). Inputs are spread over --workers
+    processes. The CSV has one row per parameter set with the fleet totals
+    (or one row per device and set with --per-device), plus the average
+    heating minutes of Enable and Disable hours.
+
+    Returns:
+        Exit status (1 if no input could be evaluated)
+    """
+    import argparse
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(prog="hcd.py sweep",
+                                     description="Evaluate a grid of detection thresholds over device exports")
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        metavar="PATH",
+        help=".xlsx exports, .parquet minute series or directories of them (default: current directory)"
+    )
+    for key, cast in [("on_delta", float), ("off_delta", float), ("min_diff", float), ("min_fraction", float),
+                      ("min_minutes", int)]:
+        parser.add_argument(
+            "--" + key.replace("_", "-"),
+            dest=key,
+            type=parse_value_list(cast),
+            default=[DETECTION_PARAMS[key]],
+            metavar="V[,V...]",
+            help=f"Values to try (default: {DETECTION_PARAMS[key]})"
+        )
+    parser.add_argument(
+        "--per-device",
+        action="store_true",
+        help="One row per device and parameter set instead of fleet totals"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Evaluate inputs across N worker processes (default: 1)"
+    )
+    parser.add_argument(
+        "--output",
+        metavar="FILE",
+        help="Write the CSV to FILE instead of stdout"
+    )
+    args = parser.parse_args(argv)
+    grid = {key: getattr(args, key) for key in DETECTION_PARAMS}
+    for key, values in grid.items():
+        if not values:
+            parser.error(f"--{key.replace('_', '-')} needs at least one value")
+
+    out = None if args.output else redirect_progress_to_stderr()
+
+    # (filepath, sheet name or None), one per device
+    tasks = []
+    for path in args.paths or [os.getcwd()]:
+        if os.path.isdir(path):
+            filepaths = [os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.endswith((".xlsx", ".parquet")) and not name.startswith("~$")]
+        else:
+            filepaths = [path]
+        for filepath in filepaths:
+            sheets = device_sheet_names(filepath) if filepath.endswith(".xlsx") else []
+            if len(sheets) > 1:
+                tasks.extend((filepath, sheet) for sheet in sheets)
+            else:
+                tasks.append((filepath, None))
+
+    start = time.perf_counter()
+    results = []
+    if args.workers <= 1 or len(tasks) <= 1:
+        for filepath, sheet in tasks:
+            try:
+                results.append(sweep_file(filepath, grid, sheet))
+            except Exception as e:
+                print(f"❌ Failed to sweep {filepath}: {e}")
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            futures = [executor.submit(sweep_file, filepath, grid, sheet) for filepath, sheet in tasks]
+            for (filepath, _), future in zip(tasks, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    print(f"❌ Failed to sweep {filepath}: {e}")
+    if not results:
+        print("❌ No device could be evaluated")
+        return 1
+
+    table = pd.concat(results, ignore_index=True)
+    if not args.per_device:
+        params = list(DETECTION_PARAMS)
+        table = table.groupby(params, sort=False)[SWEEP_METRICS].sum().reset_index()
+        table.insert(len(params), "devices", len(results))
+    # Minutes only count in Enable/Disable hours, so no hours means 0 / 0: left empty
+    table["avg_minutes_enable"] = (table["enable_heating_minutes"] / table["enable_hours"]).round(2)
+    table["avg_minutes_disable"] = (table["disable_heating_minutes"] / table["disable_hours"]).round(2)
+
+    if args.output:
+        table.to_csv(args.output, index=False)
+    else:
+        table.to_csv(out, index=False)
+        out.flush()
+    sets = len(table) if not args.per_device else len(table) // len(results)
+    print(f"⏱️  {sets} parameter sets x {len(results)} devices evaluated in {time.perf_counter() - start:.1f} s")
+    return 0
+
+# --------------------------------------------------------------------------------
+# Fleet reports (`hcd.py report`): aggregates computed by PostgreSQL
+# --------------------------------------------------------------------------------
+
+# Source rows for the report queries, one per (device, hour) from the readings
+# table or one per (device, UTC day, Enable/Disable) from the heating_device_daily
+# rollup (sql/fleet-report-rollup.sql). Both expose the same columns, and the
+# raw one is inlined by the planner so the (device_serial, epoch_date_stamp)
+# primary key still serves the range and serial filters.
+REPORT_SOURCES = {
+    "raw": """
+        SELECT device_serial, device_name, epoch_date_stamp, energy_saver_on,
+               1 AS hours, heating_on_minutes AS heating_minutes,
+               date_stamp AS first_hour, date_stamp AS last_hour
+        FROM heating_device_data
+    """,
+    "rollup": """
+        SELECT device_serial, device_name, epoch_date_stamp, energy_saver_on,
+               hours, heating_minutes, first_hour, last_hour
+        FROM heating_device_daily
+    """,
+}
+
+REPORT_QUERIES = {
+    # Fleet-wide heating minutes per (UTC) hour, split by energy saver state
+    "hourly": """
+        SELECT first_hour AS hour_utc,
+               COUNT(*) AS devices,
+               COUNT(*) FILTER (WHERE energy_saver_on) AS enable_devices,
+               COUNT(*) FILTER (WHERE NOT energy_saver_on) AS disable_devices,
+               SUM(heating_minutes)::bigint AS heating_minutes,
+               ROUND(AVG(heating_minutes) FILTER (WHERE energy_saver_on), 2)::float8 AS avg_minutes_enable,
+               ROUND(AVG(heating_minutes) FILTER (WHERE NOT energy_saver_on), 2)::float8 AS avg_minutes_disable
+        FROM ({source}) AS src
+        WHERE {where}
+        GROUP BY first_hour
+        ORDER BY first_hour
+    """,
+    # Per device: average heating minutes in Enable vs Disable hours
+    "savings": """
+        WITH per_device AS (
+            SELECT device_serial,
+                   MAX(device_name) AS device_name,
+                   COALESCE(SUM(hours) FILTER (WHERE energy_saver_on), 0)::bigint AS enable_hours,
+                   COALESCE(SUM(hours) FILTER (WHERE NOT energy_saver_on), 0)::bigint AS disable_hours,
+                   (SUM(heating_minutes) FILTER (WHERE energy_saver_on))::numeric
+                       / NULLIF(SUM(hours) FILTER (WHERE energy_saver_on), 0) AS avg_enable,
+                   (SUM(heating_minutes) FILTER (WHERE NOT energy_saver_on))::numeric
+                       / NULLIF(SUM(hours) FILTER (WHERE NOT energy_saver_on), 0) AS avg_disable
+            FROM ({source}) AS src
+            WHERE {where}
+            GROUP BY device_serial
+        )
+        SELECT device_serial,
+               device_name,
+               enable_hours,
+               disable_hours,
+               ROUND(avg_enable, 2)::float8 AS avg_minutes_enable,
+               ROUND(avg_disable, 2)::float8 AS avg_minutes_disable,
+               ROUND(avg_disable - avg_enable, 2)::float8 AS savings_minutes_per_hour,
+               ROUND(100 * (avg_disable - avg_enable) / NULLIF(avg_disable, 0), 1)::float8 AS savings_pct
+        FROM per_device
+        ORDER BY device_serial
+    """,
+    # Per device totals
+    "devices": """
+        SELECT device_serial,
+               MAX(device_name) AS device_name,
+               SUM(hours)::bigint AS hours,
+               COALESCE(SUM(hours) FILTER (WHERE energy_saver_on), 0)::bigint AS enable_hours,
+               COALESCE(SUM(hours) FILTER (WHERE NOT energy_saver_on), 0)::bigint AS disable_hours,
+               SUM(heating_minutes)::bigint AS heating_minutes,
+               MIN(first_hour) AS first_hour_utc,
+               MAX(last_hour) AS last_hour_utc
+        FROM ({source}) AS src
+        WHERE {where}
+        GROUP BY device_serial
+        ORDER BY device_serial
+    """,
+}
+
+REFRESH_ROLLUP_QUERY = "REFRESH MATERIALIZED VIEW CONCURRENTLY heating_device_daily"
+
+
+def parse_report_time(value):
+    """Epoch seconds of an ISO date or date/time given in UTC (argparse type)"""
+    import argparse
+
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an ISO date or date/time: {value!r}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def build_report_query(kind, start_epoch, end_epoch, serials=None, rollup=False):
+    """
+    SQL and parameters for one fleet report.
+
+    Args:
+        kind: "hourly", "savings" or "devices" (see REPORT_QUERIES)
+        start_epoch, end_epoch: UTC range [start, end) on epoch_date_stamp
+        serials: Device serials to include (normalized with hex_upper); all if empty
+        rollup: Read the heating_device_daily rollup instead of the readings.
+            The range must then fall on UTC day boundaries; "hourly" needs the
+            readings.
+
+    Returns:
+        Tuple (query, params) for cursor.execute()
+    """
+    if rollup:
+        if kind == "hourly":
+            raise ValueError("the hourly report needs hourly readings; run it without --rollup")
+        if start_epoch % 86400 or end_epoch % 86400:
+            raise ValueError("--rollup has daily rows; --from and --to must be UTC dates")
+
+    where = ["epoch_date_stamp >= %(start)s", "epoch_date_stamp < %(end)s"]
+    params = {"start": start_epoch, "end": end_epoch}
+    if serials:
+        where.append("device_serial = ANY(%(serials)s)")
+        params["serials"] = sorted({hex_upper(serial) for serial in serials})
+
+    query = REPORT_QUERIES[kind].format(source=REPORT_SOURCES["rollup" if rollup else "raw"].strip(),
+                                        where=" AND ".join(where))
+    return query, params
+
+
+def write_report_csv(cur, query, params, out):
+    """Stream a report to the file object out as CSV with COPY ... TO STDOUT"""
+    bound = cur.mogrify(query, params).decode()
+    cur.copy_expert(f"COPY ({bound}) TO STDOUT WITH (FORMAT csv, HEADER)", out)
+
+
+def write_report_parquet(conn, query, params, path, batch_rows=50000):
+    """
+    Stream a report to a Parquet file (requires pyarrow), batch_rows rows at a
+    time through a server-side cursor.
+
+    Returns:
+        Number of rows written
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # PostgreSQL type OIDs of the report columns; anything else is written as text
+    arrow_types = {16: pa.bool_(), 20: pa.int64(), 23: pa.int32(), 701: pa.float64(),
+                   1114: pa.timestamp("us")}
+
+    def column_array(values, arrow_type):
+        if arrow_type == pa.string():
+            values = [None if value is None else str(value) for value in values]
+        return pa.array(values, type=arrow_type)
+
+    rows_written = 0
+    with conn.cursor(name="hcd_report") as cur:
+        cur.itersize = batch_rows
+        cur.execute(query, params)
+        batch = cur.fetchmany(batch_rows)
+        schema = pa.schema([(column.name, arrow_types.get(column.type_code, pa.string()))
+                            for column in cur.description])
+        with pq.ParquetWriter(path, schema) as writer:
+            while batch:
+                columns = list(zip(*batch))
+                writer.write_table(pa.Table.from_arrays(
+                    [column_array(values, field.type) for values, field in zip(columns, schema)],
+                    schema=schema
+                ))
+                rows_written += len(batch)
+                batch = cur.fetchmany(batch_rows)
+    return rows_written
+
+
+def report(argv=None):
+    """
+    Fleet report: `hcd.py report --from DATE --to DATE [--serial S ...]`.
+
+    Aggregates heating_device_data in PostgreSQL and streams the result out
+    as CSV (COPY) or Parquet; raw readings are never loaded into Python.
+    Progress messages go to stderr so CSV can be written to stdout.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="hcd.py report", description="Heat Cycle Detection fleet report")
+    parser.add_argument(
+        "--kind",
+        choices=sorted(REPORT_QUERIES),
+        default="savings",
+        help="hourly: fleet heating minutes per hour; savings: per-device Enable vs Disable "
+             "heating minutes; devices: per-device totals (default: savings)"
+    )
+    parser.add_argument(
+        "--from",
+        dest="start",
+        type=parse_report_time,
+        metavar="DATE",
+        help="Start of the range, inclusive (ISO date or date/time, UTC)"
+    )
+    parser.add_argument(
+        "--to",
+        dest="end",
+        type=parse_report_time,
+        metavar="DATE",
+        help="End of the range, exclusive (ISO date or date/time, UTC)"
+    )
+    parser.add_argument(
+        "--serial",
+        action="append",
+        default=[],
+        metavar="SERIAL",
+        help="Only include this device (repeatable; default: all devices)"
+    )
+    parser.add_argument(
+        "--format",
+        choices=["csv", "parquet"],
+        help="Output format (default: from the --output suffix, else csv)"
+    )
+    parser.add_argument(
+        "--output",
+        metavar="PATH",
+        help="Output file (default: CSV on stdout)"
+    )
+    parser.add_argument(
+        "--rollup",
+        action="store_true",
+        help="Read the heating_device_daily rollup (see sql/fleet-report-rollup.sql); "
+             "whole UTC days only"
+    )
+    parser.add_argument(
+        "--refresh-rollup",
+        action="store_true",
+        help="Refresh the heating_device_daily rollup before reporting (or on its own)"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Display the SQL and parameters without connecting"
+    )
+    options = parser.parse_args(argv)
+
+    if options.start is None or options.end is None:
+        if not options.refresh_rollup:
+            parser.error("--from and --to are required")
+    elif options.end <= options.start:
+        parser.error("--to must be after --from")
+    fmt = options.format or ("parquet" if (options.output or "").endswith(".parquet") else "csv")
+    if fmt == "parquet" and not options.output:
+        parser.error("--format parquet needs --output")
+
+    query = params = None
+    if options.start is not None and options.end is not None:
+        try:
+            query, params = build_report_query(options.kind, options.start, options.end,
+                                               serials=options.serial, rollup=options.rollup)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if options.dry_run:
+        if options.refresh_rollup:
+            print(f"Dry run: would execute SQL:\n{REFRESH_ROLLUP_QUERY}")
+        if query:
+            print(f"Dry run: would execute SQL:\n{query.strip()}\nwith parameters {params}")
+        return 0
+
+    conn = connect_to_postgres()
+    try:
+        if options.refresh_rollup:
+            with conn.cursor() as cur:
+                cur.execute(REFRESH_ROLLUP_QUERY)
+            conn.commit()
+            print("✅ Refreshed heating_device_daily", file=sys.stderr)
+        if query is None:
+            return 0
+
+        if fmt == "parquet":
+            try:
+                rows_written = write_report_parquet(conn, query, params, options.output)
+            except ImportError as e:
+                print(f"❌ Parquet output requires pyarrow: {e}", file=sys.stderr)
+                return 1
+            print(f"📊 {options.kind} report ({rows_written} rows) written to: {options.output}", file=sys.stderr)
+        elif options.output:
+            with open(options.output, "w", newline="") as out, conn.cursor() as cur:
+                write_report_csv(cur, query, params, out)
+            print(f"📊 {options.kind} report written to: {options.output}", file=sys.stderr)
+        else:
+            with conn.cursor() as cur:
+                write_report_csv(cur, query, params, sys.stdout)
+            sys.stdout.flush()
+    finally:
+        conn.rollback()
+        conn.close()
+    return 0
+
+
+def main():
+    """
+    Main entry point for the Heat Cycle Detection script.
+    - Defaults to current working directory for source_folder.
+    - If --input-file is provided, only that file is processed.
+    - Otherwise, processes all .xlsx files in the current directory.
+    - `hcd.py serve` starts a long-running job server instead (see serve()).
+    - `hcd.py report` writes a fleet report from the database (see report()).
+    - `hcd.py sweep` evaluates grids of detection thresholds (see sweep()).
+    - `--watch DIR` keeps processing the uploads that appear in DIR (see watch()).
+    """
+    if sys.argv[1:2] == ["serve"]:
+        serve(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["report"]:
+        sys.exit(report(sys.argv[2:]))
+    if sys.argv[1:2] == ["sweep"]:
+        sys.exit(sweep(sys.argv[2:]))
+
+    args = build_arg_parser().parse_args()
+
+    # Capture original stdout to ensure JSON summary always goes there
+    orig_stdout = sys.stdout
+
+    # Setup logging redirection if requested
+    out_log_path = err_log_path = None
+    if args.logging:
+        now = datetime.now()
+        now_str = now.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-4]
+        logs_dir = os.path.join(os.getcwd(), "logs")
+        os.makedirs(logs_dir, exist_ok=True)
+        out_log_path = os.path.join(logs_dir, f"{now_str}.out.log")
+        err_log_path = os.path.join(logs_dir, f"{now_str}.err.log")
+        out_f = open(out_log_path, 'w')
+        err_f = open(err_log_path, 'w')
+        sys.stdout = out_f
+        sys.stderr = err_f
+        print(f"Logging to {out_log_path} (stdout) and {err_log_path} (stderr)", file=sys.stderr)
+
+    if args.watch:
+        watch(args, orig_stdout=orig_stdout if args.logging else None, log_paths=(out_log_path, err_log_path))
+        return
+
+    summary_obj = run(args, log_paths=(out_log_path, err_log_path))
+
+    close_db_pool()
+
+    # Output JSON summary regardless of logging
     orig_stdout.write(json.dumps(summary_obj) + "\n")
 
 if __name__ == "__main__":
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Unit tests for clean_timestamps() in hcd.py
+
+Duplicates keep their last row, missing minutes are filled and discarded,
+rows with an empty cell are reported, and the columns come back typed.
+"""
+
+import sys
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from hcd import clean_timestamps, parse_export_dates
+
+
+def make_rows():
+    """Test Run rows as process_file() hands them to clean_timestamps()"""
+    df = pd.DataFrame({
+        "Device Name": "RTU 1",
+        "MAC Serial #": "80646F000001",
+        "Date": ["2025-01-01 00:00", "2025-01-01 00:01", "2025-01-01 00:01",
+                 "2025-01-01 00:04", "2025-01-01 00:02", "2025-01-01 00:05"],
+        "Supply Temp/C": [20.0, 21.0, 22.0, 23.0, 24.0, np.nan],
+        "Return Temp/C": [15.0, 15.0, 15.0, 15.0, 15.0, 15.0],
+        "Mode": ["H", "H", "H", np.nan, "H", "H"],
+        "State": ["Enable", "Enable", "Disable", "Disable", "Enable", "Enable"],
+        "Note": "Test Run",
+    })
+    df["Enable"] = (df["State"] == "Enable").to_numpy()
+    df["Disable"] = (df["State"] == "Disable").to_numpy()
+    return df
+
+
+def test_duplicates_gaps_and_discarded_rows():
+    """Last duplicate wins, the 00:03 gap is filled from 00:02 and discarded"""
+    df, discarded = clean_timestamps(make_rows())
+
+    assert list(df["Date"].dt.strftime("%H:%M")) == ["00:00", "00:01", "00:02", "00:04"]
+    assert list(df["Supply Temp/C"]) == [20.0, 22.0, 24.0, 23.0]
+    assert list(df["Enable"]) == [True, False, True, False]
+    assert list(df.columns) == ["Date", "Device Name", "MAC Serial #", "Supply Temp/C", "Return Temp/C",
+                                "Mode", "State", "Note", "Enable", "Disable"]
+
+    # The duplicate first, then the gap, the row without Mode and the row without supply
+    assert list(discarded["Date"].dt.strftime("%H:%M")) == ["00:01", "00:03", "00:04", "00:05"]
+    assert discarded["Supply Temp/C"].iloc[0] == 21.0
+    gap = discarded.iloc[1]
+    assert gap["Device Name"] == "RTU 1" and bool(gap["Enable"]) is True and pd.isna(gap["State"])
+    print("✅ Duplicate and gap tests passed")
+
+
+def test_typed_columns():
+    """State/Note are categorical and Enable/Disable stay boolean"""
+    df, discarded = clean_timestamps(make_rows())
+    assert isinstance(df["State"].dtype, pd.CategoricalDtype)
+    assert isinstance(df["Note"].dtype, pd.CategoricalDtype)
+    assert df["Enable"].dtype == bool and df["Disable"].dtype == bool
+    assert df["Date"].dtype == "datetime64[ns]"
+    print("✅ Typed column tests passed")
+
+
+def test_parse_export_dates():
+    """Day == month dates parse with the ISO format, without the dateutil fallback"""
+    with warnings.catch_warnings():
+        warnings.filterwarnings("error", message="Could not infer format")
+        dates = parse_export_dates(pd.Series(["2025-01-01 00:00", "2025-01-01 00:01", "2025-01-13 23:59"]))
+    assert dates.tolist() == [pd.Timestamp("2025-01-01 00:00"), pd.Timestamp("2025-01-01 00:01"),
+                              pd.Timestamp("2025-01-13 23:59")]
+
+    # Other layouts are parsed element by element
+    dates = parse_export_dates(pd.Series(["01/13/2025 10:00", "2025-01-14 10:00"]))
+    assert dates.tolist() == [pd.Timestamp("2025-01-13 10:00"), pd.Timestamp("2025-01-14 10:00")]
+    print("✅ Date parsing tests passed")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the background DB writer of batch runs in hcd.py
+
+Files written by background_db_writer() must get the same results as
+writing each one before processing the next, even when several of them
+share a transaction or that transaction fails.
+"""
+
+import glob
+import shutil
+import sys
+import os
+import threading
+import time
+import warnings
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import hcd
+from hcd import process_batch
+
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
+
+TEST_DIR = os.path.dirname(__file__)
+SAMPLE_FILES = sorted(glob.glob(os.path.join(TEST_DIR, '*.xlsx')))
+
+
+def make_jobs(tmp_path, count):
+    """count uploads, alternating between the two sample exports"""
+    jobs = []
+    for i in range(count):
+        filepath = str(tmp_path / f"upload-{i}.xlsx")
+        shutil.copy(SAMPLE_FILES[i % 2], filepath)
+        jobs.append((filepath, str(tmp_path / f"upload-{i}_heat min per hour.xlsx")))
+    return jobs
+
+
+def without_timings(results):
+    stripped = []
+    for summary_rows, devices, readings, serials, stats in results:
+        stats = {key: value for key, value in stats.items() if key not in ('stage_seconds', 'total_seconds',
+                                                                          'peak_rss_mb', 'stage_peak_mb')}
+        stripped.append((summary_rows, devices, readings, serials, stats))
+    return stripped
+
+
+def record_transactions(monkeypatch, jobs, fail_for=None):
+    """
+    Record the files of each insert_summaries_to_db() call, and fail a
+    transaction holding fail_for like a DB error would. The first transaction
+    is held until every job is processed (a slow database), so the others
+    queue up behind it.
+    """
+    transactions = []
+    processed = threading.Event()
+    insert_summaries_to_db = hcd.insert_summaries_to_db
+    process_sheet = hcd.process_sheet
+    calls = []
+
+    def process(*args, **kwargs):
+        result = process_sheet(*args, **kwargs)
+        calls.append(args)
+        if len(calls) == len(jobs):
+            processed.set()
+        return result
+
+    def wrapper(summaries, **kwargs):
+        transactions.append([os.path.basename(stats['filepath']) for _, stats in summaries])
+        if len(transactions) == 1:
+            assert processed.wait(timeout=60)
+            time.sleep(0.5)  # the last job is queued right after it is processed
+        if fail_for in transactions[-1]:
+            for _, stats in summaries:
+                stats['status'] = 'error_db_insertion'
+            return [(0, 0, [])] * len(summaries)
+        return insert_summaries_to_db(summaries, **kwargs)
+    monkeypatch.setattr(hcd, "process_sheet", process)
+    monkeypatch.setattr(hcd, "insert_summaries_to_db", wrapper)
+    return transactions
+
+
+def test_writer_coalesces_and_matches_inline(tmp_path, monkeypatch):
+    """Files waiting for the writer share a transaction; results equal inline writes"""
+    jobs = make_jobs(tmp_path, 6)
+    inline = process_batch(jobs, insert_db=True, dry_run=True, outputs="none")
+
+    transactions = record_transactions(monkeypatch, jobs)
+    finished = []
+    background = process_batch(jobs, insert_db=True, dry_run=True, outputs="none", db_queue=8,
+                               on_done=lambda index, results: finished.append((index, threading.current_thread().name)))
+    assert without_timings(background) == without_timings(inline)
+    assert sorted(name for transaction in transactions for name in transaction) == \
+        sorted(os.path.basename(filepath) for filepath, _ in jobs)
+    assert transactions == [["upload-0.xlsx"], [f"upload-{i}.xlsx" for i in range(1, 6)]]
+    assert [index for index, _ in finished] == list(range(len(jobs)))
+    assert {name for _, name in finished} == {"hcd-db-writer"}
+    assert all(stats['stage_seconds']['db_insert'] >= 0 for *_, stats in background)
+    print("✅ Background writer tests passed")
+
+
+def test_failed_transaction_is_retried_per_file(tmp_path, monkeypatch):
+    """Only the file whose rows fail its transaction gets error_db_insertion"""
+    jobs = make_jobs(tmp_path, 4)
+    transactions = record_transactions(monkeypatch, jobs, fail_for="upload-2.xlsx")
+    results = process_batch(jobs, insert_db=True, dry_run=True, outputs="none", db_queue=8)
+
+    assert [stats['status'] for *_, stats in results] == ['success', 'success', 'error_db_insertion', 'success']
+    assert [readings for _, _, readings, _, _ in results][:2] == [29, 43]
+    assert transactions == [["upload-0.xlsx"], ["upload-1.xlsx", "upload-2.xlsx", "upload-3.xlsx"],
+                            ["upload-1.xlsx"], ["upload-2.xlsx"], ["upload-3.xlsx"]]
+    print("✅ Writer failure isolation tests passed")
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the batched heating_device_data writes in hcd.py
+
+execute_values() is replaced with a stand-in so the counting logic can be
+tested without a database. Set HCD_TEST_PG=1 (with the usual PGHOST_2 /
+PGDATABASE_2 / PGUSER_2 / PGPORT_2 variables) to also run the writes against
+a real PostgreSQL server; that test only touches TEMP tables.
+"""
+
+import sys
+import os
+from datetime import datetime
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pandas as pd
+import pytest
+
+import hcd
+from hcd import (build_reading_rows, resolve_devices, cache_device_ids, write_reading_rows, local_hours_to_utc,
+                 insert_summary_to_db, new_device_stats, LOCAL_TIME)
+
+
+def make_summary_df():
+    return pd.DataFrame({
+        "Device Name": ["RTU 9", "RTU 9"],
+        "MAC Serial #": ["80646f049736", "80646f049736"],
+        "Date/Time On": pd.to_datetime(["2025-01-15 08:00", "2025-07-15 09:00"]),
+        "Date/Time Off": pd.to_datetime(["2025-01-15 08:59", "2025-07-15 09:59"]),
+        "Enable": [1, ""],
+        "Disable": ["", 1],
+        "Heating On": [42, 7],
+    })
+
+
+def test_build_reading_rows():
+    """Summary rows become normalized, UTC-stamped parameter tuples"""
+    rows = build_reading_rows(make_summary_df())
+    assert rows[0][:6] == ("80646F049736", 1736946000, datetime(2025, 1, 15, 13, 0), True, 42, "RTU 9")
+    # Daylight saving time: Detroit is UTC-4 in July
+    assert rows[1][:6] == ("80646F049736", 1752584400, datetime(2025, 7, 15, 13, 0), False, 7, "RTU 9")
+    assert rows[1][6:] == (pd.Timestamp("2025-07-15 09:00"), pd.Timestamp("2025-07-15 09:59"))
+    print("✅ Row building tests passed")
+
+
+def test_local_hours_to_utc_dst_policies():
+    """The repeated fall-back hour and the skipped spring-forward hour follow the policies"""
+    fall_back = ["2025-11-02 00:00", "2025-11-02 01:00", "2025-11-02 02:00"]
+    assert list(local_hours_to_utc(fall_back)) == list(pd.to_datetime(
+        ["2025-11-02 04:00", "2025-11-02 05:00", "2025-11-02 07:00"]))
+    assert local_hours_to_utc(fall_back, ambiguous="second")[1] == pd.Timestamp("2025-11-02 06:00")
+    assert pd.isna(local_hours_to_utc(fall_back, ambiguous="drop")[1])
+    with pytest.raises(ValueError):
+        local_hours_to_utc(fall_back, ambiguous="error")
+
+    spring_forward = ["2025-03-09 01:00", "2025-03-09 02:00", "2025-03-09 03:00"]
+    # Shifted one hour later, onto the same UTC hour as 03:00 local
+    assert list(local_hours_to_utc(spring_forward)) == list(pd.to_datetime(
+        ["2025-03-09 06:00", "2025-03-09 07:00", "2025-03-09 07:00"]))
+    assert pd.isna(local_hours_to_utc(spring_forward, nonexistent="drop")[1])
+    with pytest.raises(ValueError):
+        local_hours_to_utc(spring_forward, nonexistent="error")
+
+    assert local_hours_to_utc(["2025-01-15 08:00"], "America/Chicago")[0] == pd.Timestamp("2025-01-15 14:00")
+    print("✅ DST policy tests passed")
+
+
+def test_build_reading_rows_local_time():
+    """Per-device zones and the drop/error policies reach the DB rows"""
+    chicago = dict(LOCAL_TIME, device_timezones={"80646F049736": "America/Chicago"})
+    rows = build_reading_rows(make_summary_df(), local_time=chicago)
+    assert rows[0][1:3] == (1736949600, datetime(2025, 1, 15, 14, 0))
+
+    summary_df = make_summary_df()
+    summary_df["Date/Time On"] = pd.to_datetime(["2025-11-02 01:00", "2025-11-02 02:00"])
+    rows = build_reading_rows(summary_df, local_time=dict(LOCAL_TIME, ambiguous="drop"))
+    assert [row[2] for row in rows] == [datetime(2025, 11, 2, 7, 0)]
+
+    device_stats = new_device_stats("example.xlsx")
+    result = insert_summary_to_db(summary_df, device_stats, dry_run=True,
+                                  local_time=dict(LOCAL_TIME, ambiguous="error"))
+    assert result == (0, 0, [])
+    assert device_stats["status"] == "error_local_time"
+    print("✅ Local time row tests passed")
+
+
+def test_write_counts_from_returning(monkeypatch):
+    """Inserted/updated/skipped come from the RETURNING rows, not attempts"""
+    calls = []
+
+    def fake_execute_values(cur, query, rows, page_size=100, fetch=False):
+        calls.append((query, list(rows), page_size, fetch))
+        # 2 new rows, 1 updated row, 1 row skipped by DO NOTHING
+        return [(True,), (False,), (True,)]
+
+    monkeypatch.setattr(hcd, "execute_values", fake_execute_values)
+    rows = build_reading_rows(make_summary_df()) * 2
+
+    assert write_reading_rows(object(), rows, do_upserts=True) == (2, 1, 1)
+    query, sent_rows, _, fetch = calls[-1]
+    assert "DO UPDATE" in query and fetch and sent_rows == rows
+
+    assert write_reading_rows(object(), rows, do_upserts=False)[2] == 1
+    assert "DO NOTHING" in calls[-1][0]
+
+    assert write_reading_rows(object(), [], do_upserts=False) == (0, 0, 0)
+    assert len(calls) == 2
+    print("✅ Write count tests passed")
+
+
+class RecordingCursor:
+    """Cursor stand-in that answers RESOLVE_DEVICES_QUERY from a dict of device ids"""
+
+    def __init__(self, existing):
+        self.existing = existing
+        self.statements = []
+
+    def execute(self, query, params):
+        self.statements.append(params)
+        self.result = [(self.existing[serial], serial) for serial in params["serials"]]
+
+    def fetchall(self):
+        return self.result
+
+
+def test_resolve_devices_uses_cache(monkeypatch):
+    """Unknown serials are resolved in one statement; cached ones skip the database"""
+    monkeypatch.setattr(hcd, "_device_ids", {"B0A732E61EBA": 7})
+    cur = RecordingCursor({"80646F049736": 45, "80646FFFB17E": 46})
+
+    device_ids = resolve_devices(cur, ["80646FFFB17E", "B0A732E61EBA", "80646F049736", "80646FFFB17E"])
+    assert device_ids == {"80646F049736": 45, "80646FFFB17E": 46, "B0A732E61EBA": 7}
+    assert cur.statements == [{"serials": ["80646F049736", "80646FFFB17E"]}]
+
+    cache_device_ids(device_ids)
+    assert resolve_devices(cur, ["80646F049736"]) == {"80646F049736": 45}
+    assert len(cur.statements) == 1
+    print("✅ Device cache tests passed")
+
+
+@pytest.mark.skipif(not os.getenv("HCD_TEST_PG"), reason="set HCD_TEST_PG=1 to run against PostgreSQL")
+def test_resolve_devices_against_postgres(monkeypatch):
+    """New and existing devices come back from a single upsert-and-select"""
+    monkeypatch.setattr(hcd, "_device_ids", {})
+    conn = hcd.connect_to_postgres()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TEMP TABLE heating_device (
+                    device_id SERIAL PRIMARY KEY,
+                    device_serial VARCHAR(20) UNIQUE NOT NULL
+                )
+            """)
+            cur.execute("INSERT INTO heating_device (device_serial) VALUES ('80646F049736')")
+            device_ids = resolve_devices(cur, ["B0A732E61EBA", "80646F049736", "B0A732E61EBA"])
+            assert set(device_ids) == {"80646F049736", "B0A732E61EBA"}
+            assert device_ids["80646F049736"] == 1
+            cur.execute("SELECT device_id FROM heating_device WHERE device_serial = 'B0A732E61EBA'")
+            assert cur.fetchone()[0] == device_ids["B0A732E61EBA"]
+            assert resolve_devices(cur, ["B0A732E61EBA"]) == {"B0A732E61EBA": device_ids["B0A732E61EBA"]}
+    finally:
+        conn.rollback()
+        conn.close()
+    print("✅ PostgreSQL device tests passed")
+
+
+@pytest.mark.skipif(not os.getenv("HCD_TEST_PG"), reason="set HCD_TEST_PG=1 to run against PostgreSQL")
+def test_write_against_postgres():
+    """DO NOTHING skips existing keys; upserts report updates"""
+    conn = hcd.connect_to_postgres()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TEMP TABLE heating_device_data (
+                    device_serial VARCHAR(20) NOT NULL,
+                    epoch_date_stamp BIGINT NOT NULL,
+                    date_stamp TIMESTAMP NOT NULL,
+                    energy_saver_on BOOLEAN NOT NULL,
+                    heating_on_minutes INTEGER NOT NULL,
+                    device_name VARCHAR(100),
+                    date_time_on TIMESTAMP,
+                    date_time_off TIMESTAMP,
+                    PRIMARY KEY (device_serial, epoch_date_stamp)
+                )
+            """)
+            rows = build_reading_rows(make_summary_df())
+            assert write_reading_rows(cur, rows[:1]) == (1, 0, 0)
+            assert write_reading_rows(cur, rows) == (1, 0, 1)
+            assert write_reading_rows(cur, rows, do_upserts=True) == (0, 2, 0)
+    finally:
+        conn.rollback()
+        conn.close()
+    print("✅ PostgreSQL write tests passed")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Property tests for detect_heating() in hcd.py
+
+detect_heating() replaced the per-row state machine loop in process_file.
+Its output must be bit-identical to that loop, so the original loop is kept
+here as the reference and both are run over randomized supply/return series:
+- random walks with large jumps and drops around the 5 / -2.7 thresholds
+- values on a 0.1 grid so deltas land exactly on the thresholds
+- NaN readings, empty and single-row inputs
+"""
+
+import sys
+import os
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+
+from hcd import detect_heating
+
+
+def legacy_detect_heating(supply, return_temp, on_delta=5, off_delta=-2.7):
+    """Per-row loop from process_file before detect_heating() existed"""
+    heating_state, heating_group = [], []
+    in_heating = False
+    group_id = 0
+    triggered_rows = set()
+
+    for i in range(len(supply)):
+        if i == 0:
+            heating_state.append("Off")
+            heating_group.append(0)
+            continue
+
+        delta = supply[i] - supply[i - 1]
+        if (not in_heating
+            and delta > on_delta
+            and supply[i] > return_temp[i]
+            and i not in triggered_rows):
+            in_heating = True
+            group_id += 1
+            heating_state.append("On")
+            heating_group.append(group_id)
+            triggered_rows.add(i)
+
+        elif in_heating and delta <= off_delta:
+            in_heating = False
+            heating_state.append("Off")
+            heating_group.append(0)
+
+        else:
+            heating_state.append("On" if in_heating else "Off")
+            heating_group.append(group_id if in_heating else 0)
+
+    return heating_state, heating_group
+
+
+def random_series(rng, n, nan_fraction=0.0):
+    """Random supply/return walk with occasional heating ramps and drops"""
+    steps = rng.choice([0.0, 0.1, -0.1, 0.3, -0.3, 2.7, -2.7, 5.0, 5.1, -3.0, 8.0, -8.0],
+                       size=n, p=[.3, .15, .15, .1, .1, .03, .03, .03, .03, .03, .025, .025])
+    supply = np.round(20 + np.cumsum(steps), 1)
+    return_temp = np.round(supply - rng.normal(2, 6, size=n), 1)
+    if nan_fraction:
+        supply[rng.random(n) < nan_fraction] = np.nan
+        return_temp[rng.random(n) < nan_fraction] = np.nan
+    return supply, return_temp
+
+
+def assert_matches_legacy(supply, return_temp, **kwargs):
+    heating, heating_group = detect_heating(supply, return_temp, **kwargs)
+    expected_heating, expected_group = legacy_detect_heating(supply, return_temp, **kwargs)
+    assert list(heating) == expected_heating
+    assert heating_group.tolist() == expected_group
+    assert heating.dtype == object and heating_group.dtype == np.int64
+
+
+def test_random_series_match_legacy_loop():
+    """Randomized series produce identical Heating/Heating_Group arrays"""
+    rng = np.random.default_rng(20250414)
+    for _ in range(300):
+        supply, return_temp = random_series(rng, int(rng.integers(2, 800)))
+        assert_matches_legacy(supply, return_temp)
+    print("✅ Random series tests passed")
+
+
+def test_nan_readings_match_legacy_loop():
+    """NaN temperatures never trigger or release, same as the loop"""
+    rng = np.random.default_rng(7)
+    for _ in range(100):
+        supply, return_temp = random_series(rng, int(rng.integers(2, 400)), nan_fraction=0.05)
+        assert_matches_legacy(supply, return_temp)
+    print("✅ NaN reading tests passed")
+
+
+def test_custom_thresholds_match_legacy_loop():
+    """Non-default on/off deltas follow the same state machine"""
+    rng = np.random.default_rng(42)
+    for on_delta, off_delta in [(0.2, -0.2), (3, -1), (8, -5), (-0.1, 0.1)]:
+        for _ in range(50):
+            supply, return_temp = random_series(rng, int(rng.integers(2, 300)))
+            assert_matches_legacy(supply, return_temp, on_delta=on_delta, off_delta=off_delta)
+    print("✅ Custom threshold tests passed")
+
+
+def test_edge_cases():
+    """Empty, single-row and never-released inputs"""
+    assert_matches_legacy(np.array([]), np.array([]))
+    assert_matches_legacy(np.array([30.0]), np.array([10.0]))
+    # Heating that is still on at the end of the series
+    assert_matches_legacy(np.array([20.0, 26.0, 27.0, 28.0]), np.array([15.0, 15.0, 15.0, 15.0]))
+    # Exactly on the thresholds: +5 does not trigger, -2.7 releases
+    assert_matches_legacy(np.array([20.0, 25.0, 31.0, 28.3, 28.0]), np.array([15.0] * 5))
+    print("✅ Edge case tests passed")
+
+
+if __name__ == "__main__":
+    test_random_series_match_legacy_loop()
+    test_nan_readings_match_legacy_loop()
+    test_custom_thresholds_match_legacy_loop()
+    test_edge_cases()
@@ -14,7 +14,7 @@ import os
 # Add src directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from hcd import hex_upper
+from hcd import hex_upper, hex_upper_series
 
 
 def test_hex_upper_no_prefix():
@@ -76,6 +76,23 @@ def test_hex_upper_real_world_serials():
     print("✅ Real world serial tests passed")
 
 
+def test_hex_upper_series_matches_scalar():
+    """Vectorized normalization gives hex_upper() of every element"""
+    import pandas as pd
+
+    serials = ["a34f", "0Xa34f", "0xa34f", "  0xa34f  ", "  a34f  ", "B0A732E4DA4A", "0x", "0", "",
+               "   ", None, float("nan"), 42]
+    result = hex_upper_series(serials)
+    assert len(result) == len(serials)
+    for serial, normalized in zip(serials, result):
+        expected = hex_upper(serial)
+        assert normalized == expected or (expected != expected and normalized != normalized), serial
+
+    series = pd.Series(["b0a732e61eba", "0XB0A732E61EBA"], index=[10, 20])
+    assert hex_upper_series(series).to_dict() == {10: "B0A732E61EBA", 20: "0xB0A732E61EBA"}
+    print("✅ Vectorized tests passed")
+
+
 def run_all_tests():
     """Run all test functions"""
     print("\n" + "="*60)
@@ -87,6 +104,7 @@ def run_all_tests():
         test_hex_upper_with_prefix()
         test_hex_upper_edge_cases()
         test_hex_upper_real_world_serials()
+        test_hex_upper_series_matches_scalar()
 
         print("\n" + "="*60)
         print("✅ ALL TESTS PASSED")
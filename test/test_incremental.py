@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Unit tests for incremental (--state-dir) processing in hcd.py
+
+Uploading an export in overlapping pieces must produce the same summary
+hours as processing the whole export at once, including heating cycles and
+hours that span two uploads.
+"""
+
+import json
+import sys
+import os
+import warnings
+from datetime import datetime, timedelta
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from hcd import build_arg_parser, device_state_path, process_batch, process_file, run
+
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
+
+SERIAL = "0xABCDEF012345"
+
+
+def export_rows(rng, minutes):
+    """Minute rows with heating bursts and the odd gap"""
+    rows = []
+    start = datetime(2025, 1, 1, 0, 0)
+    supply = 20.0
+    for minute in range(minutes):
+        supply = max(10.0, min(45.0, supply + rng.choice([0.0, 6.5, -3.0], p=[0.9, 0.05, 0.05])
+                               + rng.normal(0, 0.4)))
+        if rng.random() < 0.02:
+            continue
+        timestamp = start + timedelta(minutes=minute)
+        state = "Enable" if (minute // 180) % 2 == 0 else "Disable"
+        rows.append([timestamp.strftime("%Y-%m-%d %H:%M:%S"), round(supply, 1), 18.0, "H", "ON", state, "Test Run"])
+    return rows
+
+
+def write_export(path, rows):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Device:", "Synthetic RTU"])
+    ws.append([f"DevID: {SERIAL}"])
+    ws.append([])
+    ws.append(["Date", "Supply Temp/C", "Return Temp/C", "Mode", "Request", "State", " "])
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+    return path
+
+
+def summary_sheet(path):
+    return pd.read_excel(path) if os.path.exists(path) else pd.DataFrame()
+
+
+def test_overlapping_uploads_match_full_reprocess(tmp_path):
+    """Hours from incremental uploads equal the full export's hours"""
+    rows = export_rows(np.random.default_rng(11), 2400)
+    state_dir = str(tmp_path / "state")
+
+    full = write_export(str(tmp_path / "full.xlsx"), rows)
+    process_file(full, str(tmp_path / "full_out.xlsx"), outputs="summary", chunk_rows=500)
+    expected = summary_sheet(str(tmp_path / "full_out.xlsx"))
+
+    pieces = [rows[:700], rows[600:1500], rows[1400:]]
+    summaries = []
+    for index, piece in enumerate(pieces):
+        upload = write_export(str(tmp_path / f"upload{index}.xlsx"), piece)
+        out = str(tmp_path / f"upload{index}_out.xlsx")
+        _, _, _, _, stats = process_file(upload, out, outputs="summary", state_dir=state_dir, chunk_rows=250)
+        assert stats['state_path'] == device_state_path(state_dir, SERIAL)
+        summaries.append(summary_sheet(out))
+    incremental = pd.concat([summary for summary in summaries if not summary.empty], ignore_index=True)
+
+    # Hours still open after the last upload (the current hour and any hour
+    # touching a heating group that has not ended) are deferred to the next one
+    with open(device_state_path(state_dir, SERIAL)) as f:
+        state = json.load(f)
+    assert state["last_date"] == rows[-1][0].replace(" ", "T")
+    pending = pd.Timestamp(state["hours"][0][0]) if state["hours"] else pd.Timestamp.max
+    expected = expected[expected["Date/Time On"] < pending].reset_index(drop=True)
+
+    assert len(expected) > 10
+    pd.testing.assert_frame_equal(incremental, expected)
+    print("✅ Incremental equivalence tests passed")
+
+
+def test_reupload_and_dry_run_do_not_advance_state(tmp_path):
+    """Re-uploads add nothing; dry runs leave the committed state untouched"""
+    rows = export_rows(np.random.default_rng(5), 600)
+    state_dir = str(tmp_path / "state")
+    upload = write_export(str(tmp_path / "upload.xlsx"), rows)
+
+    process_file(upload, str(tmp_path / "dry.xlsx"), outputs="none", state_dir=state_dir,
+                 insert_db=True, dry_run=True)
+    assert not os.path.exists(device_state_path(state_dir, SERIAL))
+
+    first = process_file(upload, str(tmp_path / "first.xlsx"), outputs="none", state_dir=state_dir)
+    second = process_file(upload, str(tmp_path / "second.xlsx"), outputs="none", state_dir=state_dir)
+    assert first[4]['test_run_rows'] > 0
+    assert second[0] == 0
+    assert second[4]['test_run_rows'] == 0
+    assert second[4]['status'] == 'no_new_data'
+    print("✅ Incremental state tests passed")
+
+
+def test_same_device_uploads_with_workers(tmp_path):
+    """A device's uploads carry state in order even when the batch asks for workers"""
+    rows = export_rows(np.random.default_rng(7), 1200)
+    uploads = [write_export(str(tmp_path / f"upload{index}.xlsx"), piece)
+               for index, piece in enumerate([rows[:700], rows[600:]])]
+
+    serial_dir = str(tmp_path / "serial")
+    expected = [process_file(upload, str(tmp_path / f"serial{index}.xlsx"), outputs="summary",
+                             state_dir=serial_dir)
+                for index, upload in enumerate(uploads)]
+
+    state_dir = str(tmp_path / "state")
+    jobs = [(upload, str(tmp_path / f"parallel{index}.xlsx")) for index, upload in enumerate(uploads)]
+    results = process_batch(jobs, workers=2, outputs="summary", state_dir=state_dir)
+    assert [result[:4] for result in results] == [result[:4] for result in expected]
+    assert all(result[0] > 0 for result in results)
+    for index in range(len(uploads)):
+        pd.testing.assert_frame_equal(summary_sheet(str(tmp_path / f"parallel{index}.xlsx")),
+                                      summary_sheet(str(tmp_path / f"serial{index}.xlsx")))
+    with open(device_state_path(state_dir, SERIAL)) as f, open(device_state_path(serial_dir, SERIAL)) as g:
+        assert json.load(f) == json.load(g)
+
+    args = build_arg_parser().parse_args(["--state-dir", state_dir, "--workers", "2"])
+    with pytest.raises(ValueError, match="--workers 1"):
+        run(args, base_dir=str(tmp_path))
+    print("✅ Incremental worker tests passed")
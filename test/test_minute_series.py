@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the Parquet minute series in hcd.py
+
+The summary rebuilt from the Parquet file must equal the pinned
+"Heat Cleaned Data" rows of the sample workbooks, both from the stored
+Heating column and when detection is rerun with the default thresholds.
+"""
+
+import glob
+import sys
+import os
+import warnings
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from hcd import load_minute_series, process_file, summary_from_parquet
+
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
+
+TEST_DIR = os.path.dirname(__file__)
+SAMPLE_FILES = sorted(glob.glob(os.path.join(TEST_DIR, '*.xlsx')))
+
+
+def test_summary_from_parquet_matches_pinned_output(tmp_path):
+    """Parquet round trip reproduces the summary without touching Excel"""
+    for filepath in SAMPLE_FILES:
+        stem = os.path.splitext(os.path.basename(filepath))[0]
+        expected_csv = open(os.path.join(TEST_DIR, "expected", f"{stem}_heat_cleaned.csv")).read()
+
+        savepath = str(tmp_path / f"{stem}_heat min per hour.xlsx")
+        _, _, _, _, stats = process_file(filepath, savepath, outputs="none", write_parquet=True)
+        parquet_path = str(tmp_path / f"{stem}_minutes.parquet")
+        assert stats['parquet_path'] == parquet_path
+
+        minutes = load_minute_series(parquet_path)
+        assert str(minutes["State"].dtype) == "category"
+        assert minutes["Heating"].dtype == bool
+        assert len(minutes) == stats['test_run_rows']
+
+        assert summary_from_parquet(parquet_path).to_csv(index=False) == expected_csv
+        assert summary_from_parquet(parquet_path, redetect=True).to_csv(index=False) == expected_csv
+    print("✅ Parquet summary tests passed")
+
+
+def test_redetect_with_new_thresholds(tmp_path):
+    """Stricter validation can only remove summary hours"""
+    filepath = SAMPLE_FILES[0]
+    savepath = str(tmp_path / "sample_heat min per hour.xlsx")
+    process_file(filepath, savepath, outputs="none", write_parquet=True)
+    parquet_path = str(tmp_path / "sample_minutes.parquet")
+
+    default = summary_from_parquet(parquet_path, redetect=True)
+    strict = summary_from_parquet(parquet_path, redetect=True, min_diff=12, min_fraction=0.9)
+    assert len(strict) <= len(default)
+    assert set(strict["Date/Time On"]) <= set(default["Date/Time On"])
+    print("✅ Threshold re-analysis tests passed")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Unit tests for multi-device workbooks in hcd.py
+
+A workbook holding several device exports, one per sheet, must give each
+device the same summary as uploading its export on its own, and write all of
+them to the database in one transaction.
+"""
+
+import glob
+import shutil
+import sys
+import os
+import warnings
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import openpyxl
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+import hcd
+from hcd import build_arg_parser, device_sheet_names, process_batch, run
+
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
+
+TEST_DIR = os.path.dirname(__file__)
+SAMPLE_FILES = sorted(glob.glob(os.path.join(TEST_DIR, '*.xlsx')))
+SHEET_NAMES = ["RTU D2", "RTU P1"]
+
+
+def write_multi_device_workbook(path):
+    """Both sample exports as sheets of one workbook, plus a sheet without a device"""
+    wb = Workbook(write_only=True)
+    for sheet_name, filepath in zip(SHEET_NAMES, SAMPLE_FILES):
+        ws = wb.create_sheet(sheet_name)
+        source = load_workbook(filepath, read_only=True, data_only=True)
+        source.worksheets[0].reset_dimensions()  # the exports' dimension tags are unreliable
+        for row in source.worksheets[0].iter_rows(values_only=True):
+            ws.append(row)
+        source.close()
+    wb.create_sheet("Notes").append(["Exported by the field tech"])
+    wb.save(path)
+
+
+def summary_sheet(path):
+    return pd.read_excel(path, sheet_name="Heat Cleaned Data")
+
+
+def test_device_sheet_names(tmp_path, monkeypatch):
+    """Only sheets with a DevID cell count as devices; single-sheet exports are not opened"""
+    path = tmp_path / "fleet.xlsx"
+    write_multi_device_workbook(path)
+    assert device_sheet_names(path) == SHEET_NAMES
+
+    def opened(*args, **kwargs):
+        raise AssertionError("single-sheet workbook opened to find its device sheets")
+    monkeypatch.setattr(openpyxl, "load_workbook", opened)
+    assert device_sheet_names(SAMPLE_FILES[0]) == ["Sheet1"]
+    print("✅ Device sheet tests passed")
+
+
+def test_multi_device_upload_matches_single_files(tmp_path, monkeypatch):
+    """Every sheet is summarized like its own upload; the DB write is one transaction"""
+    write_multi_device_workbook(tmp_path / "fleet.xlsx")
+    singles = tmp_path / "singles"
+    singles.mkdir()
+    for filepath in SAMPLE_FILES:
+        shutil.copy(filepath, singles)
+
+    transactions = []
+    insert_summaries_to_db = hcd.insert_summaries_to_db
+
+    def record_transaction(summaries, **kwargs):
+        transactions.append(len(summaries))
+        return insert_summaries_to_db(summaries, **kwargs)
+    monkeypatch.setattr(hcd, "insert_summaries_to_db", record_transaction)
+
+    options = ["--outputs", "summary", "--insert-db", "--dry-run"]
+    result = run(build_arg_parser().parse_args(["--input-file", "fleet.xlsx"] + options), base_dir=str(tmp_path))
+    assert transactions == [2]
+
+    expected = run(build_arg_parser().parse_args(options), base_dir=str(singles))
+    assert result["summary-rows"] == expected["summary-rows"] > 0
+    assert result["heating-device-readings"] == expected["heating-device-readings"]
+    assert result["heating-serial-devices"] == expected["heating-serial-devices"]
+    assert [device["sheet-name"] for device in result["devices"]] == SHEET_NAMES
+    for device, single in zip(result["devices"], expected["devices"]):
+        assert single["sheet-name"] is None
+        for key in ("device-name", "device-serial", "status", "summary-rows"):
+            assert device[key] == single[key]
+
+    output_folder = os.path.join(tmp_path, hcd.target_folder)
+    for sheet_name, filepath in zip(SHEET_NAMES, SAMPLE_FILES):
+        name = os.path.splitext(os.path.basename(filepath))[0]
+        pd.testing.assert_frame_equal(
+            summary_sheet(os.path.join(output_folder, f"fleet_heat min per hour - {sheet_name}.xlsx")),
+            summary_sheet(os.path.join(singles, hcd.target_folder, f"{name}_heat min per hour.xlsx"))
+        )
+    print("✅ Multi-device upload tests passed")
+
+
+def test_parallel_sheets_match_serial(tmp_path):
+    """Sheets spread over worker processes give the serial results in sheet order"""
+    path = str(tmp_path / "fleet.xlsx")
+    write_multi_device_workbook(path)
+    jobs = [(path, str(tmp_path / "fleet_heat min per hour.xlsx"))]
+
+    serial = process_batch(jobs, workers=1, insert_db=True, dry_run=True, outputs="none")
+    parallel = process_batch(jobs, workers=2, insert_db=True, dry_run=True, outputs="none")
+    assert [stats['sheet_name'] for *_, stats in parallel] == SHEET_NAMES
+    assert [result[:4] for result in parallel] == [result[:4] for result in serial]
+    assert all(stats['stage_seconds']['db_insert'] >= 0 for *_, stats in parallel)
+    print("✅ Parallel sheet tests passed")
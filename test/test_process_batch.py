@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Unit tests for process_batch() in hcd.py
+
+Parallel batch mode must merge results in job order and keep going when a
+file fails to process.
+"""
+
+import glob
+import shutil
+import sys
+import os
+import warnings
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from hcd import process_batch
+
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
+
+TEST_DIR = os.path.dirname(__file__)
+SAMPLE_FILES = sorted(glob.glob(os.path.join(TEST_DIR, '*.xlsx')))
+
+# Timings describe the run, not the data
+RUN_FIELDS = {'total_seconds', 'peak_rss_mb', 'stage_seconds', 'stage_peak_mb'}
+
+
+def make_jobs(tmp_path, count):
+    jobs = []
+    for i in range(count):
+        bad_file = tmp_path / f"bad-{i}.xlsx"
+        bad_file.write_text("not a workbook")
+        jobs.append((str(bad_file), str(tmp_path / f"bad-{i}_heat min per hour.xlsx")))
+    return jobs
+
+
+def test_failures_do_not_abort_batch(tmp_path):
+    """Every failing file yields an error_processing result"""
+    jobs = make_jobs(tmp_path, 3)
+    results = process_batch(jobs, workers=1, dry_run=True)
+    assert [stats['status'] for *_, stats in results] == ['error_processing'] * 3
+    assert all(stats['error'] for *_, stats in results)
+    print("✅ Failure isolation tests passed")
+
+
+def test_parallel_results_keep_job_order(tmp_path):
+    """Worker results come back in submission order and match serial mode"""
+    jobs = make_jobs(tmp_path, 5)
+    serial = process_batch(jobs, workers=1, dry_run=True)
+    parallel = process_batch(jobs, workers=3, dry_run=True)
+    assert [stats['filepath'] for *_, stats in parallel] == [filepath for filepath, _ in jobs]
+    assert parallel == serial
+    print("✅ Result ordering tests passed")
+
+
+def test_parallel_samples_match_serial(tmp_path):
+    """Real exports give the serial counts, device statistics and order with workers"""
+    jobs = []
+    for i, filepath in enumerate(SAMPLE_FILES + SAMPLE_FILES[:1]):
+        upload = str(tmp_path / f"upload-{i}.xlsx")
+        shutil.copy(filepath, upload)
+        jobs.append((upload, str(tmp_path / f"upload-{i}_heat min per hour.xlsx")))
+
+    serial = process_batch(jobs, workers=1, insert_db=True, dry_run=True, outputs="summary")
+    parallel = process_batch(jobs, workers=2, insert_db=True, dry_run=True, outputs="summary")
+    assert [stats['filepath'] for *_, stats in parallel] == [filepath for filepath, _ in jobs]
+    assert [result[:4] for result in parallel] == [result[:4] for result in serial]
+    assert all(result[0] > 0 for result in parallel)
+    for (*_, expected), (*_, stats) in zip(serial, parallel):
+        assert {k: v for k, v in stats.items() if k not in RUN_FIELDS} == \
+            {k: v for k, v in expected.items() if k not in RUN_FIELDS}
+    print("✅ Parallel sample tests passed")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Unit tests for read_device_workbook() in hcd.py
+
+The single-pass loader must produce exactly the frames the previous
+three-read pd.read_excel path produced on the sample workbooks.
+"""
+
+import glob
+import sys
+import os
+import warnings
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pandas as pd
+
+from hcd import read_device_workbook
+
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
+
+SAMPLE_FILES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '*.xlsx')))
+
+
+def test_matches_read_excel():
+    """Raw and headed frames match pd.read_excel on every sample workbook"""
+    assert SAMPLE_FILES
+    for filepath in SAMPLE_FILES:
+        raw_df, df, header_row_idx, _, _ = read_device_workbook(filepath)
+
+        expected_raw = pd.read_excel(filepath, sheet_name=0, header=None)
+        expected_idx = expected_raw[expected_raw.apply(
+            lambda row: row.astype(str).str.contains("State").any(), axis=1)].index[0]
+        expected_df = pd.read_excel(filepath, sheet_name=0, header=expected_idx).dropna(axis=1, how='all')
+
+        assert header_row_idx == expected_idx
+        assert raw_df.equals(expected_raw)
+        assert df.equals(expected_df)
+    print("✅ read_excel parity tests passed")
+
+
+def test_device_metadata():
+    """Device name and DevID are captured while streaming"""
+    for filepath in SAMPLE_FILES:
+        raw_df, _, _, device_name, mac_serial = read_device_workbook(filepath)
+        assert device_name == raw_df.iloc[0, 1]
+        assert mac_serial == str(raw_df.iloc[1, 0]).replace("DevID: ", "")
+    print("✅ Device metadata tests passed")
+
+
+if __name__ == "__main__":
+    test_matches_read_excel()
+    test_device_metadata()
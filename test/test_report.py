@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the `hcd.py report` fleet aggregates in hcd.py
+
+The queries are checked for their filters and parameters without a
+database. Set HCD_TEST_PG=1 (with the usual PGHOST_2 / PGDATABASE_2 /
+PGUSER_2 / PGPORT_2 variables) to also run the reports against a real
+PostgreSQL server; that test only touches TEMP tables.
+"""
+
+import sys
+import os
+import io
+import csv
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pandas as pd
+import pytest
+
+import hcd
+from hcd import build_report_query, parse_report_time, report
+
+
+def test_report_query_filters():
+    """Range, normalized serials and source table end up in the query"""
+    start, end = parse_report_time("2025-01-01"), parse_report_time("2025-02-01T00:00")
+    assert (start, end) == (1735689600, 1738368000)
+
+    query, params = build_report_query("savings", start, end, serials=["80646f049736", "0XAB", "80646F049736"])
+    assert params == {"start": start, "end": end, "serials": ["0xAB", "80646F049736"]}
+    assert "FROM heating_device_data" in query and "device_serial = ANY(%(serials)s)" in query
+
+    query, params = build_report_query("devices", start, end, rollup=True)
+    assert "FROM heating_device_daily" in query and "serials" not in params
+
+    with pytest.raises(ValueError):
+        build_report_query("hourly", start, end, rollup=True)
+    with pytest.raises(ValueError):
+        build_report_query("devices", start, parse_report_time("2025-01-01T12:00"), rollup=True)
+    print("✅ Report query tests passed")
+
+
+def test_report_dry_run_and_argument_errors(capsys):
+    """--dry-run prints the SQL without connecting; bad ranges are rejected"""
+    assert report(["--kind", "hourly", "--from", "2025-01-01", "--to", "2025-01-02", "--dry-run"]) == 0
+    assert "GROUP BY first_hour" in capsys.readouterr().out
+
+    for argv in (["--from", "2025-01-02", "--to", "2025-01-01"],
+                 ["--from", "2025-01-01"],
+                 ["--from", "2025-01-01", "--to", "2025-01-02", "--format", "parquet"]):
+        with pytest.raises(SystemExit):
+            report(argv + ["--dry-run"])
+    print("✅ Report argument tests passed")
+
+
+@pytest.mark.skipif(not os.getenv("HCD_TEST_PG"), reason="set HCD_TEST_PG=1 to run against PostgreSQL")
+def test_reports_against_postgres():
+    """Savings and per-hour aggregates computed by the server, streamed as CSV"""
+    summary_df = pd.DataFrame({
+        "Device Name": ["RTU 9"] * 3 + ["RTU 10"],
+        "MAC Serial #": ["80646f049736"] * 3 + ["80646f049737"],
+        "Date/Time On": pd.to_datetime(["2025-01-15 08:00", "2025-01-15 09:00", "2025-01-15 10:00",
+                                        "2025-01-15 08:00"]),
+        "Date/Time Off": pd.to_datetime(["2025-01-15 08:59", "2025-01-15 09:59", "2025-01-15 10:59",
+                                         "2025-01-15 08:59"]),
+        "Enable": [1, 1, "", ""],
+        "Disable": ["", "", 1, 1],
+        "Heating On": [10, 20, 45, 30],
+    })
+    conn = hcd.connect_to_postgres()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TEMP TABLE heating_device_data (
+                    device_serial VARCHAR(20) NOT NULL,
+                    epoch_date_stamp BIGINT NOT NULL,
+                    date_stamp TIMESTAMP NOT NULL,
+                    energy_saver_on BOOLEAN NOT NULL,
+                    heating_on_minutes INTEGER NOT NULL,
+                    device_name VARCHAR(100),
+                    date_time_on TIMESTAMP,
+                    date_time_off TIMESTAMP,
+                    PRIMARY KEY (device_serial, epoch_date_stamp)
+                )
+            """)
+            hcd.write_reading_rows(cur, hcd.build_reading_rows(summary_df))
+            start, end = parse_report_time("2025-01-15"), parse_report_time("2025-01-16")
+
+            def run_report(kind, serials=None):
+                out = io.StringIO()
+                hcd.write_report_csv(cur, *build_report_query(kind, start, end, serials=serials), out)
+                return list(csv.DictReader(io.StringIO(out.getvalue())))
+
+            savings = run_report("savings", serials=["80646f049736"])
+            assert len(savings) == 1
+            assert savings[0]["avg_minutes_enable"] == "15"
+            assert savings[0]["avg_minutes_disable"] == "45"
+            assert savings[0]["savings_minutes_per_hour"] == "30"
+            assert savings[0]["savings_pct"] == "66.7"
+
+            hourly = run_report("hourly")
+            assert [row["hour_utc"] for row in hourly] == ["2025-01-15 13:00:00", "2025-01-15 14:00:00",
+                                                           "2025-01-15 15:00:00"]
+            assert hourly[0]["devices"] == "2" and hourly[0]["heating_minutes"] == "40"
+
+            devices = run_report("devices")
+            assert [(row["device_serial"], row["hours"]) for row in devices] == \
+                [("80646F049736", "3"), ("80646F049737", "1")]
+    finally:
+        conn.rollback()
+        conn.close()
+    print("✅ PostgreSQL report tests passed")
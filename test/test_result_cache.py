@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the content-hash result cache in hcd.py
+
+A second run over identical content must return the first run's result
+without reprocessing, and the cache directory must stay within its limit.
+"""
+
+import glob
+import sys
+import os
+import warnings
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import hcd
+from hcd import process_file, store_cached_result
+
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
+
+TEST_DIR = os.path.dirname(__file__)
+SAMPLE_FILES = sorted(glob.glob(os.path.join(TEST_DIR, '*.xlsx')))
+
+
+def test_cache_hit_returns_previous_result(tmp_path, monkeypatch):
+    """Identical content is served from the cache without reading the workbook"""
+    cache_dir = str(tmp_path / "cache")
+    filepath = SAMPLE_FILES[0]
+    savepath = str(tmp_path / "sample_heat min per hour.xlsx")
+
+    first = process_file(filepath, savepath, outputs="summary", cache_dir=cache_dir)
+    assert first[4]['cache_hit'] is False
+
+    def fail(*args, **kwargs):
+        raise AssertionError("workbook was reprocessed")
+    monkeypatch.setattr(hcd, "read_device_workbook", fail)
+
+    second = process_file(filepath, savepath, outputs="summary", cache_dir=cache_dir)
+    assert second[4]['cache_hit'] is True
+    assert second[0] == first[0]
+    run_fields = {'cache_hit', 'total_seconds', 'peak_rss_mb', 'stage_seconds', 'stage_peak_mb'}
+    assert {k: v for k, v in second[4].items() if k not in run_fields} == \
+        {k: v for k, v in first[4].items() if k not in run_fields}
+    assert 'load' not in second[4]['stage_seconds']
+
+    # Deleted outputs invalidate the entry
+    os.remove(savepath)
+    monkeypatch.undo()
+    third = process_file(filepath, savepath, outputs="summary", cache_dir=cache_dir)
+    assert third[4]['cache_hit'] is False
+    assert os.path.exists(savepath)
+    print("✅ Cache hit tests passed")
+
+
+def test_cache_eviction_bounds_size(tmp_path):
+    """Least recently used entries are evicted above the size limit"""
+    cache_dir = str(tmp_path / "cache")
+    entry = {'device_stats': {}, 'payload': b"x" * 4096}
+    for i in range(10):
+        store_cached_result(cache_dir, f"key{i}", entry, max_bytes=20000)
+        os.utime(os.path.join(cache_dir, f"key{i}.pkl"), (i, i))
+
+    names = sorted(os.listdir(cache_dir))
+    total = sum(os.path.getsize(os.path.join(cache_dir, name)) for name in names)
+    assert total <= 20000
+    assert "key9.pkl" in names
+    assert "key0.pkl" not in names
+    print("✅ Cache eviction tests passed")
+
+
+def record_db_writes(monkeypatch):
+    """Stand in for live insert_summary_to_db() calls; return the keyword arguments of each"""
+    writes = []
+
+    def insert(summary_df, device_stats, **kwargs):
+        writes.append(kwargs)
+        return 1, len(summary_df), [{"device_id": 1, "device_serial": device_stats['device_serial']}]
+    monkeypatch.setattr(hcd, "insert_summary_to_db", insert)
+    return writes
+
+
+def test_changed_write_settings_write_again(tmp_path, monkeypatch):
+    """Content written by a live run is written again when --upserts is added"""
+    cache_dir = str(tmp_path / "cache")
+    savepath = str(tmp_path / "sample_heat min per hour.xlsx")
+    writes = record_db_writes(monkeypatch)
+
+    process_file(SAMPLE_FILES[0], savepath, outputs="summary", cache_dir=cache_dir, insert_db=True)
+    again = process_file(SAMPLE_FILES[0], savepath, outputs="summary", cache_dir=cache_dir, insert_db=True)
+    assert again[4]['cache_hit'] is True and len(writes) == 1
+
+    upserted = process_file(SAMPLE_FILES[0], savepath, outputs="summary", cache_dir=cache_dir, insert_db=True,
+                            do_upserts=True)
+    assert len(writes) == 2 and writes[1]['do_upserts'] is True
+    assert upserted[2] == upserted[0] > 0
+    print("✅ Cache write settings tests passed")
+
+
+def test_changed_local_time_writes_again(tmp_path, monkeypatch):
+    """Another time zone or DST policy gives other DB keys, so the rows are written again"""
+    cache_dir = str(tmp_path / "cache")
+    savepath = str(tmp_path / "sample_heat min per hour.xlsx")
+    writes = record_db_writes(monkeypatch)
+    options = dict(outputs="summary", cache_dir=cache_dir, insert_db=True)
+
+    process_file(SAMPLE_FILES[0], savepath, local_time=dict(hcd.LOCAL_TIME), **options)
+    process_file(SAMPLE_FILES[0], savepath, **options)
+    assert len(writes) == 1  # the defaults, given or not, share the entry
+
+    for local_time in (dict(hcd.LOCAL_TIME, timezone="America/Chicago"),
+                       dict(hcd.LOCAL_TIME, ambiguous="second"),
+                       dict(hcd.LOCAL_TIME, device_timezones={"80646FFFB17E": "America/Denver"})):
+        process_file(SAMPLE_FILES[0], savepath, local_time=local_time, **options)
+        assert writes[-1]['local_time'] == local_time
+        again = process_file(SAMPLE_FILES[0], savepath, local_time=local_time, **options)
+        assert again[4]['cache_hit'] is True
+    assert len(writes) == 4
+    print("✅ Cache local time tests passed")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the run journal and --resume of directory batches in hcd.py
+
+A batch killed halfway must pick up where it stopped: files already done are
+neither processed nor written to the database again, and the JSON summary
+and status report cover the whole batch.
+"""
+
+import glob
+import shutil
+import sys
+import os
+import threading
+import warnings
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+
+import hcd
+from hcd import BATCH_JOURNAL_NAME, build_arg_parser, locked_batch_journal, read_batch_journal, run
+
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
+
+TEST_DIR = os.path.dirname(__file__)
+SAMPLE_FILES = sorted(glob.glob(os.path.join(TEST_DIR, '*.xlsx')))
+OPTIONS = ["--outputs", "summary", "--insert-db", "--dry-run"]
+
+
+def make_batch(directory):
+    """Three uploads: both samples and a second copy of the first"""
+    directory.mkdir()
+    for filepath in SAMPLE_FILES:
+        shutil.copy(filepath, directory)
+    shutil.copy(SAMPLE_FILES[0], directory / "z-copy.xlsx")
+    return sorted(os.listdir(directory))
+
+
+def count_calls(monkeypatch, name, stop_after=None):
+    """Record the calls of an hcd function; raise KeyboardInterrupt (a kill) after stop_after calls"""
+    calls = []
+    original = getattr(hcd, name)
+
+    def wrapper(*args, **kwargs):
+        if stop_after is not None and len(calls) == stop_after:
+            raise KeyboardInterrupt
+        calls.append(args)
+        return original(*args, **kwargs)
+    monkeypatch.setattr(hcd, name, wrapper)
+    return calls
+
+
+def test_resume_skips_finished_files(tmp_path, monkeypatch):
+    """A killed batch resumes at the first unfinished file and reports the whole batch"""
+    names = make_batch(tmp_path / "batch")
+    expected = run(build_arg_parser().parse_args(OPTIONS), base_dir=str(tmp_path / "batch"))
+    shutil.rmtree(tmp_path / "batch" / "upload-results")
+
+    with monkeypatch.context() as m:
+        count_calls(m, "process_sheet", stop_after=2)
+        with pytest.raises(KeyboardInterrupt):
+            run(build_arg_parser().parse_args(OPTIONS), base_dir=str(tmp_path / "batch"))
+    journal_path = tmp_path / "batch" / "upload-results" / BATCH_JOURNAL_NAME
+    header, files = read_batch_journal(journal_path)
+    assert sorted(key[0] for key in files) == names[:2]
+
+    processed = count_calls(monkeypatch, "process_sheet")
+    writes = count_calls(monkeypatch, "insert_summaries_to_db")
+    resumed = run(build_arg_parser().parse_args(OPTIONS + ["--resume"]), base_dir=str(tmp_path / "batch"))
+    assert [os.path.basename(args[0]) for args in processed] == names[2:]
+    assert len(writes) == 1
+    assert resumed == expected
+
+    reports = glob.glob(str(tmp_path / "batch" / "upload-results" / "*.xlsx"))
+    assert [os.path.basename(path) for path in reports] == [f"batch-{header['batch']}-results.xlsx"]
+
+    # Resuming a finished batch processes nothing
+    processed.clear()
+    assert run(build_arg_parser().parse_args(OPTIONS + ["--resume"]), base_dir=str(tmp_path / "batch")) == expected
+    assert processed == []
+    print("✅ Resume tests passed")
+
+
+def test_resume_retries_failed_and_changed_files(tmp_path, monkeypatch):
+    """Failed files and files changed since they were journaled are processed again"""
+    names = make_batch(tmp_path / "batch")
+    (tmp_path / "batch" / "broken.xlsx").write_text("not a workbook")
+    first = run(build_arg_parser().parse_args(OPTIONS), base_dir=str(tmp_path / "batch"))
+    assert [d["status"] for d in first["devices"]].count("error_processing") == 1
+
+    os.utime(tmp_path / "batch" / names[1])
+    processed = count_calls(monkeypatch, "process_sheet")
+    resumed = run(build_arg_parser().parse_args(OPTIONS + ["--resume"]), base_dir=str(tmp_path / "batch"))
+    assert sorted(os.path.basename(args[0]) for args in processed) == sorted(["broken.xlsx", names[1]])
+    assert resumed == first
+    print("✅ Retry tests passed")
+
+
+def test_resume_needs_same_settings(tmp_path):
+    """A journal written under other settings cannot be resumed; a fresh run starts over"""
+    make_batch(tmp_path / "batch")
+    run(build_arg_parser().parse_args(OPTIONS), base_dir=str(tmp_path / "batch"))
+
+    with pytest.raises(ValueError, match="on_delta"):
+        run(build_arg_parser().parse_args(OPTIONS + ["--resume", "--on-delta", "6"]),
+            base_dir=str(tmp_path / "batch"))
+    with pytest.raises(ValueError, match="--input-file"):
+        run(build_arg_parser().parse_args(OPTIONS + ["--resume", "--input-file", "z-copy.xlsx"]),
+            base_dir=str(tmp_path / "batch"))
+
+    run(build_arg_parser().parse_args(OPTIONS + ["--on-delta", "6"]), base_dir=str(tmp_path / "batch"))
+    header, files = read_batch_journal(tmp_path / "batch" / "upload-results" / BATCH_JOURNAL_NAME)
+    assert header["settings"]["on_delta"] == 6 and len(files) == 3
+    print("✅ Resume settings tests passed")
+
+
+def test_concurrent_batches_keep_their_results(tmp_path, monkeypatch):
+    """Without --resume results are not read back; a second batch waits for the journal"""
+    names = make_batch(tmp_path / "batch")
+    reads = count_calls(monkeypatch, "read_batch_journal")
+    expected = run(build_arg_parser().parse_args(OPTIONS), base_dir=str(tmp_path / "batch"))
+    assert reads == []
+    assert [os.path.basename(d["filepath"]) for d in expected["devices"]] == names
+
+    journal_path = tmp_path / "batch" / "upload-results" / BATCH_JOURNAL_NAME
+    journal = journal_path.read_text()
+    outcome = []
+    with locked_batch_journal(journal_path):
+        other = threading.Thread(target=lambda: outcome.append(
+            run(build_arg_parser().parse_args(OPTIONS + ["--on-delta", "6"]), base_dir=str(tmp_path / "batch"))))
+        other.start()
+        other.join(timeout=2)
+        assert other.is_alive()
+        assert journal_path.read_text() == journal
+    other.join(timeout=60)
+    assert not other.is_alive()
+
+    header, files = read_batch_journal(journal_path)
+    assert header["settings"]["on_delta"] == 6 and len(files) == 3
+    assert [d["filepath"] for d in outcome[0]["devices"]] == [d["filepath"] for d in expected["devices"]]
+    print("✅ Concurrent batch tests passed")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Regression tests pinning process_file() output on the sample workbooks
+
+The expected "Heat Cleaned Data" rows in test/expected/ were produced by the
+per-group / per-hour loop implementation. The grouped validation and hourly
+summarization must reproduce them exactly, along with the group counts.
+The expected "Filtered Test Run" and "Discarded" sheets were written before
+the minute frames switched to bool / int32 / categorical columns.
+"""
+
+import glob
+import sys
+import os
+import warnings
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pandas as pd
+
+import hcd
+from hcd import display_frame, process_file, validate_heating_groups
+
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
+
+TEST_DIR = os.path.dirname(__file__)
+SAMPLE_FILES = sorted(glob.glob(os.path.join(TEST_DIR, '*.xlsx')))
+
+# Detected / valid heating group counts per sample workbook
+EXPECTED_GROUPS = {
+    "Butterfly MCD 8167 D2 ORS80646fffb17e_2504141146": (50, 50),
+    "Butterfly MCD 8167 P1 ORSb0a732e61eba_2504141148": (84, 84),
+}
+
+
+def test_sample_workbooks_match_pinned_output(tmp_path):
+    """Summary rows, group counts and valid group ids are unchanged"""
+    assert SAMPLE_FILES
+    for filepath in SAMPLE_FILES:
+        stem = os.path.splitext(os.path.basename(filepath))[0]
+        savepath = str(tmp_path / f"{stem}_heat min per hour.xlsx")
+        summary_rows, _, _, _, stats = process_file(filepath, savepath)
+
+        expected_csv = open(os.path.join(TEST_DIR, "expected", f"{stem}_heat_cleaned.csv")).read()
+        summary = pd.read_excel(savepath, sheet_name="Heat Cleaned Data", keep_default_na=False)
+        assert summary.to_csv(index=False) == expected_csv
+        assert summary_rows == len(summary)
+
+        detected, valid = EXPECTED_GROUPS[stem]
+        assert stats['heating_groups_detected'] == detected
+        assert stats['valid_heating_groups'] == valid
+
+        filtered = pd.read_excel(savepath, sheet_name="Filtered Test Run")
+        group_ids = [gid for gid in filtered["Heating_Group"].dropna().unique() if gid > 0]
+        assert group_ids == list(range(1, valid + 1))
+    print("✅ Sample workbook regression tests passed")
+
+
+def test_full_output_sheets_match_pinned_output(tmp_path, monkeypatch):
+    """Compact minute-frame dtypes are shown as before in every full-output sheet"""
+    frames = {}
+    write_output_workbook = hcd.write_output_workbook
+
+    def capture(savepath, outputs, summary_df, **kwargs):
+        frames.update(kwargs)
+        return write_output_workbook(savepath, outputs, summary_df, **kwargs)
+    monkeypatch.setattr(hcd, "write_output_workbook", capture)
+
+    for filepath in SAMPLE_FILES:
+        stem = os.path.splitext(os.path.basename(filepath))[0]
+        savepath = str(tmp_path / f"{stem}_heat min per hour.xlsx")
+        process_file(filepath, savepath, outputs="full")
+
+        df = frames["df"]
+        assert df["Heating_Group"].dtype == "int32"
+        for col in ("Heating", "Enable", "Disable"):
+            assert df[col].dtype == bool
+        for frame in (df, frames["heat_data_set"], frames["discarded"]):
+            assert isinstance(frame["Device Name"].dtype, pd.CategoricalDtype)
+            assert isinstance(frame["MAC Serial #"].dtype, pd.CategoricalDtype)
+
+        shown = display_frame(df)
+        assert (shown["Heating"] == df["Heating"].map({True: "On", False: "Off"})).all()
+        for col in ("Enable", "Disable"):
+            assert (shown[col] == df[col].map({True: 1, False: ""})).all()
+        assert display_frame(shown) is shown
+        assert df["Heating"].dtype == bool  # the frame itself is left as is
+
+        sheets = pd.read_excel(savepath, sheet_name=None, keep_default_na=False)
+        assert list(sheets) == ["Original Data", "Filtered Test Run", "Heating Data Set",
+                                "Heat Cleaned Data", "Discarded"]
+        for sheet in ("Filtered Test Run", "Discarded"):
+            name = sheet.lower().replace(" ", "_")
+            expected_csv = open(os.path.join(TEST_DIR, "expected", f"{stem}_{name}.csv")).read()
+            assert sheets[sheet].to_csv(index=False) == expected_csv
+
+        # Heating Data Set: the filtered rows of every hour with heating
+        filtered = sheets["Filtered Test Run"]
+        heating_hours = filtered.loc[filtered["Heating"] == "On", "Hour"]
+        expected = filtered[filtered["Hour"].isin(heating_hours)]
+        assert sheets["Heating Data Set"].to_csv(index=False) == expected.to_csv(index=False)
+    print("✅ Full output sheet tests passed")
+
+
+def test_validate_heating_groups_sixty_percent_rule():
+    """Groups keep first-appearance order; the 60% boundary is inclusive"""
+    df = pd.DataFrame({
+        "Supply Temp/C": [30, 30, 30, 20, 20, 30, 30, 20, 30, 30, 30, 20],
+        "Return Temp/C": [20] * 12,
+        "Heating_Group": [0, 3, 3, 3, 3, 2, 2, 0, 1, 1, 1, 1],
+    })
+    # Group 3: 2/4 rows >= +7 (50%), group 2: 2/2 (100%), group 1: 3/4 (75%)
+    valid_groups, total_groups = validate_heating_groups(df)
+    assert valid_groups == [2, 1]
+    assert total_groups == 3
+
+    # Exactly 60%: 3 of 5 rows
+    df = pd.DataFrame({
+        "Supply Temp/C": [27, 27, 27, 26.9, 20],
+        "Return Temp/C": [20] * 5,
+        "Heating_Group": [1] * 5,
+    })
+    assert validate_heating_groups(df) == ([1], 1)
+    print("✅ 60% rule tests passed")
+
+
+def test_output_modes(tmp_path):
+    """summary writes only Heat Cleaned Data, none writes nothing, full highlights heating rows"""
+    filepath = SAMPLE_FILES[0]
+    stem = os.path.splitext(os.path.basename(filepath))[0]
+    expected_csv = open(os.path.join(TEST_DIR, "expected", f"{stem}_heat_cleaned.csv")).read()
+
+    savepath = str(tmp_path / "summary.xlsx")
+    _, _, _, _, stats = process_file(filepath, savepath, outputs="summary")
+    sheets = pd.read_excel(savepath, sheet_name=None, keep_default_na=False)
+    assert list(sheets) == ["Heat Cleaned Data"]
+    assert sheets["Heat Cleaned Data"].to_csv(index=False) == expected_csv
+    assert stats['output_path'] == savepath
+
+    savepath = str(tmp_path / "none.xlsx")
+    summary_rows, _, _, _, stats = process_file(filepath, savepath, outputs="none")
+    assert not os.path.exists(savepath)
+    assert stats['output_path'] is None
+    assert summary_rows == len(sheets["Heat Cleaned Data"])
+
+    from openpyxl import load_workbook
+    savepath = str(tmp_path / "full.xlsx")
+    process_file(filepath, savepath, outputs="full")
+    ws = load_workbook(savepath)["Filtered Test Run"]
+    headers = {cell.value: cell.column_letter for cell in ws[1]}
+    [(sqref, rules)] = [(str(cf.sqref), cf.rules) for cf in ws.conditional_formatting]
+    assert sqref == f"{headers['Supply Temp/C']}2:{headers['Supply Temp/C']}{ws.max_row} " \
+                    f"{headers['Heating']}2:{headers['Heating']}{ws.max_row}"
+    assert rules[0].formula == [f'${headers["Heating"]}2="On"']
+    print("✅ Output mode tests passed")
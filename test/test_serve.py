@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the `hcd serve` job protocol in hcd.py
+
+Each job answered by the server must carry the same JSON summary as a
+one-shot run over the same input, and bad requests must not stop the server.
+"""
+
+import glob
+import json
+import shutil
+import sys
+import os
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from hcd import build_arg_parser, run, serve_stream
+
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
+
+TEST_DIR = os.path.dirname(__file__)
+SAMPLE_FILES = sorted(glob.glob(os.path.join(TEST_DIR, '*.xlsx')))
+
+
+def test_serve_stream_matches_one_shot_run(tmp_path):
+    """Jobs get the one-shot JSON summary; invalid lines get an error response"""
+    for filepath in SAMPLE_FILES:
+        shutil.copy(filepath, tmp_path)
+    job_args = ["--input-file", os.path.basename(SAMPLE_FILES[0]), "--outputs", "none",
+                "--insert-db", "--dry-run"]
+    expected = run(build_arg_parser().parse_args(job_args), base_dir=str(tmp_path))
+
+    lines = [
+        json.dumps({"id": 1, "cwd": str(tmp_path), "args": job_args}),
+        "not json",
+        json.dumps({"id": 2, "cwd": str(tmp_path), "args": ["--no-such-option"]}),
+        json.dumps({"id": 3, "cwd": str(tmp_path), "args": job_args}),
+        json.dumps({"command": "shutdown"}),
+        json.dumps({"id": 4, "cwd": str(tmp_path), "args": job_args}),
+    ]
+    responses = []
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        shutdown = serve_stream(iter(lines), responses.append, executor, threading.BoundedSemaphore(2))
+
+    assert shutdown is True
+    by_id = {response.get("id"): response for response in responses}
+    assert len(responses) == 4
+    assert by_id[1] == dict(expected, id=1)
+    assert by_id[3] == dict(expected, id=3)
+    assert "error" in by_id[2]
+    assert "error" in by_id[None]
+    assert expected["summary-rows"] > 0
+    print("✅ Serve protocol tests passed")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Unit tests for per-stage timing and profiling in hcd.py
+
+process_file() must record each stage's wall time, and the timings must
+reach the status report, the --timings JSON summary and --profile dumps.
+"""
+
+import glob
+import sys
+import os
+import shutil
+import pstats
+import warnings
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from hcd import build_arg_parser, process_file, run
+
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
+
+TEST_DIR = os.path.dirname(__file__)
+SAMPLE_FILES = sorted(glob.glob(os.path.join(TEST_DIR, '*.xlsx')))
+
+
+def test_stage_timings_recorded(tmp_path):
+    """Every in-memory stage is timed and memory peaks only appear when traced"""
+    savepath = str(tmp_path / "sample_heat min per hour.xlsx")
+    *_, stats = process_file(SAMPLE_FILES[0], savepath, outputs="summary", insert_db=True, dry_run=True)
+    assert list(stats['stage_seconds']) == ['load', 'clean', 'stats', 'detect', 'validate', 'summarize',
+                                            'write', 'db_insert']
+    assert all(seconds >= 0 for seconds in stats['stage_seconds'].values())
+    assert sum(stats['stage_seconds'].values()) <= stats['total_seconds'] + 0.01
+    assert stats['stage_peak_mb'] == {}
+
+    *_, traced = process_file(SAMPLE_FILES[0], savepath, outputs="none", trace_memory=True, chunk_rows=1000)
+    assert list(traced['stage_seconds']) == ['stream']
+    assert traced['stage_peak_mb']['stream'] > 0
+    print("✅ Stage timing tests passed")
+
+
+def test_timings_in_report_json_and_profile(tmp_path):
+    """--timings adds timings to the JSON summary; --profile writes a pstats file"""
+    shutil.copy(SAMPLE_FILES[0], tmp_path)
+    name = os.path.splitext(os.path.basename(SAMPLE_FILES[0]))[0]
+    profile_dir = str(tmp_path / "profiles")
+    args = build_arg_parser().parse_args(["--input-file", os.path.basename(SAMPLE_FILES[0]),
+                                          "--outputs", "none", "--timings", "--profile", profile_dir])
+    summary = run(args, base_dir=str(tmp_path))
+
+    timings = summary["timings"]
+    assert len(timings) == 1
+    assert timings[0]["stage-seconds"]["load"] > 0
+    assert "stage-peak-mb" not in timings[0]
+
+    profile_path = os.path.join(profile_dir, f"{name}.pstats")
+    assert pstats.Stats(profile_path).total_calls > 0
+
+    from openpyxl import load_workbook
+    report = load_workbook(str(tmp_path / "upload-results" / f"{name}-results.xlsx"), read_only=True)
+    fields = [row[0] for row in report.active.iter_rows(min_row=2, values_only=True)]
+    assert 'time_total_s' in fields and 'time_detect_s' in fields and 'peak_rss_mb' in fields
+
+    # Without --timings the JSON summary is unchanged
+    args = build_arg_parser().parse_args(["--input-file", os.path.basename(SAMPLE_FILES[0]), "--outputs", "none"])
+    assert "timings" not in run(args, base_dir=str(tmp_path))
+    print("✅ Timing report tests passed")
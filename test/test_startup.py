@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Start-up cost guard for hcd.py
+
+Importing the module (what `--help` and `hcd serve` start-up pay for) must
+not load the heavy libraries used by the processing stages, and must not
+touch the filesystem.
+"""
+
+import json
+import subprocess
+import sys
+import os
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), '..', 'src')
+
+HEAVY_MODULES = ("numpy", "pandas", "openpyxl", "psycopg2", "pytz", "matplotlib")
+
+# Import hcd in a fresh interpreter and list the top-level packages it loaded
+LIST_MODULES = "import hcd, json, sys; print(json.dumps(sorted({name.split('.')[0] for name in sys.modules})))"
+
+
+def loaded_modules(cwd):
+    """Top-level modules in sys.modules after `import hcd` in a new interpreter"""
+    result = subprocess.run(
+        [sys.executable, "-c", LIST_MODULES],
+        cwd=cwd, env=dict(os.environ, PYTHONPATH=os.path.abspath(SRC_DIR)),
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout)
+
+
+def test_import_is_lean(tmp_path):
+    """No heavy dependency and no output folder after `import hcd`"""
+    modules = loaded_modules(tmp_path)
+
+    assert "hcd" in modules
+    assert [name for name in modules if name in HEAVY_MODULES] == []
+    assert os.listdir(tmp_path) == []
+    print("✅ Start-up tests passed")
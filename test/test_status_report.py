@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the device status report writers in hcd.py
+
+The .xlsx report is written in one pass (bold fields, left-aligned values,
+widths from the data), and the CSV/JSONL variants carry the same fields with
+one record per file.
+"""
+
+import csv
+import glob
+import json
+import shutil
+import sys
+import os
+import warnings
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from openpyxl import load_workbook
+
+from hcd import build_arg_parser, run, status_report_rows, write_status_workbook
+
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
+
+TEST_DIR = os.path.dirname(__file__)
+SAMPLE_FILES = sorted(glob.glob(os.path.join(TEST_DIR, '*.xlsx')))
+
+
+def test_status_workbook_formatting(tmp_path):
+    """Header, styles and column widths match the vertical report layout"""
+    stats = [{'status': 'success', 'summary_rows': 3}, {'status': 'no_heating_detected', 'summary_rows': 0}]
+    records = [{'status': s['status'], 'summary_rows': s['summary_rows'], 'supply_min': None} for s in stats]
+    rows = status_report_rows(records, stats)
+    assert rows[3] == ['', '', '']  # blank row between files
+    assert rows[4][2] == 'NO HEATING: Supply temp never exceeded return by required 7°C'
+
+    path = str(tmp_path / "report.xlsx")
+    write_status_workbook(path, rows)
+    ws = load_workbook(path).active
+    assert [cell.value for cell in ws[1]] == ['Field', 'Value', 'Comment']
+    assert all(cell.font.b for cell in ws[1])
+    assert [ws.cell(row, 1).value for row in range(2, ws.max_row + 1)] == [row[0] or None for row in rows]
+    assert ws['A2'].font.b and ws['B2'].alignment.horizontal == 'left'
+    assert not ws['C2'].font.b and ws['C2'].alignment.horizontal is None
+    assert ws.column_dimensions['A'].width == len('summary_rows') + 2
+    assert ws.column_dimensions['C'].width == max(len(row[2]) for row in rows) + 2
+    print("✅ Status workbook tests passed")
+
+
+def test_machine_readable_status_report(tmp_path):
+    """CSV and JSONL hold one record per file with the report's fields"""
+    for filepath in SAMPLE_FILES:
+        shutil.copy(filepath, tmp_path)
+    (tmp_path / "broken.xlsx").write_text("not a workbook")
+    args = build_arg_parser().parse_args(["--outputs", "none", "--timings", "--status-format", "xlsx",
+                                          "--status-format", "csv", "--status-format", "jsonl"])
+    summary = run(args, base_dir=str(tmp_path))
+
+    reports = sorted(name for name in os.listdir(tmp_path / "upload-results") if not name.startswith("."))
+    assert [os.path.splitext(name)[1] for name in reports] == [".csv", ".jsonl", ".xlsx"]
+    base = tmp_path / "upload-results" / os.path.splitext(reports[0])[0]
+    with open(f"{base}.jsonl") as f:
+        records = [json.loads(line) for line in f]
+    with open(f"{base}.csv", newline='') as f:
+        rows = list(csv.DictReader(f))
+
+    assert [r["filepath"] for r in records] == [d["filepath"] for d in summary["devices"]]
+    assert [r["status"] for r in records] == [d["status"] for d in summary["devices"]]
+    assert [r["summary_rows"] for r in records] == [d["summary-rows"] for d in summary["devices"]]
+    failed = records[[d["status"] for d in summary["devices"]].index("error_processing")]
+    assert failed["error"] and "time_total_s" not in failed
+    assert all(r["time_total_s"] > 0 for r in records if r["status"] == "success")
+    assert [row["filepath"] for row in rows] == [r["filepath"] for r in records]
+    assert [int(row["summary_rows"]) for row in rows] == [r["summary_rows"] for r in records]
+
+    report = load_workbook(f"{base}.xlsx", read_only=True).active
+    fields = {row[0] for row in report.iter_rows(min_row=2, values_only=True)} - {None}
+    assert fields == set(rows[0]) - {"error"}
+    print("✅ Machine-readable status report tests passed")
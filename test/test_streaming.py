@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Unit tests for streaming (chunked) processing in hcd.py
+
+Whatever the chunk size, the streamed summary and device statistics must
+equal the in-memory path: on the pinned sample workbooks, and on synthetic
+exports with duplicates, gaps, off-grid timestamps and heating cycles that
+cross chunk and hour boundaries.
+"""
+
+import glob
+import math
+import sys
+import os
+import warnings
+from datetime import datetime, timedelta
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from hcd import UnorderedExportError, detect_heating, new_device_stats, process_file, stream_heating_summary, \
+    summarize_workbook_stream
+
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
+
+TEST_DIR = os.path.dirname(__file__)
+SAMPLE_FILES = sorted(glob.glob(os.path.join(TEST_DIR, '*.xlsx')))
+
+
+# Timings describe the run, not the data
+RUN_FIELDS = {'total_seconds', 'peak_rss_mb', 'stage_seconds', 'stage_peak_mb'}
+
+
+def assert_same_stats(expected, actual):
+    for key, value in expected.items():
+        if key in RUN_FIELDS:
+            continue
+        if isinstance(value, float) and not math.isnan(value):
+            assert actual[key] == pytest.approx(value, rel=1e-12), key
+        else:
+            assert actual[key] == value or (value != value and actual[key] != actual[key]), key
+
+
+def write_export(path, rng, minutes=1500, ordered=True):
+    """Synthetic device export: metadata rows, header, then minute rows"""
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Device:", "Synthetic RTU"])
+    ws.append(["DevID: 0xabcdef012345"])
+    ws.append([])
+    ws.append(["Date", "Supply Temp/C", "Return Temp/C", "Mode", "Request", "State", " "])
+
+    rows = []
+    start = datetime(2025, 1, 1, 0, 0)
+    supply = 20.0
+    for minute in range(minutes):
+        # Heating bursts: large jumps up, drops back down
+        step = rng.choice([0.0, 6.5, -3.0], p=[0.9, 0.05, 0.05]) + rng.normal(0, 0.4)
+        supply = max(10.0, min(45.0, supply + step))
+        timestamp = start + timedelta(minutes=minute)
+        if rng.random() < 0.02:
+            continue                                    # gap
+        if rng.random() < 0.01:
+            timestamp += timedelta(seconds=30)          # off the minute grid
+        state = "Enable" if (minute // 240) % 2 == 0 else "Disable"
+        note = "Test Run" if rng.random() > 0.01 else ""
+        row = [timestamp.strftime("%Y-%m-%d %H:%M:%S"), round(supply, 1), 18.0, "H", "ON", state, note]
+        rows.append(row)
+        if rng.random() < 0.02:
+            rows.append(row[:1] + [round(supply - 1.5, 1)] + row[2:])   # duplicate timestamp
+    if not ordered:
+        rows[100], rows[200] = rows[200], rows[100]
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+
+
+def test_detect_heating_resumes_across_chunks():
+    """Splitting the series and carrying the open group reproduces one pass"""
+    rng = np.random.default_rng(3)
+    supply = np.cumsum(rng.choice([0.0, 6.0, -3.0], size=400, p=[0.8, 0.1, 0.1]))
+    return_temp = np.full(400, supply.min() - 1)
+    _, expected = detect_heating(supply, return_temp)
+
+    for split in (1, 57, 200, 399):
+        _, head = detect_heating(supply[:split], return_temp[:split])
+        _, tail = detect_heating(supply[split - 1:], return_temp[split - 1:], heating_at_start=head[-1] > 0)
+        offset = head.max() - 1 if head[-1] > 0 else head.max()
+        combined = np.r_[head, np.where(tail[1:] > 0, tail[1:] + offset, 0)]
+        assert (combined == expected).all()
+    print("✅ Chunked detection tests passed")
+
+
+def test_stream_matches_pinned_samples():
+    """Streamed summaries equal the pinned Heat Cleaned Data for any chunk size"""
+    for filepath in SAMPLE_FILES:
+        stem = os.path.splitext(os.path.basename(filepath))[0]
+        expected_csv = open(os.path.join(TEST_DIR, "expected", f"{stem}_heat_cleaned.csv")).read()
+        for chunk_rows in (50, 1000, 100000):
+            stats = new_device_stats(filepath)
+            summary_df = summarize_workbook_stream(filepath, stats, chunk_rows=chunk_rows)
+            assert summary_df.to_csv(index=False) == expected_csv
+    print("✅ Streaming sample tests passed")
+
+
+def test_stream_matches_in_memory(tmp_path):
+    """Synthetic exports: same summary sheet and statistics as the in-memory path"""
+    for seed in range(3):
+        filepath = str(tmp_path / f"export{seed}.xlsx")
+        write_export(filepath, np.random.default_rng(seed))
+
+        in_memory = process_file(filepath, str(tmp_path / f"mem{seed}.xlsx"), outputs="summary")
+        expected = pd.read_excel(str(tmp_path / f"mem{seed}.xlsx"))
+        assert in_memory[0] > 0
+
+        for chunk_rows in (17, 240, 5000):
+            streamed_path = str(tmp_path / f"stream{seed}_{chunk_rows}.xlsx")
+            with warnings.catch_warnings():
+                # Every chunk's dates are parsed with the same explicit format
+                warnings.filterwarnings("error", message="Could not infer format")
+                streamed = process_file(filepath, streamed_path, outputs="full", chunk_rows=chunk_rows)
+            assert streamed[0] == in_memory[0]
+            assert_same_stats({k: v for k, v in in_memory[4].items() if k != 'output_path'},
+                              {k: v for k, v in streamed[4].items() if k != 'output_path'})
+            pd.testing.assert_frame_equal(pd.read_excel(streamed_path), expected)
+    print("✅ Streaming equivalence tests passed")
+
+
+def test_unordered_export_falls_back(tmp_path):
+    """Out-of-order exports are rejected by the stream and processed in memory"""
+    filepath = str(tmp_path / "unordered.xlsx")
+    write_export(filepath, np.random.default_rng(7), minutes=400, ordered=False)
+
+    with pytest.raises(UnorderedExportError):
+        list(stream_heating_summary(filepath, new_device_stats(filepath), chunk_rows=50))
+
+    in_memory = process_file(filepath, str(tmp_path / "mem.xlsx"), outputs="none")
+    fallback = process_file(filepath, str(tmp_path / "stream.xlsx"), outputs="none", chunk_rows=50)
+    assert fallback[0] == in_memory[0]
+    assert fallback[4]['valid_heating_groups'] == in_memory[4]['valid_heating_groups']
+    print("✅ Unordered fallback tests passed")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the threshold sweep (sweep_minutes / `hcd sweep`) in hcd.py
+
+Every parameter set of a sweep must report what a full pipeline run with
+those thresholds produces.
+"""
+
+import glob
+import itertools
+import sys
+import os
+import warnings
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pandas as pd
+
+from hcd import (DETECTION_PARAMS, SWEEP_METRICS, load_minute_series, minute_series_path, process_file,
+                 summarize_minute_series, sweep, sweep_minutes)
+
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
+
+TEST_DIR = os.path.dirname(__file__)
+SAMPLE_FILES = sorted(glob.glob(os.path.join(TEST_DIR, '*.xlsx')))
+GRID = {
+    "on_delta": [3, 5],
+    "off_delta": [-2.7, -1.5],
+    "min_diff": [7, 10],
+    "min_fraction": [0.6, 0.9],
+    "min_minutes": [45, 55],
+}
+
+
+def expected_metrics(summary_df):
+    if summary_df.empty:
+        return {"summary_rows": 0, "enable_hours": 0, "disable_hours": 0, "heating_minutes": 0,
+                "enable_heating_minutes": 0, "disable_heating_minutes": 0}
+    enabled = summary_df["Enable"] == 1
+    disabled = summary_df["Disable"] == 1
+    return {
+        "summary_rows": len(summary_df),
+        "enable_hours": int(enabled.sum()),
+        "disable_hours": int(disabled.sum()),
+        "heating_minutes": int(summary_df["Heating On"].sum()),
+        "enable_heating_minutes": int(summary_df.loc[enabled, "Heating On"].sum()),
+        "disable_heating_minutes": int(summary_df.loc[disabled, "Heating On"].sum()),
+    }
+
+
+def test_sweep_matches_redetection(tmp_path):
+    """Each parameter set equals rerunning detection, validation and summarization"""
+    for filepath in SAMPLE_FILES:
+        savepath = str(tmp_path / (os.path.basename(filepath) + "_heat min per hour.xlsx"))
+        process_file(filepath, savepath, outputs="none", write_parquet=True)
+        minutes = load_minute_series(minute_series_path(savepath))
+
+        result = sweep_minutes(minutes, GRID)
+        assert len(result) == 32
+        assert list(result.columns) == list(DETECTION_PARAMS) + SWEEP_METRICS
+        changed = set()
+        for row, params in zip(result.itertuples(index=False), itertools.product(*GRID.values())):
+            params = dict(zip(DETECTION_PARAMS, params))
+            assert {key: getattr(row, key) for key in DETECTION_PARAMS} == params
+            summary_df = summarize_minute_series(minutes, redetect=True, **params)
+            assert {key: getattr(row, key) for key in expected_metrics(summary_df)} == expected_metrics(summary_df)
+            changed.add(row.summary_rows)
+        assert len(changed) > 1  # the grid actually moves the results
+    print("✅ Sweep equivalence tests passed")
+
+
+def test_sweep_matches_process_file(tmp_path):
+    """process_file() with the same thresholds gives the swept counts"""
+    params = {"on_delta": 3, "off_delta": -1.5, "min_diff": 10, "min_fraction": 0.9, "min_minutes": 45}
+    filepath = SAMPLE_FILES[1]
+    summary_rows, _, _, _, stats = process_file(filepath, str(tmp_path / "out.xlsx"), outputs="none",
+                                                detection=params)
+    result = sweep_minutes(
+        load_minute_series(process_file(filepath, str(tmp_path / "default.xlsx"), outputs="none",
+                                        write_parquet=True)[4]['parquet_path']),
+        {key: [value] for key, value in params.items()}
+    ).iloc[0]
+    assert result["summary_rows"] == summary_rows == stats['summary_rows']
+    assert result["groups_detected"] == stats['heating_groups_detected']
+    assert result["groups_valid"] == stats['valid_heating_groups']
+    print("✅ Pipeline parameter tests passed")
+
+
+def test_sweep_cli_fleet_totals(tmp_path):
+    """Fleet rows sum the per-device rows of the same parameter set"""
+    fleet_csv = tmp_path / "fleet.csv"
+    devices_csv = tmp_path / "devices.csv"
+    options = ["--on-delta", "4,5", "--min-diff", "7,9", "--workers", "2"]
+    assert sweep([TEST_DIR, "--output", str(fleet_csv)] + options) == 0
+    assert sweep(SAMPLE_FILES + ["--per-device", "--output", str(devices_csv)] + options) == 0
+
+    fleet = pd.read_csv(fleet_csv)
+    devices = pd.read_csv(devices_csv)
+    assert len(fleet) == 4 and (fleet["devices"] == 2).all()
+    assert len(devices) == 8
+    totals = devices.groupby(list(DETECTION_PARAMS), sort=False)[SWEEP_METRICS].sum().reset_index()
+    pd.testing.assert_frame_equal(fleet[list(DETECTION_PARAMS) + SWEEP_METRICS], totals)
+    default = fleet[(fleet["on_delta"] == 5) & (fleet["min_diff"] == 7)].iloc[0]
+    assert default["avg_minutes_enable"] == round(default["enable_heating_minutes"] / default["enable_hours"], 2)
+    print("✅ Sweep CLI tests passed")
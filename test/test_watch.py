@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the `--watch DIR` upload watcher in hcd.py
+
+Only completed .xlsx uploads may be taken, each exactly once across
+restarts (the ledger), and no more than the configured number at a time.
+"""
+
+import glob
+import json
+import shutil
+import signal
+import subprocess
+import sys
+import os
+import threading
+import time
+import warnings
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+
+from hcd import WATCH_LEDGER_NAME, build_arg_parser, load_watch_ledger, run, watch_uploads
+
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
+
+TEST_DIR = os.path.dirname(__file__)
+SAMPLE_FILES = sorted(glob.glob(os.path.join(TEST_DIR, '*.xlsx')))
+HCD = os.path.join(TEST_DIR, '..', 'src', 'hcd.py')
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+class Watcher:
+    """watch_uploads() on a background thread, stopped on exit"""
+
+    def __init__(self, directory, handle, **kwargs):
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=watch_uploads, args=(str(directory), handle),
+                                       kwargs=dict(kwargs, stop=self.stop))
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.thread.join(timeout=10)
+        assert not self.thread.is_alive()
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_only_completed_uploads_are_taken(tmp_path, use_inotify):
+    """Lock files and partially assembled uploads wait; completed ones are handled once"""
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    content = open(SAMPLE_FILES[0], 'rb').read()
+    (uploads / "~$open.xlsx").write_bytes(content)
+    (uploads / "chunked.xlsx").write_bytes(content[:len(content) // 2])
+    handled = []
+
+    with Watcher(uploads, lambda path: handled.append(path) or {}, interval=0.05, use_inotify=use_inotify):
+        shutil.copy(SAMPLE_FILES[0], uploads / "single.xlsx")
+        wait_for(lambda: handled == [str(uploads / "single.xlsx")])
+        time.sleep(0.3)
+        assert len(handled) == 1
+
+        with open(uploads / "chunked.xlsx", 'ab') as f:
+            f.write(content[len(content) // 2:])
+        wait_for(lambda: len(handled) == 2)
+        time.sleep(0.3)
+
+    assert handled[1] == str(uploads / "chunked.xlsx")
+    ledger = load_watch_ledger(uploads / WATCH_LEDGER_NAME)
+    assert sorted(key[0] for key in ledger) == ["chunked.xlsx", "single.xlsx"]
+    assert set(ledger.values()) == {"done"}
+    print("✅ Completed upload tests passed")
+
+
+def test_ledger_survives_restart(tmp_path):
+    """Handled uploads are not taken again unless they change; failures are recorded"""
+    for name in ("a.xlsx", "b.xlsx"):
+        shutil.copy(SAMPLE_FILES[0], tmp_path / name)
+
+    def fail_on_b(path):
+        if path.endswith("b.xlsx"):
+            raise ValueError("broken upload")
+        return {}
+
+    with Watcher(tmp_path, fail_on_b, interval=0.05):
+        wait_for(lambda: len(load_watch_ledger(tmp_path / WATCH_LEDGER_NAME)) == 2)
+    statuses = {key[0]: status for key, status in load_watch_ledger(tmp_path / WATCH_LEDGER_NAME).items()}
+    assert statuses == {"a.xlsx": "done", "b.xlsx": "failed"}
+
+    handled = []
+    with Watcher(tmp_path, lambda path: handled.append(path) or {}, interval=0.05):
+        time.sleep(0.3)
+        assert handled == []
+        os.utime(tmp_path / "a.xlsx", ns=(time.time_ns(), time.time_ns()))
+        wait_for(lambda: handled == [str(tmp_path / "a.xlsx")])
+    print("✅ Ledger tests passed")
+
+
+def test_jobs_bound_concurrency(tmp_path):
+    """No more uploads run at once than there are jobs"""
+    for i in range(6):
+        shutil.copy(SAMPLE_FILES[0], tmp_path / f"upload-{i}.xlsx")
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def slow(path):
+        with lock:
+            running.append(path)
+            peak.append(len(running))
+        time.sleep(0.1)
+        with lock:
+            running.remove(path)
+        return {}
+
+    with Watcher(tmp_path, slow, jobs=2, queue_size=1, interval=0.05):
+        wait_for(lambda: len(load_watch_ledger(tmp_path / WATCH_LEDGER_NAME)) == 6)
+    assert max(peak) <= 2
+    print("✅ Concurrency tests passed")
+
+
+def test_watch_cli_prints_one_shot_summary(tmp_path):
+    """Each upload gets the JSON summary of an --input-file run on stdout"""
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    options = ["--outputs", "none", "--insert-db", "--dry-run"]
+    proc = subprocess.Popen([sys.executable, HCD, "--watch", "uploads", "--watch-interval", "0.1"] + options,
+                            cwd=tmp_path, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        upload = uploads / "single.xlsx"
+        shutil.copy(SAMPLE_FILES[0], upload)
+        response = json.loads(proc.stdout.readline())
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+    expected = run(build_arg_parser().parse_args(["--input-file", str(upload)] + options), base_dir=str(tmp_path))
+    assert response == dict(expected, filepath=str(upload))
+    assert proc.returncode == 0
+    print("✅ Watch CLI tests passed")